@@ -0,0 +1,177 @@
+import math
+import os
+import re
+import shlex
+import signal
+import uuid
+
+# =============================================
+# Solver Job Limits
+# =============================================
+# Time and memory budgets of the solver jobs, per engine, and the memory
+# cap that keeps one BDD run from taking the host down with every other
+# job. The job's command runs through a small sh wrapper that sets the
+# cap and then execs the solver, so the cap is in place before the solver
+# or its nuXmv starts (preexec_fn is not safe while the runner's threads
+# run): either RLIMIT_AS (every process of the job, nuXmv included, may map at
+# most the cap) or, with a delegated cgroup v2 directory, a child group
+# per job whose memory.max is the cap and whose memory.events tell if the
+# kernel killed the job for memory.
+# A job that ran out of memory gets the status 'memory', distinct from
+# 'timeout' and 'error'.
+# With an escalating budget a job first runs with a short time slice and
+# is rerun with a geometrically growing one while it times out, so the
+# quick jobs of a sweep finish before the hard ones take their full limit.
+# =============================================
+
+MEMORY_STATUS = 'memory'
+
+# messages of runs that ran out of memory: nuXmv and CUDD, Python's MemoryError, the C and C++ libraries
+OUT_OF_MEMORY_PATTERN = re.compile(r"out of memory|memoryerror|cannot allocate memory|memory allocation failed|std::bad_alloc",
+                                   re.IGNORECASE)
+
+MB = 1024 ** 2
+
+
+class EngineBudgets:
+    """
+    Time [seconds] and memory [MB] budgets of the jobs of each engine (bdd True or False).
+    An engine without its own budget uses time_limit and memory_limit, memory None means no cap.
+    """
+
+    def __init__(self, time_limit, memory_limit=None, bdd_time=None, sat_time=None, bdd_memory=None, sat_memory=None):
+        self.times = {True: bdd_time or time_limit, False: sat_time or time_limit}
+        self.memories = {True: bdd_memory or memory_limit, False: sat_memory or memory_limit}
+
+    def time(self, bdd):
+        return self.times[bool(bdd)]
+
+    def memory(self, bdd):
+        return self.memories[bool(bdd)]
+
+
+class EscalatingBudget:
+    """
+    Time slices [seconds] of a job that is rerun with a longer time limit while it times out:
+    first_slice, first_slice * factor, first_slice * factor^2, ... and at last the job's time limit.
+    The solvers are deterministic, a rerun starts over, so the slices grow to keep the repeated work
+    below factor / (factor - 1) times the work of the last run.
+    """
+
+    def __init__(self, first_slice, factor=2.0):
+        self.first_slice = first_slice
+        self.factor = factor
+
+    def slices(self, time_limit):
+        slices = []
+        limit = self.first_slice
+        while limit < time_limit:
+            slices.append(limit)
+            limit = max(limit + 1, int(math.ceil(limit * self.factor)))
+        return slices + [time_limit]
+
+
+class MemoryLimit:
+    """
+    Memory cap of one job:
+        limit_mb  - the cap [MB], None for no cap
+        cgroup    - directory of the job's cgroup v2 child group, None when the cap is RLIMIT_AS
+    Usage:
+        memory = MemoryLimit(4096, cgroup_parent)
+        process = subprocess.Popen(memory.wrap(command))
+        ...
+        if memory.was_exceeded(process.returncode, stdout + stderr): ...
+        memory.close()
+    """
+
+    def __init__(self, limit_mb=None, cgroup_parent=None):
+        self.limit_mb = limit_mb
+        self.cgroup = None
+        if limit_mb is not None and cgroup_parent is not None:
+            self.cgroup = self.create_cgroup(cgroup_parent)
+
+    def create_cgroup(self, parent):
+        path = os.path.join(parent, f"sokoban_job_{uuid.uuid4().hex[:12]}")
+        try:
+            os.mkdir(path)
+            write_value(os.path.join(path, 'memory.max'), int(self.limit_mb * MB))
+            if os.path.exists(os.path.join(path, 'memory.swap.max')):
+                write_value(os.path.join(path, 'memory.swap.max'), 0)  # swapping would only slow the job down
+            return path
+        except OSError as e:
+            print(f"Failed to create the cgroup {path}, limiting the address space instead: {e}")
+            try:
+                os.rmdir(path)
+            except OSError:
+                pass
+            return None
+
+    def wrap(self, command):
+        """
+        Returns the command run under the cap: sh joins the job's cgroup (or sets RLIMIT_AS with ulimit -v when
+        there is no cgroup or joining it fails) and execs the command, which keeps the process id.
+        The command is returned unchanged without a cap or off POSIX.
+        """
+        if self.limit_mb is None or os.name != 'posix':
+            return command
+        ulimit = f"ulimit -v {int(self.limit_mb * MB) // 1024}"
+        if self.cgroup is not None:
+            script = f"{{ echo $$ > {shlex.quote(os.path.join(self.cgroup, 'cgroup.procs'))}; }} 2>/dev/null || {ulimit}; exec \"$@\""
+        else:
+            script = f"{ulimit} && exec \"$@\""
+        return ['sh', '-c', script, 'sh'] + list(command)
+
+    def oom_kills(self):
+        """Processes of the job the kernel killed at the cgroup's memory.max."""
+        if self.cgroup is None:
+            return 0
+        try:
+            with open(os.path.join(self.cgroup, 'memory.events'), 'r') as f:
+                events = dict(line.split() for line in f if line.strip())
+            return int(events.get('oom_kill', 0))
+        except (OSError, ValueError):
+            return 0
+
+    def peak_memory(self):
+        """Peak memory [MB] of the whole job from the cgroup's memory.peak, None without a cgroup."""
+        if self.cgroup is None:
+            return None
+        try:
+            with open(os.path.join(self.cgroup, 'memory.peak'), 'r') as f:
+                return int(f.read().strip()) / MB
+        except (OSError, ValueError):
+            return None
+
+    def was_exceeded(self, return_code, output):
+        """
+        Checks if a finished job failed for memory: the kernel killed it in its cgroup, it printed an
+        out of memory message, or it was killed by SIGKILL while running under a cap.
+        """
+        if self.oom_kills() > 0:
+            return True
+        if return_code != 0 and output and OUT_OF_MEMORY_PATTERN.search(output):
+            return True
+        return self.limit_mb is not None and hasattr(signal, 'SIGKILL') and return_code == -signal.SIGKILL
+
+    def kill(self):
+        """Kills every process left in the job's cgroup (cgroup.kill), nothing without a cgroup."""
+        if self.cgroup is not None and os.path.exists(os.path.join(self.cgroup, 'cgroup.kill')):
+            try:
+                write_value(os.path.join(self.cgroup, 'cgroup.kill'), 1)
+            except OSError as e:
+                print(f"Failed to kill the cgroup {self.cgroup}: {e}")
+
+    def close(self):
+        """Removes the job's cgroup, its processes have exited by now."""
+        if self.cgroup is None:
+            return
+        try:
+            os.rmdir(self.cgroup)
+        except OSError as e:
+            print(f"Failed to remove the cgroup {self.cgroup}: {e}")
+        self.cgroup = None
+
+
+def write_value(path, value):
+    with open(path, 'w') as f:
+        f.write(f"{value}\n")
@@ -0,0 +1,156 @@
+import math
+import os
+import sys
+
+import numpy as np
+
+import job_limits
+import result_cache
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+import board_analysis
+
+# =============================================
+# Difficulty Aware Job Scheduler
+# =============================================
+# Orders the (board, solver) jobs of a sweep by their expected runtime,
+# longest first, so the worker pool does not end the sweep waiting for a
+# hard job that started last. The runtime of a job is predicted from the
+# results cache: the k boards nearest to the job's board in feature space
+# (board_analysis.FEATURES) that ran with the same solver and settings.
+# A run that timed out or ran out of memory counts with its time limit,
+# a lower bound of its runtime.
+# A job whose neighbours all failed with at least its time limit is
+# hopeless: it gets a shorter budget, or is skipped.
+# =============================================
+
+# neighbours a prediction is made from
+DEFAULT_NEIGHBOURS = 5
+# share of the time limit a hopeless job gets
+HOPELESS_BUDGET_FRACTION = 0.1
+# statuses of the runs that did not finish in their limits
+FAILED_STATUSES = ('timeout', job_limits.MEMORY_STATUS)
+
+
+def scaled(features):
+    """Counts grow by orders of magnitude between boards, they are compared on a log scale."""
+    return np.log1p(np.asarray(features, dtype=np.float64))
+
+
+class RuntimePredictor:
+    """
+    k nearest neighbours runtime model of one solver configuration (solver, engine, steps, iterative):
+        features     - float array [run, feature], the scaled features of the boards it ran on
+        runtimes     - float array [run], runtime [seconds], the time limit for the failed runs
+        failed       - bool array [run], the run timed out or ran out of memory
+        time_limits  - float array [run], time limit of the run [seconds]
+    Features are weighted by their spread over the runs, so no feature dominates the distance.
+    """
+
+    def __init__(self, history, k=DEFAULT_NEIGHBOURS):
+        self.k = k
+        history = [run for run in history if run['runtime'] is not None or run['status'] in FAILED_STATUSES]
+        self.failed = np.array([run['status'] in FAILED_STATUSES for run in history], dtype=bool)
+        self.time_limits = np.array([run['time_limit'] or 0 for run in history], dtype=np.float64)
+        self.runtimes = np.array([max(run['time_limit'] or 0, run['runtime'] or 0) if run['status'] in FAILED_STATUSES
+                                  else run['runtime'] for run in history], dtype=np.float64)
+        self.features = scaled([run['features'] for run in history]).reshape(len(history), len(board_analysis.FEATURES))
+        spread = self.features.std(axis=0) if len(history) else np.ones(len(board_analysis.FEATURES))
+        self.spread = np.where(spread > 0, spread, 1.0)
+
+    def neighbours(self, features):
+        """Returns the indices of the k runs nearest to the features and their distances."""
+        distances = np.sqrt((((self.features - scaled(features)) / self.spread) ** 2).sum(axis=1))
+        nearest = np.argsort(distances, kind='stable')[:self.k]
+        return nearest, distances[nearest]
+
+    def predict(self, features):
+        """
+        Returns (runtime, hopeless_limit) of a job on a board with the features: the expected runtime [seconds],
+        a distance weighted geometric mean of the neighbours, and the smallest time limit the neighbours all
+        failed with (None unless k neighbours exist and all failed). Returns (None, None) without runs.
+        """
+        if len(self.runtimes) == 0:
+            return None, None
+        nearest, distances = self.neighbours(features)
+        weights = 1.0 / (distances + 1e-6)
+        runtime = math.exp(float(np.average(np.log(np.maximum(self.runtimes[nearest], 1e-3)), weights=weights)))
+        hopeless_limit = None
+        if len(nearest) >= self.k and self.failed[nearest].all():
+            hopeless_limit = float(self.time_limits[nearest].min())
+        return runtime, hopeless_limit
+
+
+class JobScheduler:
+    """
+    Orders and budgets the (solver_path, board_path, output_file) jobs of a sweep.
+    Usage:
+        scheduler = JobScheduler(cache, bdd, steps, iterative_mode)
+        for solver_path, board_path, output_file in scheduler.order(solver_jobs):
+            job_time_limit = scheduler.time_limit(solver_path, board_path, time_limit)  # None: skip the job
+    Without a cache (or without previous results) the jobs on the boards with the most free cells and boxes go first.
+    """
+
+    def __init__(self, cache, bdd, steps, iterative_mode, k=DEFAULT_NEIGHBOURS, skip_hopeless=False):
+        self.cache = cache
+        self.engine = 'BDD' if bdd else 'SAT'
+        self.steps = result_cache.NO_STEPS if steps is None else int(steps)
+        self.iterative = int(bool(iterative_mode))
+        self.k = k
+        self.skip_hopeless = skip_hopeless
+        self.features = {}
+        self.predictors = {}
+        if cache is not None:
+            self.add_missing_features()
+
+    def add_missing_features(self):
+        """Computes the features of the boards of earlier results whose files still exist."""
+        for board_hash, board_path in self.cache.boards_without_features():
+            if board_path and os.path.isfile(board_path) and result_cache.board_hash(board_path) == board_hash:
+                self.board_features(board_path)
+
+    def board_features(self, board_path):
+        if board_path not in self.features:
+            with open(board_path, 'r') as f:
+                board = f.read()
+            self.features[board_path] = board_analysis.board_features(board)
+            if self.cache is not None:
+                self.cache.store_features(result_cache.board_hash(board_path), self.features[board_path])
+        return self.features[board_path]
+
+    def predictor(self, solver_path):
+        solver_hash = result_cache.file_hash(solver_path)
+        if solver_hash not in self.predictors:
+            history = [] if self.cache is None else self.cache.history(solver_hash, self.engine, self.steps, self.iterative)
+            self.predictors[solver_hash] = RuntimePredictor(history, self.k)
+        return self.predictors[solver_hash]
+
+    def predict(self, solver_path, board_path):
+        """Returns (runtime, hopeless_limit) of the job, see RuntimePredictor.predict."""
+        return self.predictor(solver_path).predict(self.board_features(board_path))
+
+    def order(self, solver_jobs):
+        """Returns the jobs longest expected runtime first, jobs without a prediction before all others."""
+        def key(job):
+            solver_path, board_path, _ = job
+            runtime, _ = self.predict(solver_path, board_path)
+            _, free_cells, boxes, _, _ = self.board_features(board_path)
+            return (runtime is not None, -(runtime or 0), -free_cells * boxes)
+        ordered = sorted(solver_jobs, key=key)
+        print(f"Scheduled {len(ordered)} jobs longest expected runtime first")
+        return ordered
+
+    def time_limit(self, solver_path, board_path, time_limit):
+        """
+        Returns the time limit of the job: time_limit, a share of it for a hopeless job,
+        None if a hopeless job is skipped.
+        """
+        runtime, hopeless_limit = self.predict(solver_path, board_path)
+        if hopeless_limit is None or hopeless_limit < time_limit:
+            return time_limit
+        if self.skip_hopeless:
+            print(f"Skipping {solver_path} on {board_path}, similar boards failed within {hopeless_limit:.0f} seconds.")
+            return None
+        budget = max(1, int(time_limit * HOPELESS_BUDGET_FRACTION))
+        print(f"Shortening the time limit of {solver_path} on {board_path} to {budget} seconds, similar boards failed within {hopeless_limit:.0f} seconds.")
+        return budget
@@ -0,0 +1,92 @@
+# incremental bounded model checking: the bound grows inside one nuXmv session until a counterexample is found
+import math
+import time
+
+import heuristics
+import nuxmv_session
+import trace_parser
+
+# checks the LTL specifications with exactly one bound; with no loop in the trace a counterexample
+# of any length up to the bound is found, so bounds may be skipped
+ONE_BOUND_COMMAND = "check_ltlspec_bmc_onepb -k {bound}"
+
+
+def lower_bound(board, boxes=None):
+    """
+    Bound the board needs at least: the minimum-cost matching of the boxes to the goals (heuristics.lower_bound).
+    Every push is one transition of the models, so no counterexample is shorter.
+    With boxes, only that many boxes have to reach goals and the closest ones are counted.
+    Returns 0 when the board has no such bound (the heuristic found it unsolvable), nuXmv decides then.
+    """
+    bound = heuristics.lower_bound(board, needed=boxes)
+    return 0 if bound is None else bound
+
+
+def bounds(lower, max_bound=None, step=1, growth=1.0):
+    """
+    Yields the bounds to check: lower, then at least step more each time and at least growth times the last one,
+    ending with max_bound (no end when max_bound is None).
+    """
+    bound = lower
+    while max_bound is None or bound < max_bound:
+        yield bound
+        bound = max(bound + step, math.ceil(bound * growth))
+    if max_bound is not None and lower <= max_bound:
+        yield max_bound
+
+
+class IncrementalBmc:
+    """
+    Runs check_ltlspec_bmc_onepb with growing bounds on one model in one nuXmv session.
+    Stops at the first counterexample, at max_bound or when time_budget seconds have passed.
+    The output is yielded line by line, shaped like the output of check_ltlspec_bmc, so the trace
+    parsers read it unchanged. After the run:
+        found      - a counterexample was found
+        bound      - the last bound that was checked to the end (None if none was)
+        timed_out  - the time budget ran out before a counterexample was found
+    setup_commands run once before the first check and final_commands after the last one.
+    Usage:
+        bmc = IncrementalBmc(lower_bound(board), time_budget=60)
+        for line in bmc.iter_run(session_pool, "model.smv"):
+            ...
+    """
+
+    def __init__(self, lower_bound=0, max_bound=None, time_budget=None, step=1, growth=1.0,
+                 setup_commands=("go_bmc",), final_commands=()):
+        self.lower_bound = lower_bound if max_bound is None else min(lower_bound, max_bound)
+        self.max_bound = max_bound
+        self.time_budget = time_budget
+        self.step = step
+        self.growth = growth
+        self.setup_commands = list(setup_commands)
+        self.final_commands = list(final_commands)
+        self.found = False
+        self.bound = None
+        self.timed_out = False
+
+    def iter_run(self, session_pool, model_file):
+        """Reads the model in a session of the pool and yields the output of the checks line by line."""
+        start_time = time.time()
+        with session_pool.session() as session:
+            try:
+                yield from session.iter_run(model_file, self.setup_commands, self.time_budget)
+                yield from self._deepen(session, start_time)
+                for command in self.final_commands:
+                    yield from session.iter_lines(command)
+            except nuxmv_session.NuXmvSessionError:
+                # the session was killed in the middle of a command, the pool starts a new one next time
+                self.timed_out = True
+
+    def _deepen(self, session, start_time):
+        for bound in bounds(self.lower_bound, self.max_bound, self.step, self.growth):
+            remaining = None if self.time_budget is None else self.time_budget - (time.time() - start_time)
+            if remaining is not None and remaining <= 0:
+                self.timed_out = True
+                return
+            for line in session.iter_lines(ONE_BOUND_COMMAND.format(bound=bound), remaining):
+                if trace_parser.STATE_PATTERN.search(line):
+                    self.found = True
+                yield line
+            self.bound = bound
+            if self.found:
+                return
@@ -0,0 +1,201 @@
+# Sokoban board as a uint8 NumPy array, shared by the preprocessing scripts and the model generators
+# every cell holds the code of its XSB symbol, short rows are padded with OUTSIDE cells
+import numpy as np
+
+import board_analysis
+
+# cell codes, SYMBOLS[code] is the XSB symbol of the code
+FLOOR, WALL, GOAL, BOX, BOX_ON_GOAL, PLAYER, PLAYER_ON_GOAL, OUTSIDE = range(8)
+SYMBOLS = "-#.$*@+ "
+UNKNOWN = 255
+
+# XSB byte -> code, '_' is read as floor as well, spaces are outside the board like in board_analysis
+_CODES = np.full(256, UNKNOWN, dtype=np.uint8)
+for _code, _symbol in enumerate(SYMBOLS):
+    _CODES[ord(_symbol)] = _code
+_CODES[ord("_")] = FLOOR
+_SYMBOL_BYTES = np.frombuffer(SYMBOLS.encode(), dtype=np.uint8)
+
+GOAL_CODES = (GOAL, BOX_ON_GOAL, PLAYER_ON_GOAL)
+BOX_CODES = (BOX, BOX_ON_GOAL)
+PLAYER_CODES = (PLAYER, PLAYER_ON_GOAL)
+
+
+class Board:
+    """
+    A board as a rows x columns uint8 array of cell codes:
+        cells  - the array, OUTSIDE where a row of the XSB text was shorter than the longest one
+    The masks (walls, goals, boxes, floor) are bool arrays of the same shape.
+    The operations return new boards, so they can be chained:
+        Board.from_file(path).wall_outside().write(path)
+    """
+
+    def __init__(self, cells):
+        self.cells = cells
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Reads a list of rows (strings or lists of characters), blank rows and trailing whitespace are dropped."""
+        rows = board_analysis.normalize_board(rows)
+        columns = max((len(row) for row in rows), default=0)
+        text = "".join(row.ljust(columns) for row in rows).encode("latin-1")
+        cells = _CODES[np.frombuffer(text, dtype=np.uint8)].reshape(len(rows), columns)
+        unknown = np.argwhere(cells == UNKNOWN)
+        if len(unknown):
+            i, j = unknown[0]
+            raise ValueError(f"WRONG SYMBOL EXISTS char={rows[i][j]} i={i} j={j}")
+        return cls(cells)
+
+    @classmethod
+    def from_xsb(cls, text):
+        return cls.from_rows(text.splitlines())
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "r") as f:
+            return cls.from_xsb(f.read())
+
+    # ---------- output ----------
+    def rows(self):
+        """Returns the XSB rows, the OUTSIDE cells at the end of a row are cut off."""
+        symbols = _SYMBOL_BYTES[self.cells]
+        return [row.tobytes().decode().rstrip(SYMBOLS[OUTSIDE]) for row in symbols]
+
+    def to_xsb(self):
+        return "\n".join(self.rows())
+
+    def write(self, path):
+        with open(path, "w") as f:
+            f.write(self.to_xsb() + "\n")
+
+    def translate(self, mapping):
+        """
+        Returns the rows as lists of characters with the XSB symbols replaced by mapping (symbol -> character),
+        symbols missing from mapping are kept. The OUTSIDE cells at the end of a row are cut off.
+        """
+        table = np.array([mapping.get(symbol, symbol) for symbol in SYMBOLS], dtype=object)
+        widths = self.widths()
+        return [list(row[:width]) for row, width in zip(table[self.cells], widths)]
+
+    def widths(self):
+        """Length of every row without its trailing OUTSIDE cells."""
+        inside = np.fliplr(self.cells != OUTSIDE)
+        return np.where(inside.any(axis=1), self.columns - inside.argmax(axis=1), 0)
+
+    # ---------- shape and masks ----------
+    @property
+    def shape(self):
+        return self.cells.shape
+
+    @property
+    def columns(self):
+        return self.cells.shape[1]
+
+    @property
+    def walls(self):
+        return self.cells == WALL
+
+    @property
+    def goals(self):
+        return np.isin(self.cells, GOAL_CODES)
+
+    @property
+    def boxes(self):
+        return np.isin(self.cells, BOX_CODES)
+
+    @property
+    def floor(self):
+        """Cells a box or the player may stand on."""
+        return (self.cells != WALL) & (self.cells != OUTSIDE)
+
+    @property
+    def player(self):
+        """(row, column) of the player, None if there is none."""
+        found = np.argwhere(np.isin(self.cells, PLAYER_CODES))
+        return (int(found[0][0]), int(found[0][1])) if len(found) else None
+
+    def positions(self, mask):
+        """Returns the (row, column) of the cells of a mask, row by row."""
+        return [(int(i), int(j)) for i, j in np.argwhere(mask)]
+
+    # ---------- editing ----------
+    def remap(self, mapping):
+        """Returns the board with the symbols replaced by mapping (XSB symbol -> XSB symbol)."""
+        table = np.arange(256, dtype=np.uint8)
+        for source, target in mapping.items():
+            table[_CODES[ord(source)]] = _CODES[ord(target)]
+        return Board(table[self.cells])
+
+    def pad(self, symbol="-"):
+        """Returns the board with the OUTSIDE cells at the end of every row set to symbol, all rows get the same length."""
+        trailing = np.fliplr(np.cumsum(np.fliplr(self.cells != OUTSIDE), axis=1)) == 0
+        return Board(np.where(trailing, _CODES[ord(symbol)], self.cells).astype(np.uint8))
+
+    def frame(self, symbol="#"):
+        """Returns the board with its first and last rows and columns set to symbol."""
+        cells = self.cells.copy()
+        if cells.size:
+            code = _CODES[ord(symbol)]
+            cells[[0, -1], :] = code
+            cells[:, [0, -1]] = code
+        return Board(cells)
+
+    def wall_outside(self):
+        """
+        Returns the board with walls in place of the OUTSIDE cells and of the cells before the first wall of a row,
+        all rows get the same length.
+        """
+        walls = self.walls
+        leading = (np.cumsum(walls, axis=1) == 0) & walls.any(axis=1, keepdims=True)
+        return Board(np.where(leading | (self.cells == OUTSIDE), WALL, self.cells).astype(np.uint8))
+
+    def fill_floor(self):
+        """
+        Returns the board with floor in place of the OUTSIDE cells the player can walk to: collections that
+        write floor as spaces (' ') become boards with '-' floor, the spaces around the walls stay outside.
+        """
+        player = self.player
+        if player is None or not (self.cells == OUTSIDE).any():
+            return Board(self.cells.copy())
+        labels, _ = label(self.cells != WALL)
+        inside = (labels == labels[player]) & (self.cells == OUTSIDE)
+        return Board(np.where(inside, FLOOR, self.cells).astype(np.uint8))
+
+    # ---------- analysis ----------
+    def reachable(self):
+        """Cells the player can walk to when boxes are ignored (board_analysis player_reachable), as a mask."""
+        player = self.player
+        if player is None:
+            return np.zeros(self.cells.shape, dtype=bool)
+        labels, _ = label(self.floor)
+        return labels == labels[player]
+
+    def hash(self):
+        """Hash of the normalized board, equal to board_analysis.board_hash of its XSB text."""
+        return board_analysis.board_hash(self.rows())
+
+
+def label(mask):
+    """
+    Labels the 4-connected regions of a bool array, like scipy.ndimage.label:
+    returns (labels, count), labels is 0 off the mask and 1..count on it.
+    Every cell takes the smallest label of its neighbours until nothing changes.
+    """
+    outside = mask.size + 1
+    labels = np.where(mask, np.arange(1, mask.size + 1).reshape(mask.shape), 0)
+    # labels framed by a border of outside cells, the inner part is updated in place
+    padded = np.full((mask.shape[0] + 2, mask.shape[1] + 2), outside, dtype=np.int64)
+    inner = padded[1:-1, 1:-1]
+    inner[...] = np.where(mask, labels, outside)
+    while True:
+        smallest = np.minimum(np.minimum(np.minimum(inner, padded[:-2, 1:-1]), np.minimum(padded[2:, 1:-1], padded[1:-1, :-2])),
+                              padded[1:-1, 2:])
+        smallest[~mask] = outside
+        if np.array_equal(smallest, inner):
+            break
+        inner[...] = smallest
+    labels = np.where(mask, inner, 0)
+    regions = np.unique(labels[mask])
+    numbering = np.zeros(mask.size + 2, dtype=np.int64)
+    numbering[regions] = np.arange(1, len(regions) + 1)
+    return numbering[labels], len(regions)
@@ -0,0 +1,188 @@
+# static analysis of a Sokoban board, shared by the SMV generators
+# every set of cells is a bitset (python int), cell (row, column) is bit row * columns + column
+import functools
+import hashlib
+
+WALL = '#'
+PLAYER_SYMBOLS = ('@', '+')
+BOX_SYMBOLS = ('$', '*')
+GOAL_SYMBOLS = ('.', '+', '*')
+# cells outside the board (padding of short rows)
+OUTSIDE = ' '
+
+DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+
+class BoardAnalysis:
+    """
+    Static facts of a board, computed once per board:
+        walls, goals, boxes       - cells of the board
+        player                    - (row, column) of the player, None if there is none
+        player_reachable          - cells the player can walk to when boxes are ignored
+        box_reachable             - cells from which a box can be pushed to some goal (reverse pulls from the goals)
+        dead_squares              - floor cells a box can never leave towards a goal
+        tunnels                   - floor cells with walls on both sides of one axis
+        goal_rooms                - list of bitsets, the areas between tunnels that hold goals
+    """
+
+    def __init__(self, rows):
+        self.rows = len(rows)
+        self.columns = max((len(row) for row in rows), default=0)
+        self.grid = [row.ljust(self.columns, OUTSIDE) for row in rows]
+        self.all_cells = (1 << (self.rows * self.columns)) - 1
+
+        self.walls = self.cells_of(lambda char: char == WALL)
+        self.goals = self.cells_of(lambda char: char in GOAL_SYMBOLS)
+        self.boxes = self.cells_of(lambda char: char in BOX_SYMBOLS)
+        self.outside = self.cells_of(lambda char: char == OUTSIDE)
+        self.player = next(((i, j) for i in range(self.rows) for j in range(self.columns)
+                            if self.grid[i][j] in PLAYER_SYMBOLS), None)
+
+        # cells a box or the player may stand on
+        self.floor = self.all_cells & ~self.walls & ~self.outside
+        self.player_reachable = self.flood(self.player) if self.player is not None else 0
+        self.box_reachable = self.pull_region()
+        self.dead_squares = self.floor & ~self.box_reachable
+        self.tunnels = self.find_tunnels()
+        self.goal_rooms = self.find_goal_rooms()
+
+    # ---------- bitset helpers ----------
+    def bit(self, i, j):
+        return 1 << (i * self.columns + j)
+
+    def contains(self, cells, i, j):
+        return 0 <= i < self.rows and 0 <= j < self.columns and (cells >> (i * self.columns + j)) & 1 == 1
+
+    def cells(self, cells):
+        """Yields the (row, column) of every cell of the bitset."""
+        while cells:
+            low = cells & -cells
+            index = low.bit_length() - 1
+            yield divmod(index, self.columns)
+            cells ^= low
+
+    def count(self, cells):
+        return bin(cells).count("1")
+
+    def to_matrix(self, cells):
+        """Returns the bitset as a rows x columns list of booleans."""
+        return [[self.contains(cells, i, j) for j in range(self.columns)] for i in range(self.rows)]
+
+    def cells_of(self, predicate):
+        cells = 0
+        for i, row in enumerate(self.grid):
+            for j, char in enumerate(row):
+                if predicate(char):
+                    cells |= self.bit(i, j)
+        return cells
+
+    # ---------- analysis ----------
+    def flood(self, start):
+        """Cells connected to start through floor cells."""
+        region = self.bit(*start)
+        stack = [start]
+        while stack:
+            i, j = stack.pop()
+            for di, dj in DIRECTIONS:
+                if self.contains(self.floor & ~region, i + di, j + dj):
+                    region |= self.bit(i + di, j + dj)
+                    stack.append((i + di, j + dj))
+        return region
+
+    def pull_region(self):
+        """
+        Cells a box can be pulled to from some goal on the empty board.
+        Pulling the box from b to b+d needs b+d and the player cell b+2d to be floor.
+        """
+        region = self.goals & self.floor
+        stack = list(self.cells(region))
+        while stack:
+            i, j = stack.pop()
+            for di, dj in DIRECTIONS:
+                if (self.contains(self.floor & ~region, i + di, j + dj)
+                        and self.contains(self.floor, i + 2 * di, j + 2 * dj)):
+                    region |= self.bit(i + di, j + dj)
+                    stack.append((i + di, j + dj))
+        return region
+
+    def find_tunnels(self):
+        tunnels = 0
+        blocked = self.walls | self.outside
+        for i, j in self.cells(self.player_reachable):
+            vertical = self.blocked(blocked, i, j - 1) and self.blocked(blocked, i, j + 1)
+            horizontal = self.blocked(blocked, i - 1, j) and self.blocked(blocked, i + 1, j)
+            if vertical or horizontal:
+                tunnels |= self.bit(i, j)
+        return tunnels
+
+    def blocked(self, blocked, i, j):
+        return not (0 <= i < self.rows and 0 <= j < self.columns) or self.contains(blocked, i, j)
+
+    def find_goal_rooms(self):
+        """Splits the reachable area at the tunnels and keeps the parts holding goals."""
+        rooms = []
+        remaining = self.player_reachable & ~self.tunnels
+        while remaining:
+            start = next(self.cells(remaining))
+            room = self.bit(*start)
+            stack = [start]
+            while stack:
+                i, j = stack.pop()
+                for di, dj in DIRECTIONS:
+                    if self.contains(remaining & ~room, i + di, j + dj):
+                        room |= self.bit(i + di, j + dj)
+                        stack.append((i + di, j + dj))
+            remaining &= ~room
+            if room & self.goals:
+                rooms.append(room)
+        return rooms
+
+    # ---------- queries used by the generators ----------
+    def is_reachable(self, i, j):
+        return self.contains(self.player_reachable, i, j)
+
+    def is_dead(self, i, j):
+        return self.contains(self.dead_squares, i, j)
+
+
+def normalize_board(board):
+    """
+    Returns the board rows as a tuple of strings.
+    board is an XSB string or a list of rows (strings or lists of characters).
+    """
+    if isinstance(board, str):
+        rows = board.strip('\n').splitlines()
+    else:
+        rows = ["".join(row) for row in board]
+    return tuple(row.rstrip() for row in rows if row.strip())
+
+
+def board_hash(board):
+    """Hash of the normalized board, the key of what is saved per board."""
+    return hashlib.sha256("\n".join(normalize_board(board)).encode()).hexdigest()
+
+
+@functools.lru_cache(maxsize=64)
+def _analyze(rows):
+    return BoardAnalysis(rows)
+
+
+def analyze_board(board):
+    """Returns the (cached) BoardAnalysis of an XSB string or a list of rows."""
+    return _analyze(normalize_board(board))
+
+
+# features the runtime predictions of the job scheduler compare boards by
+FEATURES = ("area", "free_cells", "boxes", "dead_ratio", "tunnels")
+
+
+def board_features(board):
+    """
+    Returns the FEATURES of an XSB string or a list of rows as a tuple: rows x columns, floor cells the player
+    can reach, boxes, the share of those cells that are dead squares, and tunnel cells.
+    """
+    analysis = analyze_board(board)
+    free_cells = analysis.count(analysis.player_reachable)
+    dead_cells = analysis.count(analysis.dead_squares & analysis.player_reachable)
+    return (analysis.rows * analysis.columns, free_cells, analysis.count(analysis.boxes),
+            dead_cells / free_cells if free_cells else 0.0, analysis.count(analysis.tunnels))
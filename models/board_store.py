@@ -0,0 +1,162 @@
+# board collections parsed once into a single memory-mapped file, any level is read by id without parsing
+# layout: header | cells of every level (uint8 codes of board.py, row by row) | titles (utf-8) | index
+# floor written as spaces is stored as '-', the boards read back the way the models expect them
+import os
+import re
+import struct
+
+import numpy as np
+
+import board_analysis
+from board import Board
+
+MAGIC = b"SOKSTORE"
+VERSION = 1
+# magic, version, levels, offset of the titles, offset of the index
+HEADER = struct.Struct("<8sIQQQ")
+
+# one entry per level, the metadata the sweeps select levels by
+INDEX_DTYPE = np.dtype([("offset", "<u8"), ("rows", "<u2"), ("columns", "<u2"), ("boxes", "<u2"), ("goals", "<u2"),
+                        ("title_offset", "<u8"), ("title_length", "<u2"), ("hash", "u1", (32,))])
+
+# lines of a level in a collection: XSB symbols only (spaces and '_' are floor too) with at least one wall
+LEVEL_LINE = re.compile(r"^[#@$.+*\-_ ]*#[#@$.+*\-_ ]*$")
+
+
+def parse_collection(text, default_title="level"):
+    """
+    Yields (title, rows) of every level of a collection text (.txt/.sok packs, or a single .xsb board).
+    A level is a run of board lines; the "Title:" line after a level names it, untitled levels are numbered.
+    """
+    levels = []
+    rows = []
+    titled = 0
+    for line in text.splitlines():
+        line = line.rstrip()
+        if line and LEVEL_LINE.match(line):
+            rows.append(line)
+            continue
+        if rows:
+            levels.append([None, rows])
+            rows = []
+        if line.startswith("Title:") and titled < len(levels):
+            # the title belongs to the latest level, the ones before it stay untitled
+            levels[-1][0] = line.split(":", 1)[1].strip()
+            titled = len(levels)
+    if rows:
+        levels.append([None, rows])
+    for number, (title, level_rows) in enumerate(levels, 1):
+        yield title or (default_title if len(levels) == 1 else f"{default_title}_{number}"), level_rows
+
+
+def build_store(collection_paths, store_path):
+    """
+    Parses the collections (files of parse_collection) into the store file, replaced atomically.
+    Returns the number of levels stored.
+    """
+    boards = []
+    titles = []
+    for path in collection_paths:
+        with open(path, "r") as f:
+            text = f.read()
+        stem = os.path.splitext(os.path.basename(path))[0]
+        for title, rows in parse_collection(text, stem):
+            try:
+                boards.append(Board.from_rows(rows).fill_floor())
+            except ValueError as e:
+                print(f"Skipping level {title} of {path}: {e}")
+                continue
+            titles.append(title.encode())
+
+    index = np.zeros(len(boards), dtype=INDEX_DTYPE)
+    temporary = store_path + ".tmp"
+    with open(temporary, "wb") as f:
+        f.write(b"\0" * HEADER.size)
+        offset = HEADER.size
+        for entry, board in zip(index, boards):
+            entry["offset"] = offset
+            entry["rows"], entry["columns"] = board.shape
+            entry["boxes"] = int(board.boxes.sum())
+            entry["goals"] = int(board.goals.sum())
+            entry["hash"] = np.frombuffer(bytes.fromhex(board.hash()), dtype=np.uint8)
+            f.write(board.cells.tobytes())
+            offset += board.cells.size
+        titles_offset = offset
+        for entry, title in zip(index, titles):
+            entry["title_offset"] = offset
+            entry["title_length"] = len(title)
+            f.write(title)
+            offset += len(title)
+        f.write(index.tobytes())
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, len(boards), titles_offset, offset))
+    os.replace(temporary, store_path)
+    return len(boards)
+
+
+class BoardStore:
+    """
+    Read side of a store file, the file is memory-mapped and nothing is parsed:
+        index  - structured array, one entry per level (INDEX_DTYPE): rows, columns, boxes, goals, hash, ...
+                 so levels can be selected with array expressions, e.g. np.flatnonzero(store.index["boxes"] <= 4)
+    Usage:
+        store = BoardStore("pack.boards")
+        board = store.board(12)       # board.Board over the mapped cells
+        xsb = store.xsb(store.find("Title of a level"))
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.data = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, version, count, _, index_offset = HEADER.unpack(self.data[:HEADER.size].tobytes())
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a board store of version {VERSION}")
+        self.index = self.data[index_offset:index_offset + count * INDEX_DTYPE.itemsize].view(INDEX_DTYPE)
+        self.ids = None
+
+    def __len__(self):
+        return len(self.index)
+
+    def board(self, board_id):
+        entry = self.index[board_id]
+        size = int(entry["rows"]) * int(entry["columns"])
+        return Board(self.data[entry["offset"]:entry["offset"] + size].reshape(entry["rows"], entry["columns"]))
+
+    def xsb(self, board_id):
+        return self.board(board_id).to_xsb()
+
+    def title(self, board_id):
+        entry = self.index[board_id]
+        return self.data[entry["title_offset"]:entry["title_offset"] + entry["title_length"]].tobytes().decode()
+
+    def hash(self, board_id):
+        """Hash of the level, equal to board_analysis.board_hash of its XSB text."""
+        return self.index[board_id]["hash"].tobytes().hex()
+
+    def find(self, key):
+        """Returns the id of a level given by its id (an int or digits), title or hash, None if there is none."""
+        if isinstance(key, int) or str(key).isdigit():
+            return int(key) if int(key) < len(self) else None
+        if self.ids is None:
+            self.ids = {}
+            for board_id in reversed(range(len(self))):
+                self.ids[self.title(board_id)] = board_id
+                self.ids[self.hash(board_id)] = board_id
+        return self.ids.get(key)
+
+    def file_name(self, board_id):
+        """Name of the .xsb file of a level, its title and a hash prefix: titles repeat within and across packs."""
+        return re.sub(r"[^\w\-. ]", "_", self.title(board_id)) + f"_{self.hash(board_id)[:8]}.xsb"
+
+    def extract(self, board_id, directory):
+        """
+        Writes a level to directory (for the tools that read board files) unless it is already there, returns its path.
+        """
+        path = os.path.join(directory, self.file_name(board_id))
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                if board_analysis.board_hash(f.read()) == self.hash(board_id):
+                    return path
+        os.makedirs(directory, exist_ok=True)
+        self.board(board_id).write(path)
+        return path
@@ -0,0 +1,96 @@
+# checkpoints of the iterative solvers: every filled goal is saved, so an interrupted run resumes after the last one
+import json
+import os
+import threading
+
+import board_analysis
+
+DEFAULT_CHECKPOINT_DIRECTORY = "checkpoints"
+
+# orders of one board may run side by side, their saves go through one lock
+_lock = threading.Lock()
+
+
+class Checkpoint:
+    """
+    Progress of the iterative runs of one solver on one board, kept in directory/<solver>_<board hash>.json:
+        board_hash  - hash of the board the runs start from
+        steps       - one dict per filled goal, in the order they were filled:
+                      goal        - [row, column] of the goal
+                      board       - the XSB board once the goal is filled, filled goals hold boxes
+                      worker      - [row, column] of the worker at that point
+                      lurd        - the LURD moves of the iteration (None when the solver does not extract them)
+                      seconds     - time of the iteration
+                      engine      - engine of the iteration, a run with the other engine continues from it as well
+                      model_hash  - hash of the model nuXmv checked in the iteration
+    The file holds the run that filled the most goals. It is replaced atomically after every goal.
+    """
+
+    def __init__(self, board, solver, directory=DEFAULT_CHECKPOINT_DIRECTORY):
+        self.analysis = board_analysis.analyze_board(board)
+        self.board_hash = board_analysis.board_hash(board)
+        self.path = os.path.join(directory, f"{solver}_{self.board_hash[:16]}.json")
+        self.steps = self.read()
+
+    def read(self):
+        try:
+            with open(self.path, "r") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return []
+        if saved.get("board_hash") != self.board_hash:
+            return []
+        steps = []
+        for step in saved.get("steps", []):
+            # a step is only kept if its board is a state of this board, and the steps before it are kept
+            if not self.is_valid(step, [tuple(previous["goal"]) for previous in steps] + [tuple(step["goal"])]):
+                break
+            steps.append(step)
+        return steps
+
+    def is_valid(self, step, filled_goals):
+        """Checks that the board of a step has the walls and the number of boxes of the board and boxes on the filled goals."""
+        try:
+            analysis = board_analysis.analyze_board(step["board"])
+        except (KeyError, TypeError, ValueError):
+            return False
+        return (analysis.walls == self.analysis.walls and analysis.count(analysis.boxes) == self.analysis.count(self.analysis.boxes)
+                and all(analysis.contains(analysis.boxes & analysis.goals, *goal) for goal in filled_goals))
+
+    def resume(self, order):
+        """Returns the saved steps that fill the first goals of order, the run continues after the last of them."""
+        steps = []
+        for step, goal in zip(self.steps, order):
+            if tuple(step["goal"]) != tuple(goal):
+                break
+            steps.append(step)
+        return steps
+
+    def prefer(self, orders):
+        """Returns the orders with the ones the checkpoint continues first."""
+        return sorted(orders, key=lambda order: -len(self.resume(order)))
+
+    def record(self, steps, goal, board, worker, lurd, seconds, engine, model_hash):
+        """
+        Adds a filled goal to steps (the steps of one run, as returned by resume) and saves them
+        unless the file holds a run that filled more goals. Returns the new steps.
+        """
+        steps = steps + [{"goal": list(goal), "board": board, "worker": list(worker), "lurd": lurd,
+                          "seconds": seconds, "engine": engine, "model_hash": model_hash}]
+        with _lock:
+            if len(steps) < len(self.steps):
+                return steps
+            self.steps = steps
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            temporary = self.path + ".tmp"
+            with open(temporary, "w") as f:
+                json.dump({"board_hash": self.board_hash, "steps": steps}, f, indent=1)
+            os.replace(temporary, self.path)
+        return steps
+
+
+def hashing(fragments, digest):
+    """Yields the model fragments (a string or an iterable of them) and adds them to digest (a hashlib object) on the way."""
+    for fragment in [fragments] if isinstance(fragments, str) else fragments:
+        digest.update(fragment.encode())
+        yield fragment
@@ -0,0 +1,147 @@
+# box configurations a board can never be solved from, enumerated for the concrete board
+# and compiled into a `deadlocked` DEFINE for the SMV models
+import functools
+
+import board_analysis
+import heuristics
+
+# (row offset, column offset) of the vertical and the horizontal axis
+AXES = ((1, 0), (0, 1))
+
+
+class DeadlockPatterns:
+    """
+    Deadlocks of a board, every cell is (row, column):
+        blocks     - 2x2 squares of walls and boxes holding a box off its goal, as tuples of the box cells
+        pairs      - two adjacent boxes, at least one off its goal, that block each other along their axis
+                     while a wall next to each blocks the other axis
+        shortages  - (cells, needed): the goals of a set can only be filled from cells and fewer than needed
+                     boxes are left on them
+    Dead squares are not repeated here, the models already keep boxes off them.
+    """
+
+    def __init__(self, analysis, distances):
+        self.analysis = analysis
+        self.blocked = analysis.walls | analysis.outside
+        self.live = analysis.box_reachable & analysis.floor
+        blocks = self.find_blocks()
+        patterns = minimal_sets(blocks + self.find_pairs())
+        self.blocks = [pattern for pattern in patterns if pattern in blocks]
+        self.pairs = [pattern for pattern in patterns if pattern not in blocks]
+        self.shortages = minimal_shortages(self.find_shortages(distances))
+
+    def is_blocked(self, i, j):
+        return self.analysis.blocked(self.blocked, i, j)
+
+    def is_live(self, i, j):
+        return self.analysis.contains(self.live, i, j)
+
+    def is_goal(self, cell):
+        return self.analysis.contains(self.analysis.goals, *cell)
+
+    def find_blocks(self):
+        blocks = []
+        for i in range(-1, self.analysis.rows):
+            for j in range(-1, self.analysis.columns):
+                square = ((i, j), (i, j + 1), (i + 1, j), (i + 1, j + 1))
+                if not all(self.is_blocked(*cell) or self.is_live(*cell) for cell in square):
+                    continue  # a cell of the square stays free, or no box can stand on it
+                boxes = tuple(cell for cell in square if self.is_live(*cell))
+                # a single box in a corner is a dead square
+                if len(boxes) > 1 and not all(self.is_goal(cell) for cell in boxes):
+                    blocks.append(boxes)
+        return blocks
+
+    def find_pairs(self):
+        pairs = []
+        for i, j in self.analysis.cells(self.live):
+            for di, dj in AXES:
+                first, second = (i, j), (i + di, j + dj)
+                if not self.is_live(*second) or (self.is_goal(first) and self.is_goal(second)):
+                    continue
+                # a wall on either side across the axis stops every push of the box across it
+                if all(self.is_blocked(r + dj, c + di) or self.is_blocked(r - dj, c - di) for r, c in (first, second)):
+                    pairs.append((first, second))
+        return pairs
+
+    def find_shortages(self, distances):
+        """Hall conditions of the box-goal matching for every goal and every goal room."""
+        goal_index = {goal: index for index, goal in enumerate(distances.goals)}
+        goal_sets = [[goal] for goal in distances.goals]
+        for room in self.analysis.goal_rooms:
+            goals = list(self.analysis.cells(room & self.analysis.goals))
+            if len(goals) > 1:
+                goal_sets.append(goals)
+        live_cells = set(self.analysis.cells(self.live))
+        shortages = []
+        for goals in goal_sets:
+            sources = {(i, j) for i, j in live_cells
+                       if any(distances.table[goal_index[goal], i, j] < heuristics.UNREACHABLE for goal in goals)}
+            if sources != live_cells:  # with every cell as a source the condition always holds
+                shortages.append((tuple(sorted(sources)), len(goals)))
+        return shortages
+
+    def count(self):
+        return len(self.blocks) + len(self.pairs) + len(self.shortages)
+
+    def is_deadlocked(self, boxes):
+        """Checks a set of box cells against the patterns."""
+        return (any(all(cell in boxes for cell in block) for block in self.blocks)
+                or any(first in boxes and second in boxes for first, second in self.pairs)
+                or any(sum(cell in boxes for cell in cells) < needed for cells, needed in self.shortages))
+
+    def smv_fragments(self, box_at=lambda i, j: f"board[{i}][{j}]"):
+        """
+        Yields the `deadlocked` DEFINE, one pattern per fragment.
+        box_at(i, j) is the SMV expression that holds when a box is on the cell.
+        """
+        terms = []
+        for block in self.blocks:
+            terms.append("(" + " & ".join(box_at(i, j) for i, j in block) + ")")
+        for first, second in self.pairs:
+            terms.append(f"({box_at(*first)} & {box_at(*second)})")
+        for cells, needed in self.shortages:
+            if not cells:
+                terms.append("TRUE")
+            elif needed == 1:
+                terms.append("!(" + " | ".join(box_at(i, j) for i, j in cells) + ")")
+            else:
+                terms.append("(count(" + ", ".join(box_at(i, j) for i, j in cells) + f") < {needed})")
+        if not terms:
+            yield "\tdeadlocked := FALSE;\n"
+            return
+        yield "\tdeadlocked :=\n"
+        for index, term in enumerate(terms):
+            yield f"\t\t{'' if index == 0 else '| '}{term}\n"
+        yield "\t;\n"
+
+
+def minimal_sets(patterns):
+    """Drops repeated patterns and the ones holding all the boxes of another pattern, which never add a deadlock."""
+    minimal = []
+    for pattern in sorted(set(patterns), key=lambda pattern: (len(pattern), pattern)):
+        if not any(set(smaller) <= set(pattern) for smaller in minimal):
+            minimal.append(pattern)
+    return minimal
+
+
+def minimal_shortages(shortages):
+    """
+    Drops the shortages implied by another one: fewer than needed boxes on cells means fewer than
+    other_needed boxes on other_cells when other_cells is a subset of cells and other_needed >= needed.
+    """
+    minimal = []
+    for cells, needed in sorted(set(shortages), key=lambda shortage: (len(shortage[0]), -shortage[1], shortage[0])):
+        if not any(set(other) <= set(cells) and other_needed >= needed for other, other_needed in minimal):
+            minimal.append((cells, needed))
+    return minimal
+
+
+@functools.lru_cache(maxsize=64)
+def _deadlock_patterns(rows):
+    return DeadlockPatterns(board_analysis.analyze_board(rows), heuristics.push_distances(rows))
+
+
+def deadlock_patterns(board):
+    """Returns the (cached) DeadlockPatterns of an XSB string or a list of rows."""
+    return _deadlock_patterns(board_analysis.normalize_board(board))
@@ -0,0 +1,247 @@
+# explicit-state push-level Sokoban search, used as a fast pre-solver before the symbolic models
+# a state is the set of box cells plus the player's area; cell (row, column) is index row * columns + column
+import heapq
+import random
+import time
+from array import array
+from collections import deque
+
+import board_analysis
+import heuristics
+
+SOLVED = "solved"
+UNSOLVABLE = "unsolvable"
+BUDGET_EXCEEDED = "budget"
+# boards the search does not handle (no player, or a different number of boxes and goals)
+SKIPPED = "skipped"
+
+# the time budget is checked once every CHECK_INTERVAL expanded states
+CHECK_INTERVAL = 256
+# seed of the Zobrist keys, fixed so runs are reproducible
+ZOBRIST_SEED = 0x50C0BA
+
+
+class SearchResult:
+    """
+    Outcome of a search:
+        status    - SOLVED, UNSOLVABLE, BUDGET_EXCEEDED or SKIPPED
+        solution  - the LURD string when solved (lower case moves, upper case pushes), else None
+        pushes    - number of pushes of the solution
+        expanded  - number of states taken from the open list
+        seconds   - search time
+    """
+    __slots__ = ("status", "solution", "pushes", "expanded", "seconds")
+
+    def __init__(self, status, solution=None, pushes=0, expanded=0, seconds=0.0):
+        self.status = status
+        self.solution = solution
+        self.pushes = pushes
+        self.expanded = expanded
+        self.seconds = seconds
+
+
+class ExplicitSolver:
+    """
+    A* over box configurations, one push per edge.
+    The player is normalized to the smallest cell of its reachable area, so states that only differ by
+    walking are the same state. States are hashed with Zobrist keys (one key per box cell and per player cell,
+    updated by two xors per push) and the boxes are kept as a sorted array('H') of cell indices.
+    Boxes on dead squares, 2x2 blocks of boxes and walls holding a box off its goal and states where the
+    boxes can not be matched to different goals are pruned.
+    The heuristic is the minimum-cost matching of the boxes to the goals (heuristics.minimum_cost_matching)
+    over the push distances on the empty board.
+    """
+
+    def __init__(self, board):
+        analysis = board_analysis.analyze_board(board)
+        self.columns = analysis.columns
+        self.size = analysis.rows * analysis.columns
+        self.moves = ((-self.columns, 'u'), (self.columns, 'd'), (-1, 'l'), (1, 'r'))
+
+        self.floor = self.flags(analysis, analysis.floor)
+        self.goal = self.flags(analysis, analysis.goals & analysis.floor)
+        self.dead = self.flags(analysis, analysis.dead_squares)
+        self.start_boxes = array('H', sorted(self.indices(analysis, analysis.boxes)))
+        self.player = None if analysis.player is None else analysis.player[0] * self.columns + analysis.player[1]
+        self.supported = self.player is not None and len(self.start_boxes) == sum(self.goal) > 0
+        # pushes from every cell to every goal on the empty board, [cell, goal]
+        distances = heuristics.push_distances(board)
+        self.goal_table = distances.table.reshape(len(distances.goals), self.size).T if self.supported else None
+
+        generator = random.Random(ZOBRIST_SEED)
+        self.box_keys = [generator.getrandbits(64) for _ in range(self.size)]
+        self.player_keys = [generator.getrandbits(64) for _ in range(self.size)]
+
+    # ---------- board helpers ----------
+    def flags(self, analysis, cells):
+        flags = bytearray(self.size)
+        for index in self.indices(analysis, cells):
+            flags[index] = 1
+        return flags
+
+    def indices(self, analysis, cells):
+        return [i * self.columns + j for i, j in analysis.cells(cells)]
+
+    def is_floor(self, cell):
+        return 0 <= cell < self.size and self.floor[cell] == 1
+
+    def step(self, cell, offset):
+        """Returns the floor cell next to cell in the direction of offset, None if there is none."""
+        neighbour = cell + offset
+        # moving left or right must stay on the same row
+        if offset in (-1, 1) and neighbour // self.columns != cell // self.columns:
+            return None
+        return neighbour if self.is_floor(neighbour) else None
+
+    def neighbours(self, cell):
+        """Yields (neighbour, offset, letter) for the floor cells next to cell."""
+        for offset, letter in self.moves:
+            neighbour = self.step(cell, offset)
+            if neighbour is not None:
+                yield neighbour, offset, letter
+
+    def reachable(self, player, boxes):
+        """Returns (cells the player can walk to without pushing, the smallest of them)."""
+        seen = bytearray(self.size)
+        seen[player] = 1
+        smallest = player
+        stack = [player]
+        while stack:
+            cell = stack.pop()
+            for neighbour, _, _ in self.neighbours(cell):
+                if not seen[neighbour] and neighbour not in boxes:
+                    seen[neighbour] = 1
+                    smallest = min(smallest, neighbour)
+                    stack.append(neighbour)
+        return seen, smallest
+
+    def walk(self, start, target, boxes):
+        """Returns the lower case moves of a shortest walk from start to target around the boxes."""
+        parents = {start: None}
+        queue = deque([start])
+        while queue:
+            cell = queue.popleft()
+            if cell == target:
+                break
+            for neighbour, _, letter in self.neighbours(cell):
+                if neighbour not in parents and neighbour not in boxes:
+                    parents[neighbour] = (cell, letter)
+                    queue.append(neighbour)
+        letters = []
+        cell = target
+        while parents[cell] is not None:
+            cell, letter = parents[cell]
+            letters.append(letter)
+        return "".join(reversed(letters))
+
+    def is_frozen(self, cell, boxes):
+        """Checks the four 2x2 squares around a pushed box for blocks of boxes and walls holding a box off its goal."""
+        for corner in (cell, cell - 1, cell - self.columns, cell - self.columns - 1):
+            if corner % self.columns == self.columns - 1:
+                continue  # the square would wrap around the row
+            square = (corner, corner + 1, corner + self.columns, corner + self.columns + 1)
+            if not all(not self.is_floor(c) or c in boxes for c in square):
+                continue
+            if any(c in boxes and not self.goal[c] for c in square):
+                return True
+        return False
+
+    def heuristic(self, boxes):
+        """Minimum-cost matching of the boxes to the goals, heuristics.UNREACHABLE or more if some box has no goal left."""
+        total, _ = heuristics.minimum_cost_matching(self.goal_table[list(boxes)])
+        return total
+
+    # ---------- search ----------
+    def solve(self, time_budget=None, max_states=None):
+        """
+        Runs A* until the board is solved or proved unsolvable, time_budget seconds pass
+        or max_states states were expanded (None for no limit). Returns a SearchResult.
+        """
+        start_time = time.perf_counter()
+        if not self.supported:
+            return SearchResult(SKIPPED)
+        start_estimate = self.heuristic(self.start_boxes)
+        if start_estimate >= heuristics.UNREACHABLE:
+            return SearchResult(UNSOLVABLE, seconds=time.perf_counter() - start_time)
+
+        boxes = self.start_boxes
+        box_hash = 0
+        for box in boxes:
+            box_hash ^= self.box_keys[box]
+        _, normal = self.reachable(self.player, set(boxes))
+        key = box_hash ^ self.player_keys[normal]
+
+        # transposition table: hash -> (boxes, normalized player, pushes so far, parent hash, push)
+        # a push is (box cell, offset, letter), the solution is rebuilt from these by replaying the walks
+        table = {key: (boxes.tobytes(), normal, 0, None, None)}
+        counter = 0
+        open_list = [(start_estimate, 0, counter, key, boxes, box_hash, self.player)]
+        expanded = 0
+        while open_list:
+            _, pushes, _, key, boxes, box_hash, player = heapq.heappop(open_list)
+            if table[key][2] < pushes:
+                continue  # a shorter path to this state was found after it was queued
+            expanded += 1
+            if expanded % CHECK_INTERVAL == 0:
+                if time_budget is not None and time.perf_counter() - start_time > time_budget:
+                    return SearchResult(BUDGET_EXCEEDED, expanded=expanded, seconds=time.perf_counter() - start_time)
+            if max_states is not None and expanded > max_states:
+                return SearchResult(BUDGET_EXCEEDED, expanded=expanded, seconds=time.perf_counter() - start_time)
+
+            box_set = set(boxes)
+            if all(self.goal[box] for box in boxes):
+                solution = self.rebuild(table, key)
+                return SearchResult(SOLVED, solution, pushes, expanded, time.perf_counter() - start_time)
+
+            area, _ = self.reachable(player, box_set)
+            for position, box in enumerate(boxes):
+                for neighbour, offset, letter in self.neighbours(box):
+                    behind = self.step(box, -offset)
+                    if neighbour in box_set or self.dead[neighbour] or behind is None or not area[behind]:
+                        continue
+                    new_boxes = array('H', boxes)
+                    new_boxes[position] = neighbour
+                    new_box_set = box_set - {box} | {neighbour}
+                    if not self.goal[neighbour] and self.is_frozen(neighbour, new_box_set):
+                        continue
+                    new_boxes = array('H', sorted(new_boxes))
+                    new_box_hash = box_hash ^ self.box_keys[box] ^ self.box_keys[neighbour]
+                    _, normal = self.reachable(box, new_box_set)
+                    new_key = new_box_hash ^ self.player_keys[normal]
+                    state = new_boxes.tobytes()
+                    entry = table.get(new_key)
+                    if entry is not None and (entry[0], entry[1]) != (state, normal):
+                        new_key = (state, normal)  # hash collision, fall back to the exact state as the key
+                        entry = table.get(new_key)
+                    if entry is not None and entry[2] <= pushes + 1:
+                        continue
+                    table[new_key] = (state, normal, pushes + 1, key, (box, offset, letter))
+                    estimate = self.heuristic(new_boxes)
+                    if estimate >= heuristics.UNREACHABLE:
+                        continue
+                    counter += 1
+                    heapq.heappush(open_list, (pushes + 1 + estimate, pushes + 1, counter,
+                                               new_key, new_boxes, new_box_hash, box))
+        return SearchResult(UNSOLVABLE, expanded=expanded, seconds=time.perf_counter() - start_time)
+
+    def rebuild(self, table, key):
+        """Replays the pushes leading to the state key from the start, adding the walks between them."""
+        pushes = []
+        while table[key][3] is not None:
+            pushes.append(table[key][4])
+            key = table[key][3]
+        boxes = set(self.start_boxes)
+        player = self.player
+        moves = []
+        for box, offset, letter in reversed(pushes):
+            moves.append(self.walk(player, box - offset, boxes))
+            moves.append(letter.upper())
+            boxes.remove(box)
+            boxes.add(box + offset)
+            player = box
+        return "".join(moves)
+
+
+def solve(board, time_budget=None, max_states=None):
+    """Searches an XSB string or a list of rows (as built by create_board_list_from_file) for a solution."""
+    return ExplicitSolver(board).solve(time_budget, max_states)
@@ -0,0 +1,135 @@
+# fill orders of the goals for the iterative solvers, from goal rooms and a packing order analysis,
+# with alternative orders to retry (or to run side by side) when an order fails
+import concurrent.futures
+import threading
+from collections import deque
+
+import board_analysis
+
+# orders the planner hands out at most, and search nodes it spends looking for them
+MAX_ORDERS = 4
+MAX_NODES = 20000
+
+
+class GoalPlanner:
+    """
+    Packing order analysis of a board, for solvers that fill one goal at a time and freeze it afterwards:
+        goals      - (row, column) of every goal
+        room       - goal -> index of its goal room (board_analysis goal_rooms), None outside the rooms
+        distance   - goal -> walking distance from the player (boxes ignored), far goals are filled first
+    The order is built backwards: the last goal is one a box can still be pushed into while every other goal
+    is already filled (a wall), the goal before it one that can be filled with the remaining goals filled, and so on.
+    """
+
+    def __init__(self, board):
+        self.analysis = board_analysis.analyze_board(board)
+        self.goals = list(self.analysis.cells(self.analysis.goals & self.analysis.floor))
+        self.room = {goal: next((index for index, room in enumerate(self.analysis.goal_rooms)
+                                 if self.analysis.contains(room, *goal)), None) for goal in self.goals}
+        walking = self.walking_distances(self.analysis.floor)
+        self.distance = {goal: walking.get(goal, len(walking)) for goal in self.goals}
+
+    def walking_distances(self, floor):
+        if self.analysis.player is None:
+            return {}
+        distances = {self.analysis.player: 0}
+        queue = deque([self.analysis.player])
+        while queue:
+            i, j = queue.popleft()
+            for di, dj in board_analysis.DIRECTIONS:
+                cell = (i + di, j + dj)
+                if cell not in distances and self.analysis.contains(floor, *cell):
+                    distances[cell] = distances[(i, j)] + 1
+                    queue.append(cell)
+        return distances
+
+    def can_fill_last(self, goal, pending):
+        """
+        Checks that a box can still be pushed into goal when the other pending goals are filled:
+        some box off those goals is pulled out of goal over the remaining floor, along cells the player can walk to.
+        """
+        analysis = self.analysis
+        filled = 0
+        for other in pending:
+            if other != goal and other != analysis.player:
+                filled |= analysis.bit(*other)
+        if analysis.contains(analysis.boxes, *goal):
+            return True
+        floor = analysis.floor & ~filled
+        walkable = self.walking_distances(floor)
+        region = analysis.bit(*goal)
+        stack = [goal]
+        while stack:
+            i, j = stack.pop()
+            for di, dj in board_analysis.DIRECTIONS:
+                if (analysis.contains(floor & ~region, i + di, j + dj)
+                        and analysis.contains(floor, i + 2 * di, j + 2 * dj)):
+                    region |= analysis.bit(i + di, j + dj)
+                    stack.append((i + di, j + dj))
+        return (region & analysis.boxes & ~filled) != 0 and any(cell in walkable for cell in analysis.cells(region))
+
+    def heuristic_order(self):
+        """Farthest goals first, the order solver_iterative used before the planner."""
+        return sorted(self.goals, key=lambda goal: -self.distance[goal])
+
+    def orders(self, limit=MAX_ORDERS, max_nodes=MAX_NODES):
+        """
+        Yields up to limit different fill orders, the most likely first.
+        The search backtracks over the choice of the last goal at every step; the goals of the room picked last
+        and the goals near the player are tried first, so rooms are filled one at a time from the inside out.
+        The heuristic order is yielded when the search finds no order.
+        """
+        found = 0
+        nodes = 0
+        stack = [([], frozenset(self.goals))]
+        while stack and found < limit and nodes < max_nodes:
+            reversed_order, pending = stack.pop()
+            nodes += 1
+            if not pending:
+                found += 1
+                yield list(reversed(reversed_order))
+                continue
+            previous_room = self.room[reversed_order[-1]] if reversed_order else None
+            candidates = sorted((goal for goal in pending if self.can_fill_last(goal, pending)),
+                                key=lambda goal: (self.room[goal] != previous_room, self.distance[goal], goal))
+            # the stack pops the last one first
+            for goal in reversed(candidates):
+                stack.append((reversed_order + [goal], pending - {goal}))
+        if found == 0:
+            yield self.heuristic_order()
+
+
+def fill_orders(board, limit=MAX_ORDERS):
+    """Returns the fill orders of an XSB string or a list of rows, as lists of (row, column) goals."""
+    return list(GoalPlanner(board).orders(limit))
+
+
+def first_success(orders, attempt, workers=1, interrupt=None):
+    """
+    Runs attempt(order, stop) for the orders until one returns something other than None, and returns (order, result).
+    With more than one worker the orders run side by side, stop (a threading.Event) is set once an order succeeds
+    so the others can give up between their iterations, and interrupt() is called to end the checks they are running
+    (e.g. NuXmvSessionPool.interrupt); the result is returned without waiting for them. Returns (None, None) when
+    every order fails.
+    """
+    stop = threading.Event()
+    if workers <= 1:
+        for order in orders:
+            result = attempt(order, stop)
+            if result is not None:
+                return order, result
+        return None, None
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    futures = {executor.submit(attempt, order, stop): order for order in orders}
+    try:
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            if result is not None:
+                return futures[future], result
+    finally:
+        stop.set()
+        if interrupt is not None:
+            interrupt()
+        executor.shutdown(wait=False, cancel_futures=True)
+    return None, None
@@ -6,14 +6,56 @@ import extract_moves
 import solve_iteratively
 import os
 import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import model_files
+import explicit_solver
 
-def main(board_path='boards/board6.txt',iterative_mode = False , engine = 'BDD' , steps_num = None):
+#Seconds the explicit-state search gets before the board is handed to nuXmv
+DEFAULT_PRESOLVE_BUDGET = 5.0
+
+def presolve(board_path, budget, steps_num=None):
+    """
+    This function runs the explicit-state search on the board before any model is generated.
+
+    Input:
+        board_path: path of the board file
+        budget: seconds the search may take, 0 or None disables it
+        steps_num: bound on the number of moves, a longer solution is left to nuXmv
+    Output:
+        (settled, winning_path): settled is True if the board was solved or proved unsolvable,
+        winning_path is the list of moves (empty if the board is unsolvable)
+
+    """
+    if not budget:
+        return False, []
+    result = explicit_solver.solve(smv_file_generator.create_board_list_from_file(board_path), budget)
+    if result.status == explicit_solver.SOLVED and (steps_num is None or len(result.solution) <= steps_num):
+        return True, list(result.solution.lower())
+    if result.status == explicit_solver.UNSOLVABLE:
+        return True, []
+    print(f"Explicit search did not settle the board ({result.status}, {result.expanded} states), running nuXmv")
+    return False, []
+
+def main(board_path='boards/board6.txt',iterative_mode = False , engine = 'BDD' , steps_num = None, restrict_domains = False, keep_artifacts = False, presolve_budget = DEFAULT_PRESOLVE_BUDGET):
     #UPDATE BOARD FILE HERE
+    #Small boards are solved by the explicit search before nuXmv starts
+    settled, winning_path = presolve(board_path, presolve_budget, steps_num)
+    if settled:
+        if len(winning_path) == 0:
+            print("There is no solution for this board, Board unsolvable.")
+        else:
+            print(f"Path to win: {winning_path}.")
+        return
     if(iterative_mode):
-        solve_iteratively.solve_sokoban_iteratively(board_path, engine, steps_num)
+        solve_iteratively.solve_sokoban_iteratively(board_path, engine, steps_num, restrict_domains, keep_artifacts)
+    elif not keep_artifacts:
+        #Hand the model to nuXmv in memory and extract the path to winning state from the pipe
+        board = smv_file_generator.create_board_list_from_file(board_path)
+        with model_files.temporary_model(smv_file_generator.smv_fragments_generator(board, restrict_domains)) as smv_file_name:
+            winning_path=extract_moves.extract_moves(run_nuXmv.iter_nuxmv_output(smv_file_name,engine,steps_num))
     else:
         #Generate smv file from board
-        smv_file_name=smv_file_generator.generate_smv_file(board_path)
+        smv_file_name=smv_file_generator.generate_smv_file(board_path, restrict_domains)
         print("The file has been created and the content has been written.")
         #Run Smv file using script
         output_file_name=run_nuXmv.run_nuxmv(smv_file_name,engine,steps_num)
@@ -21,6 +63,8 @@ def main(board_path='boards/board6.txt',iterative_mode = False , engine = 'BDD'
         #Extract path to winning state
         winning_path=extract_moves.extract_moves_from_output_file(output_file_name)
 
+    if not iterative_mode:
+
         #Print results
         if len(winning_path) == 0 and engine == "SAT" and steps_num != None:
             print(f"No solution for this board in {steps_num} steps.")      
@@ -30,9 +74,6 @@ def main(board_path='boards/board6.txt',iterative_mode = False , engine = 'BDD'
             print(f"Path to win: {winning_path}.")
 
 if __name__ == "__main__":
-    main('boards/board_54X Sharpen.txt', False, "BDD")
-
-'''  
     parser = argparse.ArgumentParser(description="Sokoban Solver")
 
     # Required positional argument for the board path
@@ -41,16 +82,24 @@ if __name__ == "__main__":
     # Optional arguments with enforced choices
     parser.add_argument('-ITERATIVE', '--iterative_mode', type=str, choices=['True', 'False'], default='False', help='Enable iterative mode (true or false)')
     parser.add_argument('-ENGINE', '--engine', type=str, choices=['SAT', 'BDD'], default=None, help='Specify the engine to use (SAT or BDD)')
+    parser.add_argument('-BDD', '--bdd', type=str, choices=['True', 'False'], default=None, help='Run BDD engine (True) or SAT engine (False), the flag of run_solvers_directory.py; -ENGINE takes precedence')
     parser.add_argument('-STEPS', '--steps_num', type=int, default=None, help='Specify the number of steps (integer)')
+    parser.add_argument('-RESTRICT', '--restrict_domains', type=str, choices=['True', 'False'], default='False', help='Declare only reachable cells, with restricted domains (true or false)')
+    parser.add_argument('-KEEP_ARTIFACTS', '--keep_artifacts', type=str, choices=['True', 'False'], default='False', help='Write the .smv and .out files of the run to disk (true or false)')
+    parser.add_argument('-PRESOLVE', '--presolve', type=float, default=DEFAULT_PRESOLVE_BUDGET, help='Seconds of explicit-state search before running nuXmv (0 disables it)')
 
     args = parser.parse_args()
 
     # Convert 'true'/'false' string to a boolean
     iterative_mode = args.iterative_mode.lower() == 'true'
+    restrict_domains = args.restrict_domains.lower() == 'true'
+    keep_artifacts = args.keep_artifacts.lower() == 'true'
+    engine = args.engine
+    if engine is None and args.bdd is not None:
+        engine = 'BDD' if args.bdd.lower() == 'true' else 'SAT'
 
     # Call main with the parsed arguments
-    main(args.board_path, iterative_mode, args.engine, args.steps_num)
-'''
+    main(args.board_path, iterative_mode, engine, args.steps_num, restrict_domains, keep_artifacts, args.presolve)
 
 """
 Examples of how to run : 
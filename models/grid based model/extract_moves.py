@@ -1,4 +1,7 @@
 import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import trace_parser
 
 def extract_moves_from_output_file(output_filename):
     """
@@ -11,24 +14,10 @@ def extract_moves_from_output_file(output_filename):
 
     """
     
-#Extract moves from 
-    move = None
-    is_move = False # this variable checks if last line before condition is true is move
-    path_to_win = []
+#Extract moves from the trace, the file is parsed while it is read
     try:
         with open(output_filename, 'r') as file:
-            for line in file:
-                #is_move = False
-                if "State" in line:
-                    # insert move to list
-                    if move is not None:
-                        path_to_win.append(move)
-                elif "move =" in line:
-                    #is_move = True
-                    move = line.split('=')[-1].strip()#extract player's move from line
-                elif "is_solvable = TRUE" in line:
-                    break
-        return path_to_win
+            return extract_moves(file)
 
     except FileNotFoundError:
         print(f"The file {output_filename} does not exist.")
@@ -37,3 +26,29 @@ def extract_moves_from_output_file(output_filename):
         print(f"An error occurred: {e}")
         return []
 
+
+def extract_moves(output):
+    """
+    This function extracts the winning path from nuXmv output that is not saved to a file.
+
+    Input:
+        output: the nuXmv output, a string or the lines of the nuXmv pipe, parsed while they are read
+    Output:
+        path_to_win: list containig the players moves (in LURD format) leading to winning state(all boxes on goals)
+
+    """
+    move = None
+    path_to_win = []
+    parser = trace_parser.TraceParser(output)
+    for state in parser.states():
+        # insert the move of the previous state to list
+        if move is not None:
+            path_to_win.append(move)
+        if state.move is not None:
+            move = state.move #extract player's move from the state
+        if state.values.get("is_solvable") == "TRUE":
+            break
+    # the rest of a pipe is read too, nuXmv finishes before its model is removed
+    parser.drain()
+    return path_to_win
+
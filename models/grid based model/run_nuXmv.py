@@ -1,7 +1,7 @@
 import subprocess
 import os
 import time
-def run_nuxmv(smv_file_name, engine_type=None,steps_number=None):
+def run_nuxmv(smv_file_name, engine_type=None,steps_number=None, session_pool=None):
     """
 
     This file runs the .smv file that was created by the smv_file generator.
@@ -10,6 +10,8 @@ def run_nuxmv(smv_file_name, engine_type=None,steps_number=None):
         smv_file_name: name of the .smv file that was created by the generator(or any file modeling a sokobab board)
         steps_number: In case user wants to limit number of steps for player (defaults to no limit)
         engine_type type= engine for model checking - BDD / SAT / None (default Model checking)
+        session_pool: optional nuxmv_session.NuXmvSessionPool, SAT and BDD runs reuse its nuXmv processes
+                      instead of starting a new one (defaults to a new process per run)
     
     Output:
         This function returns the name of the output file of the run
@@ -17,69 +19,14 @@ def run_nuxmv(smv_file_name, engine_type=None,steps_number=None):
 
     """
     try:
-        engine_string = ""
-        #Model Checking
-        if engine_type == None:
-            # Run the command
-            # nuXmv filename
-            nuxmv_process = subprocess.Popen(["nuXmv", smv_file_name], stdin=subprocess.PIPE, stdout=subprocess.PIPE, universal_newlines=True)
-            stdout, _ = nuxmv_process.communicate()
-
-        #SAT Solver EngineS
-        
-        elif engine_type == "SAT":
-            print("Running smv file with SAT Engine .")
-            simulation_start = time.time()
-            # Start the nuXmv process in interactive mode
-            nuxmv_process = subprocess.Popen(
-                ["nuXmv", "-int", smv_file_name],
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True
-            )
-            # Send SAT based commands to the nuXmv process
-            if steps_number == None:
-                commands = "go\ncheck_ltlspec\nquit\n"
-
-            else:
-                commands = f"go_bmc\ncheck_ltlspec_bmc -k {steps_number}\nquit\n"
-            stdout, _ = nuxmv_process.communicate(input=commands)
-            simulation_end = time.time()
-            simulation_time = simulation_end - simulation_start
-            print(f"Simulation running time for SAT engine:{simulation_time}")
-            engine_string="_SAT"
-
-        #BDD Engine 
-        elif engine_type == "BDD":
-            print("Running smv file with BDD Engine .")
-            simulation_start = time.time()
-            # Start the nuXmv process in interactive mode
-            nuxmv_process = subprocess.Popen(
-                ["nuXmv", "-int", smv_file_name],
-                stdin=subprocess.PIPE,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                universal_newlines=True
-            )
-
-            # Send BDD based commands to the nuXmv process
-            commands = f"go\ncheck_ltlspec\nquit\n"
-            stdout, _ = nuxmv_process.communicate(input=commands)
-            #Calculate run time
-            simulation_end = time.time()
-            simulation_time = simulation_end - simulation_start 
-            print(f"Simulation running time for BDD engine:{simulation_time}")
-            engine_string="_BDD"
-
-
-        # SAVE Output 
-        # Wait for the process to complete and capture the output
+        engine_string = "" if engine_type == None else "_" + engine_type
         output_filename = smv_file_name.split(".")[0] + engine_string + ".out"
 
-        # Save output to file
+        # SAVE Output 
+        # The output is written to the file line by line while nuXmv runs
         with open(output_filename, "w") as f:
-            f.write(stdout)
+            f.writelines(iter_nuxmv_output(smv_file_name, engine_type, steps_number, session_pool))
+
         print(f"Output saved to {output_filename}")
 
 
@@ -87,4 +34,84 @@ def run_nuxmv(smv_file_name, engine_type=None,steps_number=None):
     except Exception as e:
         return None, f"An error occurred: {e}"
 
-    
\ No newline at end of file
+
+def iter_nuxmv_output(smv_file_name, engine_type=None, steps_number=None, session_pool=None):
+    """
+
+    Runs the .smv file like run_nuxmv, without saving the output.
+
+    Input:
+        same as run_nuxmv
+
+    Output:
+        The output of nuXmv, line by line as nuXmv writes it
+        For SAT and BDD engine print simulation time
+
+    """
+    #Model Checking
+    if engine_type == None:
+        # Run the command
+        # nuXmv filename
+        nuxmv_process = subprocess.Popen(["nuXmv", smv_file_name], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, universal_newlines=True)
+        yield from nuxmv_process.stdout
+        nuxmv_process.wait()
+
+    #SAT Solver EngineS
+    
+    elif engine_type == "SAT":
+        print("Running smv file with SAT Engine .")
+        simulation_start = time.time()
+        # Send SAT based commands to the nuXmv process
+        if steps_number == None:
+            commands = ["go", "check_ltlspec"]
+
+        else:
+            commands = ["go_bmc", f"check_ltlspec_bmc -k {steps_number}"]
+        yield from run_interactive(smv_file_name, commands, session_pool)
+        simulation_end = time.time()
+        simulation_time = simulation_end - simulation_start
+        print(f"Simulation running time for SAT engine:{simulation_time}")
+
+    #BDD Engine 
+    elif engine_type == "BDD":
+        print("Running smv file with BDD Engine .")
+        simulation_start = time.time()
+        # Send BDD based commands to the nuXmv process
+        commands = ["go", "check_ltlspec"]
+        yield from run_interactive(smv_file_name, commands, session_pool)
+        #Calculate run time
+        simulation_end = time.time()
+        simulation_time = simulation_end - simulation_start 
+        print(f"Simulation running time for BDD engine:{simulation_time}")
+
+
+def run_interactive(smv_file_name, commands, session_pool=None):
+    """
+
+    Runs nuXmv commands on the .smv file in interactive mode.
+
+    Input:
+        smv_file_name: name of the .smv file
+        commands: list of nuXmv commands to run after the model is read
+        session_pool: optional nuxmv_session.NuXmvSessionPool to run the commands in
+
+    Output:
+        The output of nuXmv, line by line as nuXmv writes it
+
+    """
+    if session_pool is not None:
+        yield from session_pool.iter_run(smv_file_name, commands)
+        return
+
+    # Start the nuXmv process in interactive mode
+    nuxmv_process = subprocess.Popen(
+        ["nuXmv", "-int", smv_file_name],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        universal_newlines=True
+    )
+    nuxmv_process.stdin.write("\n".join(commands + ["quit"]) + "\n")
+    nuxmv_process.stdin.close()
+    yield from nuxmv_process.stdout
+    nuxmv_process.wait()
@@ -1,18 +1,27 @@
 import os
+import re
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import board_analysis
+
+# value of every XSB character in the model
+CELL_NAMES = {'@': 'Player', '+': 'POG', '$': 'Box', '*': 'BOG', '#': 'Wall', '.': 'Goal', '-': 'Floor'}
+CELL_DOMAIN = ['Wall', 'Player', 'POG', 'Box', 'BOG', 'Goal', 'Floor']
+
+# a test of a cell value and the value assigned by a case rule, used to drop rules in the restricted model
+CELL_TEST_PATTERN = re.compile(r'sokoban_board\[(\d+)\]\[(\d+)\] = (\w+)')
+RULE_RESULT_PATTERN = re.compile(r':\s*(\w+);$')
+
 ################ SMV FILE GENERATOR ######################
-def generate_smv_file(board_file="board_xsb.txt"):
+def generate_smv_file(board_file="board_xsb.txt", restrict_domains=False):
     
     # Create a 2D list from the board text file
     board = create_board_list_from_file(board_file)
     
-    # Create the string for the SMV file according to FDS and the winning condition
-    smv_string = smv_string_generator(board)
-
     #Change here your smv file name
     smv_file_name = "sokoban_board_smv_model.smv"
-    # Create SMV file 
-    with open(smv_file_name, 'w') as file:
-        file.write(smv_string)  # Write the string to the file
+    # Create SMV file, the content according to FDS and the winning condition is written while it is generated
+    write_to_file(smv_file_name, smv_fragments_generator(board, restrict_domains))
 
     print("Your Smv file for this board has been created in .")
     return smv_file_name
@@ -47,7 +56,7 @@ def create_board_list_from_file(path):
 
 
 ################ SMV FILE STRING GENERATOR ######################
-def smv_string_generator(board):
+def smv_string_generator(board, restrict_domains=False):
 
     """
     This Function creates the content for the smv model file created for the board
@@ -55,43 +64,154 @@ def smv_string_generator(board):
     
     Input:
         board: 2D list contsainig the XSB representation of the board
+        restrict_domains: declare only the cells the player can reach, each with the values it can hold
     Output:
         smv_string: string containig the conternt for the smv file
     """
+    return ''.join(smv_fragments_generator(board, restrict_domains))
+
+
+def smv_fragments_generator(board, restrict_domains=False):
+    """
+    Generator of the content of the smv model file, fragment by fragment.
+    Every fragment is at most the clauses of one cell, so writing the fragments as they come
+    keeps the memory bounded and the generation time linear in the number of cells.
+
+    Input:
+        board: 2D list contsainig the XSB representation of the board
+        restrict_domains: declare only the cells the player can reach, each with the values it can hold
+    Output:
+        yields the strings that make up the smv file, in order
+    """
     rows=len(board)
     cols=len(board[0])
-    smv_string = f"""
+    yield f"""
 MODULE main
 --SMV FILE FOR SOKOBAN BOARD OF SIZE {rows}x{cols}
 -- Variables
-VAR
-    sokoban_board: array 0..{rows-1} of array 0..{cols-1} of {{Wall, Player, POG, Box, BOG, Goal, Floor}};
-    move: {{r, l, u, d}}; --direction is non-determinisic
+"""
+    yield from variables_fragments(board, restrict_domains)
+    yield """
+    move: {r, l, u, d}; --direction is non-determinisic
     
 -- Initial States
 INIT
-    {initial_state_string_generator(board)}
+    """
+    yield from initial_state_fragments(board)
+    yield """
     
 -- Define transition relations
 ASSIGN
-    {transition_relation_string_generator(board)}
+    """
+    yield from transition_relation_fragments(board, restrict_domains)
+    yield """
     
 -- solvability function that indica
 DEFINE
     is_solvable :=
-        {solvability_condition_string_generator(board)}
+        """
+    yield from solvability_condition_fragments(board)
+    yield """
         
 -- check solvability
 LTLSPEC !(F is_solvable);
 
 """
 
-    return smv_string
+################ VARIABLES STRING ######################
+def variables_string_generator(board, restrict_domains=False):
+    """
+    This function creates the declaration of the board cells, ending with an open VAR section.
+
+    Input:
+        board: this is a list contsainig the XSB representation of the board
+        restrict_domains: when False the board is one array of the full cell enum.
+            When True only the cells that can change are variables, named cell_i_j, with the smallest enum
+            of values they can hold, and sokoban_board is defined as an array over them and the constant cells
+    Output:
+        String of the declarations, the caller adds the rest of the VAR section
+    """
+    return ''.join(variables_fragments(board, restrict_domains))
+
+
+def variables_fragments(board, restrict_domains=False):
+    """
+    This function yields the declarations of variables_string_generator, one board row at a time.
+    """
+    rows = len(board)
+    cols = len(board[0])
+    if not restrict_domains:
+        yield (f"VAR\n"
+               f"    sokoban_board: array 0..{rows-1} of array 0..{cols-1} of {{{', '.join(CELL_DOMAIN)}}};")
+        return
+
+    analysis = board_analysis.analyze_board(board)
+    yield "DEFINE\n    sokoban_board := ["
+    for i in range(rows):
+        row = [f"cell_{i}_{j}" if is_changing_cell(board, analysis, i, j) else CELL_NAMES[board[i][j]] for j in range(cols)]
+        yield f"[{', '.join(row)}]" + (",\n        " if i < rows - 1 else "];\nVAR")
+    for i in range(rows):
+        for j in range(cols):
+            if is_changing_cell(board, analysis, i, j):
+                yield f"\n    cell_{i}_{j}: {{{', '.join(cell_domain(board, analysis, i, j))}}};"
+
+
+def is_changing_cell(board, analysis, i, j):
+    """
+    Checks if the cell can change during the game: it is not a wall, not a floor cell on the border of the board,
+    and the player can reach it.
+    """
+    if board[i][j] == '#':
+        return False
+    if board[i][j] == '-' and (i == 0 or j == 0 or i == len(board) - 1 or j == len(board[0]) - 1):
+        return False
+    return analysis.is_reachable(i, j)
+
+
+def cell_domain(board, analysis, i, j):
+    """
+    Returns the values a changing cell can hold.
+    Goal cells only hold goal values, other cells only hold floor values,
+    and boxes are never pushed into dead squares so a dead square holds a box only if it starts with one.
+    """
+    if board[i][j] in ('.', '+', '*'):
+        return ['POG', 'BOG', 'Goal']
+    if analysis.is_dead(i, j) and board[i][j] != '$':
+        return ['Player', 'Floor']
+    return ['Player', 'Box', 'Floor']
+
+
+def restrict_case_block(block, i, j, domain):
+    """
+    Rewrites the transition block of sokoban_board[i][j] for the restricted model.
+    The next value is assigned to cell_i_j, and the rules that test the cell for a value
+    outside its domain (or assign such a value) are dropped, they can never fire.
+    """
+    cell = (str(i), str(j))
+    block = block.replace(f'next(sokoban_board[{i}][{j}])', f'next(cell_{i}_{j})', 1)
+    lines = []
+    for line in block.split('\n'):
+        tested = [value for row, column, value in CELL_TEST_PATTERN.findall(line) if (row, column) == cell]
+        if tested and not any(value in domain for value in tested):
+            continue
+        result = RULE_RESULT_PATTERN.search(line)
+        if result and result.group(1) in CELL_DOMAIN and result.group(1) not in domain:
+            continue
+        lines.append(line)
+    return '\n'.join(lines)
 
 ################ INITIAL STATE STRING ######################
 def initial_state_string_generator(board):
     """
-    This function creates the string representing the initial state of the board.
+    This function creates the string representing the initial state of the board,
+    see initial_state_fragments.
+    """
+    return ''.join(initial_state_fragments(board))
+
+
+def initial_state_fragments(board):
+    """
+    This function yields the string representing the initial state of the board, one cell at a time.
     Used for initialization of the model.
     
     Input:
@@ -108,7 +228,6 @@ def initial_state_string_generator(board):
         . = Goal 
         - = Floor
         """
-    initialization_string = ''
     row_num=len(board)
     col_num=len(board[0])
     for i in range(row_num):
@@ -116,64 +235,87 @@ def initial_state_string_generator(board):
             if(i == row_num-1 and j == col_num-1):
                  #Convert last cell end initializiation
                 if board[row_num-1][col_num-1] == '@':
-                    initialization_string += f'sokoban_board[{row_num-1}][{col_num-1}] = Player ;\n\t'
+                    yield f'sokoban_board[{row_num-1}][{col_num-1}] = Player ;\n\t'
                 elif board[row_num-1][col_num-1] == '+':
-                    initialization_string += f'sokoban_board[{row_num-1}][{col_num-1}] = POG ;\n\t'
+                    yield f'sokoban_board[{row_num-1}][{col_num-1}] = POG ;\n\t'
                 elif board[row_num-1][col_num-1] == '$':
-                    initialization_string += f'sokoban_board[{row_num-1}][{col_num-1}] = Box ;\n\t'
+                    yield f'sokoban_board[{row_num-1}][{col_num-1}] = Box ;\n\t'
                 elif board[row_num-1][col_num-1] == '*':
-                    initialization_string += f'sokoban_board[{row_num-1}][{col_num-1}] = BOG ;\n\t'
+                    yield f'sokoban_board[{row_num-1}][{col_num-1}] = BOG ;\n\t'
                 elif board[row_num-1][col_num-1] == '#':
-                    initialization_string += f'sokoban_board[{row_num-1}][{col_num-1}] = Wall ;\n\t'
+                    yield f'sokoban_board[{row_num-1}][{col_num-1}] = Wall ;\n\t'
                 elif board[row_num-1][col_num-1] == '.':
-                    initialization_string += f'sokoban_board[{row_num-1}][{col_num-1}] = Goal ;\n\t'
+                    yield f'sokoban_board[{row_num-1}][{col_num-1}] = Goal ;\n\t'
                 elif board[row_num-1][col_num-1] == '-':
-                    initialization_string += f'sokoban_board[{row_num-1}][{col_num-1}] = Floor ;\n\t'
+                    yield f'sokoban_board[{row_num-1}][{col_num-1}] = Floor ;\n\t'
 
             else:
                                 # Convert XSB symbols to string 
                 if board[i][j] == '@':
-                    initialization_string += f'sokoban_board[{i}][{j}] = Player &\n\t'
+                    yield f'sokoban_board[{i}][{j}] = Player &\n\t'
                 elif board[i][j] == '+':
-                    initialization_string += f'sokoban_board[{i}][{j}] = POG &\n\t' 
+                    yield f'sokoban_board[{i}][{j}] = POG &\n\t' 
                 elif board[i][j] == '$':
-                    initialization_string += f'sokoban_board[{i}][{j}] = Box &\n\t' 
+                    yield f'sokoban_board[{i}][{j}] = Box &\n\t' 
                 elif board[i][j] == '*':
-                    initialization_string += f'sokoban_board[{i}][{j}] = BOG &\n\t' 
+                    yield f'sokoban_board[{i}][{j}] = BOG &\n\t' 
                 elif board[i][j] == '#':
-                    initialization_string += f'sokoban_board[{i}][{j}] = Wall &\n\t'
+                    yield f'sokoban_board[{i}][{j}] = Wall &\n\t'
                 elif board[i][j] == '.':
-                    initialization_string += f'sokoban_board[{i}][{j}] = Goal &\n\t'
+                    yield f'sokoban_board[{i}][{j}] = Goal &\n\t'
                 elif board[i][j] == '-':
-                   initialization_string += f'sokoban_board[{i}][{j}] = Floor &\n\t'
-
-    return initialization_string
+                   yield f'sokoban_board[{i}][{j}] = Floor &\n\t'
 
 ################ TRANSITIONS STRING ######################
-def transition_relation_string_generator(board):
+def transition_relation_string_generator(board, restrict_domains=False):
     """
-    This function creates the string to use for model's transitions
+    This function creates the string to use for model's transitions, see transition_relation_fragments.
+    """
+    return ''.join(transition_relation_fragments(board, restrict_domains))
+
+
+def transition_relation_fragments(board, restrict_domains=False):
+    """
+    This function yields the model's transitions, one cell at a time
     Input:
         board: this is a list contsainig the XSB representation of the board
+        restrict_domains: assign the cell_i_j variables of the restricted model (see variables_string_generator),
+            constant cells get no assignment
     Output: 
-        String of the transition relations for the board FDS
+        Strings of the transition relations for the board FDS, one per cell
         will be used for creating the nuxmv file 
     """
-    transition_string = ''
 
     board_rows = len(board)
     board_cols = len(board[0])
 
+    # Static analysis of the board: cells the player never reaches keep their initial value,
+    # boxes are never pushed into dead squares (cells from which no goal can be reached)
+    analysis = board_analysis.analyze_board(board)
+
+    def cant_push_condition(r, c):
+        # the box can not be pushed to (r, c): it holds a box or a wall, or it is a dead square
+        if analysis.is_dead(r, c):
+            return 'TRUE'
+        return f'(sokoban_board[{r}][{c}] = Box | sokoban_board[{r}][{c}] = Wall | sokoban_board[{r}][{c}] = BOG)'
+
 #for every cell in the board define next state
     for i in range(board_rows):
         for j in range(board_cols):
+            transition_string = ''
             #Wall cells will never change in the game
             
-            if board[i][j] == '#':
+            if restrict_domains and not is_changing_cell(board, analysis, i, j):
+                #constant cells are part of the sokoban_board define
+                continue
+            elif board[i][j] == '#':
                 transition_string += f'next(sokoban_board[{i}][{j}]) := Wall;\n\t'
             #other cells state may change during the game
             elif board[i][j] == '-' and (i == 0 or j == 0 or i == board_rows - 1 or j == board_cols - 1):
                 transition_string += f'next(sokoban_board[{i}][{j}]) := Floor;\n\t'
+            #cells the player can not reach never change
+            elif not analysis.is_reachable(i, j):
+                transition_string += f'next(sokoban_board[{i}][{j}]) := {CELL_NAMES[board[i][j]]};\n\t'
             else: 
                 transition_string += f'next(sokoban_board[{i}][{j}]) := \n\t\tcase\n'
              # -----------------------------------------------------------------------------------------------
@@ -192,19 +334,19 @@ def transition_relation_string_generator(board):
                 if j >= 2:
                     transition_string += (
                         f'\t\t\t(sokoban_board[{i}][{j}] = Player | sokoban_board[{i}][{j}] = POG) & move = l & (sokoban_board[{i}][{j - 1}] = Box | sokoban_board[{i}][{j - 1}] = BOG) & '
-                        f'(sokoban_board[{i}][{j - 2}] = Box | sokoban_board[{i}][{j - 2}] = Wall | sokoban_board[{i}][{j - 2}] = BOG) : sokoban_board[{i}][{j}];\n')
+                        f'{cant_push_condition(i, j - 2)} : sokoban_board[{i}][{j}];\n')
                 if j < board_cols - 2:
                     transition_string += (
                         f'\t\t\t(sokoban_board[{i}][{j}] = Player | sokoban_board[{i}][{j}] = POG) & move = r & (sokoban_board[{i}][{j + 1}] = Box | sokoban_board[{i}][{j + 1}] = BOG) & '
-                        f'(sokoban_board[{i}][{j + 2}] = Box | sokoban_board[{i}][{j + 2}] = Wall | sokoban_board[{i}][{j + 2}] = BOG) : sokoban_board[{i}][{j}];\n')
+                        f'{cant_push_condition(i, j + 2)} : sokoban_board[{i}][{j}];\n')
                 if i >= 2:
                     transition_string += (
                         f'\t\t\t(sokoban_board[{i}][{j}] = Player | sokoban_board[{i}][{j}] = POG) & move = u & (sokoban_board[{i - 1}][{j}] = Box | sokoban_board[{i - 1}][{j}] = BOG) & '
-                        f'(sokoban_board[{i - 2}][{j}] = Box | sokoban_board[{i - 2}][{j}] = Wall | sokoban_board[{i - 2}][{j}] = BOG) : sokoban_board[{i}][{j}];\n')
+                        f'{cant_push_condition(i - 2, j)} : sokoban_board[{i}][{j}];\n')
                 if i < board_rows -2:
                     transition_string += (
                         f'\t\t\t(sokoban_board[{i}][{j}] = Player | sokoban_board[{i}][{j}] = POG) & move = d & (sokoban_board[{i + 1}][{j}] = Box | sokoban_board[{i + 1}][{j}] = BOG) & '
-                        f'(sokoban_board[{i + 2}][{j}] = Box | sokoban_board[{i + 2}][{j}] = Wall | sokoban_board[{i + 2}][{j}] = BOG) : sokoban_board[{i}][{j}];\n\n')
+                        f'{cant_push_condition(i + 2, j)} : sokoban_board[{i}][{j}];\n\n')
                     
 
             # -----------------------------------------------------------------------------------------------
@@ -223,19 +365,19 @@ def transition_relation_string_generator(board):
                 #2. Player moves to BOX
                 #PLAYER TRIES TO MOVE TO BOX AND IT CAN BE PUSHED
                 transition_string += f'\t\t\t--current: Player(@) & move to Box($) & push Box -> next: Floor(-) \n'
-                if j >= 2:
+                if j >= 2 and not analysis.is_dead(i, j - 2):
                     transition_string += (
                         f'\t\t\tsokoban_board[{i}][{j}] = Player & move = l & (sokoban_board[{i}][{j - 1}] = Box | sokoban_board[{i}][{j - 1}] = BOG) & '
                         f'(sokoban_board[{i}][{j - 2}] = Floor | sokoban_board[{i}][{j - 2}] = Goal): Floor;\n')
-                if j < board_cols - 2:
+                if j < board_cols - 2 and not analysis.is_dead(i, j + 2):
                     transition_string += (
                         f'\t\t\tsokoban_board[{i}][{j}] = Player & move = r & (sokoban_board[{i}][{j + 1}] = Box | sokoban_board[{i}][{j + 1}] = BOG) & '
                         f'(sokoban_board[{i}][{j + 2}] = Floor | sokoban_board[{i}][{j + 2}] = Goal): Floor;\n')
-                if i  >= 2:
+                if i  >= 2 and not analysis.is_dead(i - 2, j):
                     transition_string += (
                         f'\t\t\tsokoban_board[{i}][{j}] = Player & move = u & (sokoban_board[{i - 1}][{j}] = Box | sokoban_board[{i - 1}][{j}] = BOG) & '
                         f'(sokoban_board[{i - 2}][{j}] = Floor | sokoban_board[{i - 2}][{j}] = Goal): Floor;\n')
-                if i  < board_rows - 2:
+                if i  < board_rows - 2 and not analysis.is_dead(i + 2, j):
                     transition_string += (
                         f'\t\t\tsokoban_board[{i}][{j}] = Player & move = d & (sokoban_board[{i + 1}][{j}] = Box | sokoban_board[{i + 1}][{j}] = BOG) & '
                         f'(sokoban_board[{i + 2}][{j}] = Floor | sokoban_board[{i + 2}][{j}] = Goal): Floor;\n\n')
@@ -256,19 +398,19 @@ def transition_relation_string_generator(board):
                 #2. POG moves to BOX
                 #POG TRIES TO MOVE TO BOX AND IT CAN BE PUSHED
                 transition_string += f'\t\t\t--current: POG(+) & move to Box($) & push Box -> next: Goal(.) \n'
-                if j >= 2:
+                if j >= 2 and not analysis.is_dead(i, j - 2):
                     transition_string += (
                         f'\t\t\tsokoban_board[{i}][{j}] = POG & move = l & (sokoban_board[{i}][{j - 1}] = Box | sokoban_board[{i}][{j - 1}] = BOG) & '
                         f'(sokoban_board[{i}][{j - 2}] = Floor | sokoban_board[{i}][{j - 2}] = Goal): Goal;\n')
-                if j < board_cols - 2:
+                if j < board_cols - 2 and not analysis.is_dead(i, j + 2):
                     transition_string += (
                         f'\t\t\tsokoban_board[{i}][{j}] = POG & move = r & (sokoban_board[{i}][{j + 1}] = Box | sokoban_board[{i}][{j + 1}] = BOG) & '
                         f'(sokoban_board[{i}][{j + 2}] = Floor | sokoban_board[{i}][{j + 2}] = Goal): Goal;\n')
-                if i  >= 2:
+                if i  >= 2 and not analysis.is_dead(i - 2, j):
                     transition_string += (
                         f'\t\t\tsokoban_board[{i}][{j}] = POG & move = u & (sokoban_board[{i - 1}][{j}] = Box | sokoban_board[{i - 1}][{j}] = BOG) & '
                         f'(sokoban_board[{i - 2}][{j}] = Floor | sokoban_board[{i - 2}][{j}] = Goal): Goal;\n')
-                if i  < board_rows - 2:
+                if i  < board_rows - 2 and not analysis.is_dead(i + 2, j):
                     transition_string += (
                         f'\t\t\tsokoban_board[{i}][{j}] = POG & move = d & (sokoban_board[{i + 1}][{j}] = Box | sokoban_board[{i + 1}][{j}] = BOG) & '
                         f'(sokoban_board[{i + 2}][{j}] = Floor | sokoban_board[{i + 2}][{j}] = Goal): Goal;\n\n')
@@ -318,59 +460,68 @@ def transition_relation_string_generator(board):
                 
 
                 #2. PLAYER PUSHES BOX/BOG TO FLOOR 
-                transition_string += f'\t\t\t--current: Floor(-) & player pushes box -> next: Box($) \n'
-                if j < board_cols - 2:
-                    transition_string += (
-                        f'\t\t\tsokoban_board[{i}][{j}] = Floor & move = l  & (sokoban_board[{i}][{j + 2}] = Player | sokoban_board[{i}][{j + 2}] = POG)& '
-                        f'(sokoban_board[{i}][{j + 1}] = Box | sokoban_board[{i}][{j + 1}] = BOG) : Box;\n')
-                if j >= 2:
-                    transition_string += (
-                        f'\t\t\tsokoban_board[{i}][{j}] = Floor & move = r & (sokoban_board[{i}][{j - 2}] = Player | sokoban_board[{i}][{j - 2}] = POG) & '
-                        f'(sokoban_board[{i}][{j - 1}] = Box | sokoban_board[{i}][{j - 1}] = BOG) : Box;\n')
-                if i  < board_rows - 2:
-                    transition_string += (
-                        f'\t\t\tsokoban_board[{i}][{j}] = Floor & move = u & (sokoban_board[{i + 2}][{j}] = Player | sokoban_board[{i + 2}][{j}] = POG) & '
-                        f'(sokoban_board[{i + 1}][{j}] = Box | sokoban_board[{i + 1}][{j}] = BOG) : Box;\n')
-                if i  >= 2:
-                    transition_string += (
-                        f'\t\t\tsokoban_board[{i}][{j}] = Floor & move = d & (sokoban_board[{i - 2}][{j}] = Player | sokoban_board[{i - 2}][{j}] = POG) &'
-                        f' (sokoban_board[{i - 1}][{j}] = Box | sokoban_board[{i - 1}][{j}] = BOG) : Box;\n\n')
+                if not analysis.is_dead(i, j):
+                    transition_string += f'\t\t\t--current: Floor(-) & player pushes box -> next: Box($) \n'
+                    if j < board_cols - 2:
+                        transition_string += (
+                            f'\t\t\tsokoban_board[{i}][{j}] = Floor & move = l  & (sokoban_board[{i}][{j + 2}] = Player | sokoban_board[{i}][{j + 2}] = POG)& '
+                            f'(sokoban_board[{i}][{j + 1}] = Box | sokoban_board[{i}][{j + 1}] = BOG) : Box;\n')
+                    if j >= 2:
+                        transition_string += (
+                            f'\t\t\tsokoban_board[{i}][{j}] = Floor & move = r & (sokoban_board[{i}][{j - 2}] = Player | sokoban_board[{i}][{j - 2}] = POG) & '
+                            f'(sokoban_board[{i}][{j - 1}] = Box | sokoban_board[{i}][{j - 1}] = BOG) : Box;\n')
+                    if i  < board_rows - 2:
+                        transition_string += (
+                            f'\t\t\tsokoban_board[{i}][{j}] = Floor & move = u & (sokoban_board[{i + 2}][{j}] = Player | sokoban_board[{i + 2}][{j}] = POG) & '
+                            f'(sokoban_board[{i + 1}][{j}] = Box | sokoban_board[{i + 1}][{j}] = BOG) : Box;\n')
+                    if i  >= 2:
+                        transition_string += (
+                            f'\t\t\tsokoban_board[{i}][{j}] = Floor & move = d & (sokoban_board[{i - 2}][{j}] = Player | sokoban_board[{i - 2}][{j}] = POG) &'
+                            f' (sokoban_board[{i - 1}][{j}] = Box | sokoban_board[{i - 1}][{j}] = BOG) : Box;\n\n')
 
 
                 # -----------------------------------------------------------------------------------------------
                 #CURRENT STATE : BOX 
                 # 1. PLAYER PUSHES BOX
                 transition_string += f'\t\t\t--current: Box($) & player pushes box -> next: Player(@) \n'
-                transition_string += (
-                    f'\t\t\tsokoban_board[{i}][{j}] = Box & move = l & (sokoban_board[{i}][{j + 1}] = Player | sokoban_board[{i}][{j + 1}] = POG) & '
-                    f'(sokoban_board[{i}][{j - 1}] = Floor | sokoban_board[{i}][{j - 1}] = Goal): Player;\n')
-                transition_string += (
-                    f'\t\t\tsokoban_board[{i}][{j}] = Box & move = r & (sokoban_board[{i}][{j - 1}] = Player | sokoban_board[{i}][{j - 1}] = POG) & '
-                    f'(sokoban_board[{i}][{j + 1}] = Floor | sokoban_board[{i}][{j + 1}] = Goal): Player;\n')
-                transition_string += (
-                    f'\t\t\tsokoban_board[{i}][{j}] = Box & move = u & (sokoban_board[{i + 1}][{j}] = Player | sokoban_board[{i + 1}][{j}] = POG) & '
-                    f'(sokoban_board[{i - 1}][{j}] = Floor | sokoban_board[{i - 1}][{j}] = Goal): Player;\n')
-                transition_string += (
-                    f'\t\t\tsokoban_board[{i}][{j}] = Box & move = d & (sokoban_board[{i - 1}][{j}] = Player | sokoban_board[{i - 1}][{j}] = POG) & '
-                    f'(sokoban_board[{i + 1}][{j}] = Floor | sokoban_board[{i + 1}][{j}] = Goal): Player;\n\n')
+                if not analysis.is_dead(i, j - 1):
+                    transition_string += (
+                        f'\t\t\tsokoban_board[{i}][{j}] = Box & move = l & (sokoban_board[{i}][{j + 1}] = Player | sokoban_board[{i}][{j + 1}] = POG) & '
+                        f'(sokoban_board[{i}][{j - 1}] = Floor | sokoban_board[{i}][{j - 1}] = Goal): Player;\n')
+                if not analysis.is_dead(i, j + 1):
+                    transition_string += (
+                        f'\t\t\tsokoban_board[{i}][{j}] = Box & move = r & (sokoban_board[{i}][{j - 1}] = Player | sokoban_board[{i}][{j - 1}] = POG) & '
+                        f'(sokoban_board[{i}][{j + 1}] = Floor | sokoban_board[{i}][{j + 1}] = Goal): Player;\n')
+                if not analysis.is_dead(i - 1, j):
+                    transition_string += (
+                        f'\t\t\tsokoban_board[{i}][{j}] = Box & move = u & (sokoban_board[{i + 1}][{j}] = Player | sokoban_board[{i + 1}][{j}] = POG) & '
+                        f'(sokoban_board[{i - 1}][{j}] = Floor | sokoban_board[{i - 1}][{j}] = Goal): Player;\n')
+                if not analysis.is_dead(i + 1, j):
+                    transition_string += (
+                        f'\t\t\tsokoban_board[{i}][{j}] = Box & move = d & (sokoban_board[{i - 1}][{j}] = Player | sokoban_board[{i - 1}][{j}] = POG) & '
+                        f'(sokoban_board[{i + 1}][{j}] = Floor | sokoban_board[{i + 1}][{j}] = Goal): Player;\n\n')
 
 
                 # -----------------------------------------------------------------------------------------------
                 #CURRENT STATE : BOG
                 # 1. PLAYER PUSHES BOG
                 transition_string += f'\t\t\t--current: BOG(*) & player pushes box -> next: POG(+) \n'
-                transition_string += (
-                    f'\t\t\tsokoban_board[{i}][{j}] = BOG & move = l & (sokoban_board[{i}][{j + 1}] = Player | sokoban_board[{i}][{j + 1}] = POG) & '
-                    f'(sokoban_board[{i}][{j - 1}] = Floor | sokoban_board[{i}][{j - 1}] = Goal): POG;\n')
-                transition_string += (
-                    f'\t\t\tsokoban_board[{i}][{j}] = BOG & move = r & (sokoban_board[{i}][{j - 1}] = Player | sokoban_board[{i}][{j - 1}] = POG) & '
-                    f'(sokoban_board[{i}][{j + 1}] = Floor | sokoban_board[{i}][{j + 1}] = Goal): POG;\n')
-                transition_string += (
-                    f'\t\t\tsokoban_board[{i}][{j}] = BOG & move = u & (sokoban_board[{i + 1}][{j}] = Player | sokoban_board[{i + 1}][{j}] = POG) & '
-                    f'(sokoban_board[{i - 1}][{j}] = Floor | sokoban_board[{i - 1}][{j}] = Goal): POG;\n')
-                transition_string += (
-                    f'\t\t\tsokoban_board[{i}][{j}] = BOG & move = d & (sokoban_board[{i - 1}][{j}] = Player | sokoban_board[{i - 1}][{j}] = POG) & '
-                    f'(sokoban_board[{i + 1}][{j}] = Floor | sokoban_board[{i + 1}][{j}] = Goal): POG;\n\n')
+                if not analysis.is_dead(i, j - 1):
+                    transition_string += (
+                        f'\t\t\tsokoban_board[{i}][{j}] = BOG & move = l & (sokoban_board[{i}][{j + 1}] = Player | sokoban_board[{i}][{j + 1}] = POG) & '
+                        f'(sokoban_board[{i}][{j - 1}] = Floor | sokoban_board[{i}][{j - 1}] = Goal): POG;\n')
+                if not analysis.is_dead(i, j + 1):
+                    transition_string += (
+                        f'\t\t\tsokoban_board[{i}][{j}] = BOG & move = r & (sokoban_board[{i}][{j - 1}] = Player | sokoban_board[{i}][{j - 1}] = POG) & '
+                        f'(sokoban_board[{i}][{j + 1}] = Floor | sokoban_board[{i}][{j + 1}] = Goal): POG;\n')
+                if not analysis.is_dead(i - 1, j):
+                    transition_string += (
+                        f'\t\t\tsokoban_board[{i}][{j}] = BOG & move = u & (sokoban_board[{i + 1}][{j}] = Player | sokoban_board[{i + 1}][{j}] = POG) & '
+                        f'(sokoban_board[{i - 1}][{j}] = Floor | sokoban_board[{i - 1}][{j}] = Goal): POG;\n')
+                if not analysis.is_dead(i + 1, j):
+                    transition_string += (
+                        f'\t\t\tsokoban_board[{i}][{j}] = BOG & move = d & (sokoban_board[{i - 1}][{j}] = Player | sokoban_board[{i - 1}][{j}] = POG) & '
+                        f'(sokoban_board[{i + 1}][{j}] = Floor | sokoban_board[{i + 1}][{j}] = Goal): POG;\n\n')
 
 
 
@@ -386,8 +537,9 @@ def transition_relation_string_generator(board):
                 transition_string += f'\t\t\tTRUE: sokoban_board[{i}][{j}];\n'
                 transition_string += f'\t\tesac;\n'
                 transition_string += '\n\t\t'
-
-    return transition_string
+                if restrict_domains:
+                    transition_string = restrict_case_block(transition_string, i, j, cell_domain(board, analysis, i, j))
+            yield transition_string
 
 ################ IS SOLVABLE CONDITION STRING ######################
 def solvability_condition_string_generator(board):
@@ -398,37 +550,44 @@ def solvability_condition_string_generator(board):
         Generate the string describing the winning condition
     
     """
-    solvability_condition = ''
-
-    goal_counter=0
-    # Find number of Goals on board (BOG,POG,GOAL)
-    for i in range(len(board)):
-        for j in range(len(board[0])):
-            if board[i][j] == '.' or board[i][j] == '+' or board[i][j] == '*': #GOAL or POG or BOG
-                goal_counter+=1
-    counter=0
+    return ''.join(solvability_condition_fragments(board))
+
+
+def solvability_condition_fragments(board, goals=None):
+    """
+        Input:
+        board: this is a list contsainig the XSB representation of the board
+        goals: (row, col) of the goals the condition requires, every goal of the board when None
+    Output: 
+        Yields the winning condition one goal at a time
+    
+    """
+
+    # Find the Goals on board (BOG,POG,GOAL)
+    goal_cells = [(i, j) for i in range(len(board)) for j in range(len(board[0]))
+                  if board[i][j] in ('.', '+', '*') and (goals is None or (i, j) in goals)]
+    if not goal_cells:
+        yield 'TRUE;\n'
+        return
     # Generate String to define solvability- check if all goals are BOG
-    for i in range(len(board)):
-        for j in range(len(board[0])):
-            if board[i][j] == '.' or board[i][j] == '+' or board[i][j] == '*': #GOAL or POG or BOG
-                    counter+=1
-                    if counter < goal_counter:
-                        solvability_condition += f'sokoban_board[{i}][{j}] = BOG & \n\t'  # Not the last '.' in the board
-                    elif counter==goal_counter:
-                        solvability_condition += f'sokoban_board[{i}][{j}] = BOG ;\n'  # Last '.' in the board
-                        break
-        if counter==goal_counter:
-            break
-    return solvability_condition
+    for counter, (i, j) in enumerate(goal_cells, start=1):
+        if counter < len(goal_cells):
+            yield f'sokoban_board[{i}][{j}] = BOG & \n\t'  # Not the last '.' in the board
+        else:
+            yield f'sokoban_board[{i}][{j}] = BOG ;\n'  # Last '.' in the board
 
 def write_to_file(path, smv_string):
     """
     input: path: the path to the file where the SMV model will be written.
-    param smv_string: the SMV model as a string to be written to the file.
+    param smv_string: the SMV model as a string, or an iterable of fragments (see smv_fragments_generator)
+        which are written as they are generated.
     output: write the smv_string to the file in path
     """
     with open(path, "w") as smv_model_file:
-        smv_model_file.write(smv_string)
+        if isinstance(smv_string, str):
+            smv_model_file.write(smv_string)
+        else:
+            smv_model_file.writelines(smv_string)
 
 
 
@@ -1,9 +1,26 @@
 
 import argparse
+import io
+import math
 import subprocess
 import os
 import re
+import sys
+import time
 import tkinter as tk
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import board_analysis
+import bmc_driver
+from board import Board
+import nuxmv_session
+import trace_parser
+
+# Goal specification encodings:
+# coverage      - one "some box is on this goal" disjunction per goal and a count() over them,
+#                 grows with boxes x goals
+# combinatorial - the original spec, every subset of boxes times every permutation of goals,
+#                 grows factorially
+SPEC_ENCODINGS = ('coverage', 'combinatorial')
 class sokoban_smv_generator():
     def __init__(self, input_board):
         self.input_board = input_board.strip().splitlines()
@@ -12,114 +29,111 @@ class sokoban_smv_generator():
         self.boxes = []  # List of [x, y] positions for boxes
         self.goals = []  # List of [x, y] positions for goals
         self.gen_board()
+        # reachable cells and dead squares of the board, used to prune the actions of the person
+        self.analysis = board_analysis.analyze_board(input_board)
         self.N = len(self.board)
         self.M = len(self.board[0]) if self.board else 0  # Ensure correct width after gen_board
-        self.res = "MODULE main\n"
+        # the model text is written to res (a file or a StringIO) while it is generated
+        self.res = None
 
     def gen_board(self):
-        for y, row in enumerate(self.input_board):
-            board_row = []
-            for x, char in enumerate(row):
-                if char == '#':
-                    board_row.append(1)
-                elif char == '-':
-                    board_row.append(0)  # Explicit floor handling
-                elif char == '.' or char == '*' or char == '+':
-                    board_row.append(0)  # Goal, but treated as floor for this purpose
-                    self.goals.append([x, y])
-                else:
-                    board_row.append(0)  # Treat all other characters as floor by default
-
-                if char == '@'  or char == '+':
-                    self.player = [x, y]
-                elif char == '$' or char == '*':
-                    self.boxes.append([x, y])
-                
-            self.board.append(board_row)
+        board = Board.from_rows(self.input_board)
+        # 1 for walls, 0 for every other cell (goals, boxes and the player stand on floor), rows keep their length
+        self.board = [row[:width] for row, width in zip(board.walls.astype(int).tolist(), board.widths())]
+        self.goals = [[x, y] for y, x in board.positions(board.goals)]
+        self.boxes = [[x, y] for y, x in board.positions(board.boxes)]
+        if board.player is not None:
+            self.player = [board.player[1], board.player[0]]
 
     def DEFINE_gen(self):
-      self.res += "DEFINE\n"
-      self.res += "  -- 1 represents wall, 0 represents an empty tile\n"
-      self.res += "  grid := " + str(self.board).replace('[', '[').replace(']', ']') + ";\n"
-      self.res += "  N := " + str(self.N) + ";\n"
-      self.res += "  M := " + str(self.M) + ";\n"
+      self.res.write("DEFINE\n")
+      self.res.write("  -- 1 represents wall, 0 represents an empty tile\n")
+      self.res.write("  grid := " + str(self.board).replace('[', '[').replace(']', ']') + ";\n")
+      self.res.write("  N := " + str(self.N) + ";\n")
+      self.res.write("  M := " + str(self.M) + ";\n")
+      # 1 represents a dead square, a box pushed there can not reach any goal
+      dead_squares = [[int(self.analysis.is_dead(i, j)) for j in range(self.analysis.columns)] for i in range(self.analysis.rows)]
+      self.res.write("  dead := " + str(dead_squares) + ";\n")
+      box_on_dead = [f"dead[i_box{i+1}][j_box{i+1}] = 1" for i in range(len(self.boxes))]
+      self.res.write("  box_on_dead_square := " + (" | ".join(box_on_dead) if box_on_dead else "FALSE") + ";\n")
 
       for index, goal in enumerate(self.goals):
-          self.res += f"  i_box_goal{index+1} := {goal[1]};\n"  # j index is now i in SMV (column to row)
-          self.res += f"  j_box_goal{index+1} := {goal[0]};\n"  # i index is now j in SMV (row to column)
+          self.res.write(f"  i_box_goal{index+1} := {goal[1]};\n")  # j index is now i in SMV (column to row)
+          self.res.write(f"  j_box_goal{index+1} := {goal[0]};\n")  # i index is now j in SMV (row to column)
 
     def VAR_gen(self):
-        self.res += "VAR\n"
-        self.res += f"  i_person : 0..{self.N-1};\n"
-        self.res += f"  j_person : 0..{self.M-1};\n"
+        self.res.write("VAR\n")
+        self.res.write(f"  i_person : 0..{self.N-1};\n")
+        self.res.write(f"  j_person : 0..{self.M-1};\n")
 
         # Generate variable definitions for each box
         for i in range(len(self.boxes)):
-            self.res += f"  i_box{i+1} : 0..{self.N-1};\n"
-            self.res += f"  j_box{i+1} : 0..{self.M-1};\n"
+            self.res.write(f"  i_box{i+1} : 0..{self.N-1};\n")
+            self.res.write(f"  j_box{i+1} : 0..{self.M-1};\n")
 
-        self.res += "  action_person : {no-action, up, down, left, right};\n"
-        self.res += "  boxes_overlap : boolean;\n"
-        self.res += "  box_on_wall : boolean;\n"
-        self.res += "  man_on_box : boolean;\n"
-        self.res += "  man_on_wall : boolean;\n"
+        self.res.write("  action_person : {no-action, up, down, left, right};\n")
+        self.res.write("  boxes_overlap : boolean;\n")
+        self.res.write("  box_on_wall : boolean;\n")
+        self.res.write("  man_on_box : boolean;\n")
+        self.res.write("  man_on_wall : boolean;\n")
 
     def ASSIGN_gen(self):
-        self.res += "ASSIGN\n"
+        self.res.write("ASSIGN\n")
         # Initialize player and box positions
-        self.res += f"  init(i_person) := {self.player[1]};\n"
-        self.res += f"  init(j_person) := {self.player[0]};\n"
+        self.res.write(f"  init(i_person) := {self.player[1]};\n")
+        self.res.write(f"  init(j_person) := {self.player[0]};\n")
 
         for i, box in enumerate(self.boxes):
-            self.res += f"  init(i_box{i+1}) := {box[1]};\n"
-            self.res += f"  init(j_box{i+1}) := {box[0]};\n"
+            self.res.write(f"  init(i_box{i+1}) := {box[1]};\n")
+            self.res.write(f"  init(j_box{i+1}) := {box[0]};\n")
 
-        self.res += "  init(action_person) := {no-action};\n"
-        self.res += "  init(boxes_overlap) := FALSE;\n"
-        self.res += "  init(box_on_wall) := FALSE;\n"
-        self.res += "  init(man_on_box) := FALSE;\n"
-        self.res += "  init(man_on_wall) := FALSE;\n"
+        self.res.write("  init(action_person) := {no-action};\n")
+        self.res.write("  init(boxes_overlap) := FALSE;\n")
+        self.res.write("  init(box_on_wall) := FALSE;\n")
+        self.res.write("  init(man_on_box) := FALSE;\n")
+        self.res.write("  init(man_on_wall) := FALSE;\n")
 
         # Define next states for man_on_wall
-        self.res += "  next(man_on_wall) := case\n"
-        self.res += f"    grid[i_person][j_person] = 1 : TRUE;\n"
-        self.res += "    TRUE : FALSE;\n"
-        self.res += "  esac;\n"
+        self.res.write("  next(man_on_wall) := case\n")
+        self.res.write(f"    grid[i_person][j_person] = 1 : TRUE;\n")
+        self.res.write("    TRUE : FALSE;\n")
+        self.res.write("  esac;\n")
 
         # Define next states for man_on_box
-        self.res += "  next(man_on_box) := case\n"
+        self.res.write("  next(man_on_box) := case\n")
         for i in range(len(self.boxes)):
-            self.res += f"    (i_person = i_box{i+1}) & (j_person = j_box{i+1}) : TRUE;\n"
-        self.res += "    TRUE : FALSE;\n"
-        self.res += "  esac;\n"
+            self.res.write(f"    (i_person = i_box{i+1}) & (j_person = j_box{i+1}) : TRUE;\n")
+        self.res.write("    TRUE : FALSE;\n")
+        self.res.write("  esac;\n")
 
         # Define next states for box_on_wall
-        self.res += "  next(box_on_wall) := case\n"
+        self.res.write("  next(box_on_wall) := case\n")
         for i in range(len(self.boxes)):
-            self.res += f"    grid[i_box{i+1}][j_box{i+1}] = 1 : TRUE;\n"
-        self.res += "    TRUE : FALSE;\n"
-        self.res += "  esac;\n"
+            self.res.write(f"    grid[i_box{i+1}][j_box{i+1}] = 1 : TRUE;\n")
+        self.res.write("    TRUE : FALSE;\n")
+        self.res.write("  esac;\n")
 
         # Define next states for boxes_overlap
-        self.res += "  next(boxes_overlap) := case\n"
+        self.res.write("  next(boxes_overlap) := case\n")
         for i in range(len(self.boxes)):
             for j in range(i + 1, len(self.boxes)):
-                self.res += f"    (i_box{i+1} = i_box{j+1}) & (j_box{i+1} = j_box{j+1}) : TRUE;\n"
-        self.res += "    TRUE : FALSE;\n"
-        self.res += "  esac;\n"
+                self.res.write(f"    (i_box{i+1} = i_box{j+1}) & (j_box{i+1} = j_box{j+1}) : TRUE;\n")
+        self.res.write("    TRUE : FALSE;\n")
+        self.res.write("  esac;\n")
 
         # Define next states for action_person considering walls
-        self.res += "  next(action_person) := case\n"
-        self.res += "    boxes_overlap : {no-action};\n"
-        self.res += "    box_on_wall : {no-action};\n"
-        self.res += "    man_on_box : {no-action};\n"
-        self.res += "    man_on_wall : {no-action};\n"
+        self.res.write("  next(action_person) := case\n")
+        self.res.write("    boxes_overlap : {no-action};\n")
+        self.res.write("    box_on_wall : {no-action};\n")
+        self.res.write("    man_on_box : {no-action};\n")
+        self.res.write("    man_on_wall : {no-action};\n")
+        self.res.write("    box_on_dead_square : {no-action};\n")
 
         # Generate dynamic actions based on the player's position and nearby walls
         for i in range(self.N):
             for j in range(self.M):
                 actions = []
-                if self.board[i][j] == 0:  # Only consider actions if the current cell is not a wall
+                if self.analysis.is_reachable(i, j) and self.board[i][j] == 0:  # Only consider actions if the person can reach the cell and it is not a wall
                     if i > 0 and self.board[i-1][j] == 0:  # Up
                         actions.append("up")
                     if i < self.N - 1 and self.board[i+1][j] == 0:  # Down
@@ -131,42 +145,62 @@ class sokoban_smv_generator():
 
                 # Add actions for this specific position
                 if actions:
-                    self.res += f"    (i_person = {i}) & (j_person = {j}) : {{{', '.join(actions)}}};\n"
+                    self.res.write(f"    (i_person = {i}) & (j_person = {j}) : {{{', '.join(actions)}}};\n")
 
-        self.res += "    TRUE : {no-action};\n"  # Default case if no other conditions match
-        self.res += "  esac;\n"
+        self.res.write("    TRUE : {no-action};\n")  # Default case if no other conditions match
+        self.res.write("  esac;\n")
         for i in range(len(self.boxes)):
             # Next state for box i along the x-axis
-            self.res += f"  next(i_box{i+1}) := case\n"
-            self.res += f"    (next(action_person) = down) & (i_box{i+1} = i_person + 1) & (j_box{i+1} = j_person) & (i_box{i+1} + 1 < N) : i_box{i+1} + 1;\n"
-            self.res += f"    (next(action_person) = up) & (i_box{i+1} = i_person - 1) & (j_box{i+1} = j_person) & (i_box{i+1} - 1 >= 0) : i_box{i+1} - 1;\n"
-            self.res += f"    TRUE : i_box{i+1};\n"
-            self.res += f"  esac;\n"
+            self.res.write(f"  next(i_box{i+1}) := case\n")
+            self.res.write(f"    (next(action_person) = down) & (i_box{i+1} = i_person + 1) & (j_box{i+1} = j_person) & (i_box{i+1} + 1 < N) : i_box{i+1} + 1;\n")
+            self.res.write(f"    (next(action_person) = up) & (i_box{i+1} = i_person - 1) & (j_box{i+1} = j_person) & (i_box{i+1} - 1 >= 0) : i_box{i+1} - 1;\n")
+            self.res.write(f"    TRUE : i_box{i+1};\n")
+            self.res.write(f"  esac;\n")
 
             # Next state for box i along the y-axis
-            self.res += f"  next(j_box{i+1}) := case\n"
-            self.res += f"     (next(action_person) = right) & (i_box{i+1} = i_person) & (j_box{i+1} = j_person + 1) & (j_box{i+1} + 1 < M) : j_box{i+1} + 1;\n"
-            self.res += f"    (next(action_person) = left) & (i_box{i+1} = i_person) & (j_box{i+1} = j_person - 1) & (j_box{i+1} - 1 >= 0) : j_box{i+1} - 1;\n"
-            self.res += f"    TRUE : j_box{i+1};\n"
-            self.res += f"  esac;\n"
+            self.res.write(f"  next(j_box{i+1}) := case\n")
+            self.res.write(f"     (next(action_person) = right) & (i_box{i+1} = i_person) & (j_box{i+1} = j_person + 1) & (j_box{i+1} + 1 < M) : j_box{i+1} + 1;\n")
+            self.res.write(f"    (next(action_person) = left) & (i_box{i+1} = i_person) & (j_box{i+1} = j_person - 1) & (j_box{i+1} - 1 >= 0) : j_box{i+1} - 1;\n")
+            self.res.write(f"    TRUE : j_box{i+1};\n")
+            self.res.write(f"  esac;\n")
 
         # Define next states for moving the player
-        self.res += "  next(i_person) := case\n"
-        self.res += "    (next(action_person) = down) & (i_person + 1 < N) : i_person + 1;\n"
-        self.res += "    (next(action_person) = up) & (i_person - 1 >= 0) : i_person - 1;\n"
-        self.res += "    TRUE : i_person;\n"
-        self.res += "  esac;\n"
-
-        self.res += "  next(j_person) := case\n"
-        self.res += "    (next(action_person) = right) & (j_person + 1 < M) : j_person + 1;\n"
-        self.res += "    (next(action_person) = left) & (j_person - 1 >= 0) : j_person - 1;\n"
-        self.res += "    TRUE : j_person;\n"
-        self.res += "  esac;\n"
-
-
-    def SPEC_gen(self, num_boxes):
+        self.res.write("  next(i_person) := case\n")
+        self.res.write("    (next(action_person) = down) & (i_person + 1 < N) : i_person + 1;\n")
+        self.res.write("    (next(action_person) = up) & (i_person - 1 >= 0) : i_person - 1;\n")
+        self.res.write("    TRUE : i_person;\n")
+        self.res.write("  esac;\n")
+
+        self.res.write("  next(j_person) := case\n")
+        self.res.write("    (next(action_person) = right) & (j_person + 1 < M) : j_person + 1;\n")
+        self.res.write("    (next(action_person) = left) & (j_person - 1 >= 0) : j_person - 1;\n")
+        self.res.write("    TRUE : j_person;\n")
+        self.res.write("  esac;\n")
+
+
+    def SPEC_gen(self, num_boxes, spec_encoding="coverage"):
+        if spec_encoding == "combinatorial":
+            self.SPEC_gen_combinatorial(num_boxes)
+        else:
+            self.SPEC_gen_coverage(num_boxes)
+
+    def SPEC_gen_coverage(self, num_boxes):
+        # goal{k}_covered is TRUE when some box stands on goal k
+        self.res.write("DEFINE\n")
+        for index, goal in enumerate(self.goals):
+            # goal[1] is the row index and goal[0] is the column index for the SMV specification
+            box_on_goal = [f"(i_box{box+1} = {goal[1]} & j_box{box+1} = {goal[0]})" for box in range(len(self.boxes))]
+            self.res.write(f"  goal{index+1}_covered := {' | '.join(box_on_goal) if box_on_goal else 'FALSE'};\n")
+        covered_goals = ", ".join(f"goal{index+1}_covered" for index in range(len(self.goals)))
+        # count() needs at least one argument, a board without goals covers none
+        self.res.write(f"  goals_covered := {f'count({covered_goals})' if self.goals else '0'};\n")
+
+        self.res.write("LTLSPEC ")
+        self.res.write(f"G!((!next(man_on_box) & !next(man_on_wall) & !next(box_on_wall) & !next(boxes_overlap)) & goals_covered >= {num_boxes});\n")
+
+    def SPEC_gen_combinatorial(self, num_boxes):
         import itertools
-        self.res += "LTLSPEC "
+        self.res.write("LTLSPEC ")
 
         # Generate all subsets of goal indices with the size num_boxes
         goal_subsets = list(itertools.combinations(range(len(self.goals)), num_boxes))
@@ -174,26 +208,73 @@ class sokoban_smv_generator():
         # Generate all permutations of the goals
         goal_permutations = list(itertools.permutations(self.goals, num_boxes))
 
-        spec_conditions = []
+        # the disjunction is written one conjunction at a time, it grows factorially with the goals
+        self.res.write("G!((!next(man_on_box) & !next(man_on_wall) & !next(box_on_wall) & !next(boxes_overlap)) & ")
+        separator = ""
         for subset in goal_subsets:
-            condition_groups = []
             for perm in goal_permutations:
                 conditions = []
                 for i, goal in enumerate(perm):
                     # goal[1] is the row index and goal[0] is the column index for the SMV specification
                     conditions.append(f"(i_box{subset[i]+1} = {goal[1]}) & (j_box{subset[i]+1} = {goal[0]})")
-                condition_groups.append("(" + " & ".join(conditions) + ")")
-            spec_conditions.append(" | ".join(condition_groups))
-
-        spec_condition = " | ".join(spec_conditions)
-        self.res += f"G!((!next(man_on_box) & !next(man_on_wall) & !next(box_on_wall) & !next(boxes_overlap)) & {spec_condition});\n"
-    def generate_and_get_board(self,NumOfBoxes):
-        # Run code generation methods
+                self.res.write(separator + "(" + " & ".join(conditions) + ")")
+                separator = " | "
+        self.res.write(");\n")
+    def generate(self, out, NumOfBoxes, spec_encoding="coverage"):
+        # Run code generation methods, every fragment is written to out as soon as it is built
+        self.res = out
+        self.res.write("MODULE main\n")
         self.DEFINE_gen()
         self.VAR_gen()
         self.ASSIGN_gen()
-        self.SPEC_gen(NumOfBoxes)
-        return self.res
+        self.SPEC_gen(NumOfBoxes,spec_encoding)
+        self.res = None
+
+    def generate_and_get_board(self,NumOfBoxes,spec_encoding="coverage"):
+        buffer = io.StringIO()
+        self.generate(buffer, NumOfBoxes, spec_encoding)
+        return buffer.getvalue()
+
+    def generate_model_file(self, model_filename, NumOfBoxes, spec_encoding="coverage"):
+        # streams the model straight to the .smv file
+        with open(model_filename, "w") as f:
+            self.generate(f, NumOfBoxes, spec_encoding)
+        return model_filename
+
+
+def combinatorial_spec_size(num_goals, num_boxes):
+    """Number of conjunctions the combinatorial spec holds: C(goals, n) * P(goals, n)"""
+    return math.comb(num_goals, num_boxes) * math.perm(num_goals, num_boxes)
+
+
+def compare_spec_encodings(board_path, run_checks=False, max_combinatorial_size=100000):
+    """
+    Compares the coverage spec against the combinatorial spec for every number of boxes of the board.
+    Prints the model size and generation time of both encodings, with run_checks the BDD
+    runtime of both models as well.
+    The combinatorial model is skipped when its spec holds more than max_combinatorial_size conjunctions.
+    """
+    with open(board_path, 'r') as file:
+        board = file.read()
+    num_boxes = board.count('*') + board.count('$')
+    num_goals = board.count('.') + board.count('*') + board.count('+')
+    print(f"Board {board_path}: {num_boxes} boxes, {num_goals} goals")
+    session_pool = nuxmv_session.NuXmvSessionPool(size=1) if run_checks else None
+    for boxes_to_solve in range(1, num_boxes + 1):
+        for spec_encoding in SPEC_ENCODINGS:
+            if spec_encoding == "combinatorial" and combinatorial_spec_size(num_goals, boxes_to_solve) > max_combinatorial_size:
+                print(f"  {boxes_to_solve} boxes {spec_encoding}: skipped, {combinatorial_spec_size(num_goals, boxes_to_solve)} conjunctions")
+                continue
+            generation_start = time.time()
+            smv_string = sokoban_smv_generator(board).generate_and_get_board(boxes_to_solve, spec_encoding)
+            generation_time = time.time() - generation_start
+            print(f"  {boxes_to_solve} boxes {spec_encoding}: {len(smv_string)} characters, generated in {generation_time:.5f} seconds")
+            if run_checks:
+                model_filename = generate_model_file(smv_string, f"{boxes_to_solve}_{spec_encoding}")
+                print("  " + results_runtime_BDD(model_filename, session_pool).strip())
+    if session_pool is not None:
+        session_pool.close()
+
 def run_nuxmv(model_filename):
     commands = f""" 
 read_model -i {model_filename}
@@ -257,49 +338,64 @@ check_ltlspec_bmc
     return output_filename,LURD
 
 
+def model_file_name(iteration):
+    return f"result_model_for_iteration_{iteration}.smv"
+
 def generate_model_file(model_string,iteration):
-    model_filename = f"result_model_for_iteration_{iteration}.smv"
+    model_filename = model_file_name(iteration)
     with open(model_filename, "w") as f:
         f.write(model_string)
     return model_filename
 
-def results_runtime_SAT(model_filename): 
-    # Define the sequence of commands to run in nuXmv
-    commands = f""" 
-read_model -i {model_filename}
-go_bmc
-check_ltlspec_bmc -k 40
-time
-"""
+def iter_interactive_commands(model_filename, commands, session_pool=None):
+    """
+    Reads the model and runs the commands in interactive nuXmv, yields the output line by line as nuXmv writes it.
+    With a session_pool (nuxmv_session.NuXmvSessionPool) a running nuXmv process is reset and reused.
+    """
+    # "time" before the commands restarts the elapse counter of a reused process
+    commands = ["time"] + commands
+    if session_pool is not None:
+        yield from session_pool.iter_run(model_filename, commands)
+        return
 
     # Start nuXmv in interactive mode and send commands
-    process = subprocess.Popen(['nuXmv', '-int'], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    output, errors = process.communicate(input=commands)
-    output_lines = output.strip().split('\n')
-    last_command_output = []
-    for line in reversed(output_lines):
-        if line.startswith('-- specification'):
-            break
-        last_command_output.append(line)
-    last_command_output.reverse()
-    last_command_output = '\n'.join(last_command_output)
-    
-    
-    # Define the output filename
-    output_filename = "output_sat.out"
+    process = subprocess.Popen(['nuXmv', '-int'], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    process.stdin.write("\n".join([f"read_model -i {model_filename}"] + commands) + "\n")
+    process.stdin.close()
+    yield from process.stdout
+    process.wait()
 
-    # Save the output after check_ltlspec_bmc to the output file
-    with open(output_filename, "w") as f:
-        f.write(last_command_output)
+#Largest bound of the SAT check, the bound grows from the lower bound of the board up to it
+SAT_MAX_BOUND = 40
+
+def results_runtime_SAT(model_filename, session_pool=None, lower_bound=0, time_budget=None): 
+    # Check one bound at a time in one nuXmv session, from the lower bound up, and stop at the first counterexample
+    bmc = bmc_driver.IncrementalBmc(lower_bound, SAT_MAX_BOUND, time_budget, setup_commands=["time", "go_bmc"], final_commands=["time"])
+    pool = session_pool if session_pool is not None else nuxmv_session.NuXmvSessionPool(size=1)
 
     # Regex to find the final elapsed time and total time after check_ltlspec_bmc
-    time_pattern = r"elapse: (\d+\.\d+) seconds, total: (\d+\.\d+) seconds"
-    time_match = re.search(time_pattern, output)
-    
-    # Regex to find the last checked bound
-    bound_pattern = r"-- no counterexample found with bound (\d+)"
-    bound_matches = re.findall(bound_pattern, output)
-    final_bound = bound_matches[-1] if bound_matches else 'unknown'
+    time_pattern = re.compile(r"elapse: (\d+\.\d+) seconds, total: (\d+\.\d+) seconds")
+    time_match = None
+
+    # Define the output filename
+    output_filename = "output_sat.out"
+
+    # Save the output after check_ltlspec_bmc to the output file, line by line as nuXmv writes it
+    try:
+        with open(output_filename, "w") as f:
+            for line in bmc.iter_run(pool, model_filename):
+                # the last "time" is the one after the check
+                time_match = time_pattern.search(line) or time_match
+                if trace_parser.SPECIFICATION_PATTERN.search(line):
+                    # keep only the output after the last specification
+                    f.seek(0)
+                    f.truncate()
+                    continue
+                f.write(line)
+    finally:
+        if session_pool is None:
+            pool.close()
+    final_bound = 'unknown' if bmc.bound is None else bmc.bound
 
     # Extract the elapsed and total time if available
     if time_match:
@@ -310,7 +406,8 @@ time
         total_time = 'unknown'
 
     # Compile results into a result string
-    result_string = f"Runtime after check_ltlspec_bmc -k 30: {elapsed_time} seconds (Total time: {total_time} seconds)\nLast checked bound: {final_bound}"
+    budget_note = " (time budget ran out)" if bmc.timed_out else ""
+    result_string = f"Runtime after check_ltlspec_bmc_onepb from bound {bmc.lower_bound}: {elapsed_time} seconds (Total time: {total_time} seconds)\nLast checked bound: {final_bound}{budget_note}"
     
     return result_string, output_filename
 
@@ -352,26 +449,16 @@ time
     result_string = f"Runtime after check_ltlspec_bmc -k 30: {elapsed_time} seconds (Total time: {total_time} seconds)\nLast checked bound: {final_bound}"
     return result_string
 
-def results_runtime_BDD(model_filename): # sets BDD engine
+def results_runtime_BDD(model_filename, session_pool=None): # sets BDD engine
     # Define the sequence of commands to run in nuXmv
-    commands = f""" 
-read_model -i {model_filename}
-go
-check_ltlspec
-time
-"""
-
-    # Start nuXmv in interactive mode and send commands
-    process = subprocess.Popen(['nuXmv', '-int'], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    output, errors = process.communicate(input=commands)
-
-    # Optionally print outputs for debugging
-    #print("Output:\n", output)
-    #print("Errors:\n", errors)
+    commands = ["go", "check_ltlspec", "time"]
 
     # Regex to find the final elapsed time and total time after check_ltlspec_bmc
-    time_pattern = r"elapse: (\d+\.\d+) seconds, total: (\d+\.\d+) seconds"
-    time_match = re.search(time_pattern, output)
+    time_pattern = re.compile(r"elapse: (\d+\.\d+) seconds, total: (\d+\.\d+) seconds")
+    time_match = None
+    for line in iter_interactive_commands(model_filename, commands, session_pool):
+        # the last "time" is the one after the check
+        time_match = time_pattern.search(line) or time_match
 
     # Extract the elapsed and total time if available
     if time_match:
@@ -390,11 +477,11 @@ time
 #def results_runtime_SAT(model_filename):
 #    return "template string SAT"    
 
-def generate_result_file(model_filename ,iteration , check_bdd):
+def generate_result_file(model_filename ,iteration , check_bdd, session_pool=None, lower_bound=0, time_budget=None):
     runtime_BDD = "check bdd to generate bdd results"
     if check_bdd:
-        runtime_BDD = results_runtime_BDD(model_filename)
-    runtime_SAT,output_filename = results_runtime_SAT(model_filename)
+        runtime_BDD = results_runtime_BDD(model_filename, session_pool)
+    runtime_SAT,output_filename = results_runtime_SAT(model_filename, session_pool, lower_bound, time_budget)
     LURD = result_to_LURD(output_filename)
     #if len(LURD)>2:
     #   LURD = LURD[:-2]
@@ -413,10 +500,9 @@ def generate_result_file(model_filename ,iteration , check_bdd):
     return LURD
         
 def result_to_LURD(output_filename):
-    # Open the file containing the nuXmv output
-    with open(output_filename, 'r') as file:
-        lines = file.readlines()
-    
+    # Map the action string to the corresponding direction character, None for 'no-action' or unrecognized actions
+    action_letters = {"left": 'L', "right": 'R', "up": 'U', "down": 'D'}
+
     # Variable to store the final sequence of actions
     lurd_sequence = []
     
@@ -424,37 +510,25 @@ def result_to_LURD(output_filename):
     last_action = None
     action_count = 0
 
-    # Loop through each line in the file
-    for line in lines:
-        if "action_person" in line:
-            action = line.split('=')[-1].strip()
-            
-            # Map the action string to the corresponding direction character
-            if action == "left":
-                action = 'L'
-            elif action == "right":
-                action = 'R'
-            elif action == "up":
-                action = 'U'
-            elif action == "down":
-                action = 'D'
-            else:
-                action = None  # For 'no-action' or unrecognized actions
-            
-            if last_action and action != last_action:
-                # Append the accumulated action sequence
-                lurd_sequence.append(last_action * action_count)
-                # Reset the count for the new action
-                action_count = 0
-            
-            # Update the last action seen
-            last_action = action
-        
-        if "-> State:" in line:
+    # Read the nuXmv output state by state, the file is parsed while it is read
+    with open(output_filename, 'r') as file:
+        for state in trace_parser.TraceParser(file).states():
             if last_action:
                 # Count continuity of the same action until a change occurs
                 action_count += 1
 
+            if "action_person" in state.values:
+                action = action_letters.get(state.values["action_person"])
+                
+                if last_action and action != last_action:
+                    # Append the accumulated action sequence
+                    lurd_sequence.append(last_action * action_count)
+                    # Reset the count for the new action
+                    action_count = 0
+                
+                # Update the last action seen
+                last_action = action
+
     # Handle the last sequence after the loop ends
     if last_action and action_count:
         lurd_sequence.append(last_action * action_count)
@@ -538,7 +612,7 @@ class Sokoban_mover:
     
     
     
-def main(board_path='boards/board6.txt',iterative = False , check_bdd = False):
+def main(board_path='boards/board6.txt',iterative = False , check_bdd = False, spec_encoding = "coverage", bmc_budget = None):
     
         with open(board_path,'r') as file:
             board=file.read()
@@ -548,11 +622,13 @@ def main(board_path='boards/board6.txt',iterative = False , check_bdd = False):
         if iterative == True:
             print(iterative==True)
             start = 1
+        # one nuXmv process serves all the checks, it is reset between models
+        session_pool = nuxmv_session.NuXmvSessionPool(size=1)
         for i in range(start, NumOfBoxes + 1):
             generator = sokoban_smv_generator(board)
-            smv_string = generator.generate_and_get_board(i)  # input: numofboxes to solve
-            model_filename = generate_model_file(smv_string, i)
-            LURD = generate_result_file(model_filename, i ,check_bdd)  # result filename should be according to iteration
+            model_filename = generator.generate_model_file(model_file_name(i), i, spec_encoding)  # input: numofboxes to solve
+            lower_bound = bmc_driver.lower_bound(board, i)  # no i boxes reach goals in fewer steps
+            LURD = generate_result_file(model_filename, i ,check_bdd, session_pool, lower_bound, bmc_budget)  # result filename should be according to iteration
             sokoban_mover = Sokoban_mover(board)
             sokoban_mover.process_moves(LURD)
             board = sokoban_mover.get_board()  # Update the board
@@ -562,8 +638,9 @@ def main(board_path='boards/board6.txt',iterative = False , check_bdd = False):
             else:
                 print("Solution:None!")
                 print("Board unsolveable!")
+        session_pool.close()
 
-        print(f"Process completed with Iterative: {iterative} and Check BDD: {check_bdd}")
+        print(f"Process completed with Iterative: {iterative} and Check BDD: {check_bdd} Spec: {spec_encoding}")
     
 
 if __name__ == "__main__":
@@ -576,6 +653,9 @@ if __name__ == "__main__":
     # Optional arguments with enforced choices
     parser.add_argument('-ITERATIVE', '--iterative_mode', type=str, choices=['True', 'False'], default='False', help='Enable iterative mode (true or false)')
     parser.add_argument('-BDD', '--bdd', type=str, choices=['True', 'False'], default='False', help='Run BDD engine (true or false)')
+    parser.add_argument('-SPEC', '--spec_encoding', type=str, choices=SPEC_ENCODINGS, default='coverage', help='Encoding of the goal specification')
+    parser.add_argument('-BMC_BUDGET', '--bmc_budget', type=float, default=None, help=f'Seconds the SAT engine may deepen its bound (it stops at bound {SAT_MAX_BOUND} in any case), the bound reached is reported when they run out')
+    parser.add_argument('-COMPARE_SPEC', '--compare_spec', type=str, choices=['True', 'False'], default='False', help='Compare the spec encodings on the board instead of solving it (true or false)')
 
     args = parser.parse_args()
 
@@ -584,8 +664,11 @@ if __name__ == "__main__":
     # Convert 'true'/'false' string to a boolean
     bdd = args.bdd.lower() == 'true'
 
-    # Call main with the parsed arguments
-    main(args.board_path, iterative_mode, bdd)
+    if args.compare_spec.lower() == 'true':
+        compare_spec_encodings(args.board_path, run_checks=bdd)
+    else:
+        # Call main with the parsed arguments
+        main(args.board_path, iterative_mode, bdd, args.spec_encoding, args.bmc_budget)
 
 
 
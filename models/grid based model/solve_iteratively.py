@@ -1,7 +1,15 @@
 from smv_file_generator import *
+import os
+import sys
 import time
 import run_nuXmv
-import re
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import model_files
+import nuxmv_session
+import trace_parser
+import goal_planner
+import checkpoint
+import hashlib
 
 SYMBOL_MAPPING = {
     'Wall': '#',
@@ -13,39 +21,6 @@ SYMBOL_MAPPING = {
     'Floor': '-'
 }
 
-def extract_lines_between_states(nuXmv_output):
-    """
-    This function processes a string output from the nuXmv model checker,
-    extracting and yielding lists of lines that occur between "State" markers.
-
-    Input:
-        A single string (nuXmv_output) containing the output from nuXmv,
-        with each line separated by a newline character (\n).
-
-    Output:
-        A generator that yields lists of lines found between occurrences of lines containing the word "State".
-        Each yielded list represents the lines between consecutive "State" markers in the input.
-
-    """
-
-    lines_between = []
-    is_between_states = False
-
-    for output_line in nuXmv_output.split('\n'):
-        if 'State' in output_line:
-            if not is_between_states:
-                lines_between = []
-                is_between_states = True
-            else:
-                yield lines_between
-                lines_between = []
-        elif is_between_states:
-            lines_between.append(output_line)
-
-    if is_between_states:
-        yield lines_between
-
-
 def extract_goal_positions(sokoban_board_file):
 
     """
@@ -70,72 +45,59 @@ def extract_goal_positions(sokoban_board_file):
 
     return goal_positions, board_lines
 
-def identify_changes(state_lines):
-    """
-    This function processes lines representing states in a Sokoban board and
-    identifies changes in the board state, excluding walls, returning a list of these changes.
-
-
-    Input:
-        A list of strings (state_lines) where each string represents a line from the state description of the Sokoban board.
-    Output:
-        changes_list: A list of lists, where each inner list contains tuples.
-        Each tuple represents a change in the board state,
-        extracted from the state lines, in the form of row index,
-        column index, and the new state of the cell.
-
-"""
-    changes_list = []
-
-    for state_line in state_lines:
-        if "sokoban_board" in state_line and "Wall" not in state_line:
-            changes_list.append(re.findall(r'\[([0-9]+)\]\[([0-9]+)\] = (\w+)', state_line))
-
-    return changes_list
-
-
-def generate_smv(sokoban_goals, board_data):
+def generate_smv(sokoban_goals, board_data, restrict_domains=False):
 
     """
     This function generates an SMV (Symbolic Model Verification) model for a Sokoban board, including its initial state,
     transition rules, and solvability conditions, and returns the resulting SMV model as a string.
 
     Input:
-        sokoban_goals: A list of goal positions on the Sokoban board (not explicitly used in the function).
+        sokoban_goals: A list of goal positions on the Sokoban board, the goals that must hold boxes in the winning state.
         board_data: A list of lists representing the Sokoban board, where each inner list corresponds to a row of the board.
+        restrict_domains: declare only the cells the player can reach, each with the values it can hold.
     Output:
         smv_text: A string containing the SMV model for the given Sokoban board,
         including module definitions, initial state,
         transition rules, solvability conditions, and an LTL (Linear Temporal Logic) specification for checking unsolvability.
+        The solvability condition only requires the goals of sokoban_goals.
 
     """
 
-    board_rows = len(board_data)
-    board_cols = len(board_data[0])
+    return ''.join(generate_smv_fragments(sokoban_goals, board_data, restrict_domains))
 
-    initial_state = initial_state_string_generator(board_data)
-    transition_rules = transition_relation_string_generator(board_data)
-    solvability_conditions = solvability_condition_string_generator(board_data)
 
-    smv_text = f"""
+def generate_smv_fragments(sokoban_goals, board_data, restrict_domains=False):
+
+    """
+    This function yields the SMV model of generate_smv fragment by fragment (at most one cell's clauses each),
+    so it can be written to the model file while it is generated.
+    """
+
+    yield """
     MODULE main
-    VAR
-        sokoban_board: array 0..{board_rows - 1} of array 0..{board_cols - 1} of {{Wall, Player, POG, Box, BOG, Goal, Floor}};
-        move: {{r, l, u, d}};
+    """
+    yield from variables_fragments(board_data, restrict_domains)
+    yield """
+        move: {r, l, u, d};
 
     INIT
-        {initial_state}
+        """
+    yield from initial_state_fragments(board_data)
+    yield """
 
     ASSIGN
-        {transition_rules}
+        """
+    yield from transition_relation_fragments(board_data, restrict_domains)
+    yield """
 
     DEFINE
         is_solvable :=
-            {solvability_conditions}
+            """
+    yield from solvability_condition_fragments(board_data, sokoban_goals)
+    yield """
 
     LTLSPEC !(F is_solvable);
     """
-    return smv_text
 
 
 def update_initial_state(current_board, output_filename):
@@ -148,38 +110,63 @@ def update_initial_state(current_board, output_filename):
         current_board: A list of lists representing the current state of the Sokoban board.
         output_filename: A string representing the path to the file containing the output data.
     Output:
-        An updated list of lists representing the Sokoban board after applying the state changes,
-        or -1 if the 'State' marker is not found in the file.
+        An updated list of lists representing the Sokoban board after applying the state changes
+        of every state up to the one where the board is solved, or -1 if there is no trace in the file.
     """
 
+    # The file is parsed while it is read
     with open(output_filename, "r") as file:
-        final_output = file.read()
+        return apply_trace(current_board, file)
 
-    if 'State' not in final_output:
-        return -1
-    else:
-        state_data = final_output[final_output.index('State'):]
 
-    for state_lines in extract_lines_between_states(state_data):
-        positions_to_update = identify_changes(state_lines)
-        positions_to_update = [position[0] for position in positions_to_update]
+def apply_trace(current_board, output):
 
-    for pos in positions_to_update:
-        row, col = int(pos[0]), int(pos[1])
-        current_board[row][col] = SYMBOL_MAPPING[pos[2]]
+    """
+    This function updates the board like update_initial_state, from nuXmv output that is not saved to a file.
+
+    Input:
+        current_board: A list of lists representing the current state of the Sokoban board.
+        output: The nuXmv output, a string or its lines.
+    Output:
+        The updated board, or -1 if there is no trace in the output.
+    """
+
+    found_trace = False
+    parser = trace_parser.TraceParser(output)
+    # every state only holds the cells that changed
+    for state in parser.states():
+        found_trace = True
+        for (row, col), value in state.cells.items():
+            if value != "Wall":
+                current_board[row][col] = SYMBOL_MAPPING[value]
+        if state.values.get("is_solvable") == "TRUE":
+            break
+    # the rest of a pipe is read too, nuXmv finishes before its model is removed
+    parser.drain()
+
+    if not found_trace:
+        return -1
 
     return current_board
 
-def solve_sokoban_iteratively(board_file, engine = None, k = None ):
+def solve_sokoban_iteratively(board_file, engine = None, k = None, restrict_domains = False, keep_artifacts = False, max_orders = goal_planner.MAX_ORDERS, workers = 1, checkpoint_directory = checkpoint.DEFAULT_CHECKPOINT_DIRECTORY):
 
     """
     This function solves a Sokoban board iteratively by adding one goal at a time, running the nuXmv model checker,
     and updating the board state. It returns the times taken for each iteration.
+    The goals are added in the fill orders of goal_planner; when a goal can not be filled in one order the next one is tried.
 
     Input:
         board_file: A string representing the path to the Sokoban board file.
         engine (optional): An engine parameter for the nuXmv model checker.
         k (optional): A parameter for the nuXmv model checker.
+        restrict_domains (optional): Generate the models with reachability restricted cell domains.
+        keep_artifacts (optional): Write the .smv and .out files of every iteration next to the board,
+            otherwise the models are handed to nuXmv in memory and the output is parsed from the pipe.
+        max_orders (optional): The number of goal orders tried at most.
+        workers (optional): The number of goal orders run at the same time, the first one that solves the board is kept.
+        checkpoint_directory (optional): Every added goal is saved to a checkpoint there (None disables it),
+            a new run on the board continues after the last saved goal, with either engine.
     Output:
         iteration_times: A list of tuples where each tuple contains the time taken for an iteration and the corresponding iteration number.
 
@@ -188,34 +175,104 @@ def solve_sokoban_iteratively(board_file, engine = None, k = None ):
     simulation_start = time.time()
     board_name = board_file.split(".")[0]
     goals, initial_board = extract_goal_positions(board_file)
+    orders = []
+    for order in goal_planner.fill_orders(initial_board, max_orders):
+        # goals the planner does not know are added at the end, in file order
+        order = [goal for goal in order if goal in goals] + [goal for goal in goals if goal not in order]
+        if order not in orders:
+            orders.append(order)
+    progress = None
+    if checkpoint_directory is not None:
+        progress = checkpoint.Checkpoint(initial_board, "grid", checkpoint_directory)
+        # the order the checkpoint continues runs first
+        orders = progress.prefer(orders)
+
+    # every order that runs at the same time resets its own nuXmv process instead of starting a new one
+    session_pool = nuxmv_session.NuXmvSessionPool(size=max(1, workers)) if engine in ("SAT", "BDD") else None
+
+    def attempt(order, stop):
+        index = orders.index(order)
+        file_prefix = board_name if index == 0 else f"{board_name}_order{index}"
+        return solve_in_order(order, [row[:] for row in initial_board], file_prefix, engine, k, restrict_domains,
+                              keep_artifacts, session_pool, stop, progress)
+
+    order, iteration_times = goal_planner.first_success(orders, attempt, workers, session_pool.interrupt if session_pool is not None else None)
+    if session_pool is not None:
+        session_pool.close()
+    if order is None:
+        print("No solution for this board configuration.")
+        return []
 
-    iteration_times = []
-    current_goals = []
+    # Calculate run time
+    simulation_end = time.time()
+    simulation_time = simulation_end - simulation_start
 
-    for index, goal in enumerate(goals):
-        current_goals.append(goal)
-        smv_file_content = generate_smv(current_goals, initial_board)
+    print(f"Simulation running time: {simulation_time:.3f} seconds")
+    print(f"Goal order: {order}")
+    print(f"Total number of iterations: {len(iteration_times)}")
+    return iteration_times
 
 
-        with open(f"{board_name}_goals{index}.smv", 'w') as smv_file:
-            smv_file.write(smv_file_content)
+def solve_in_order(order, initial_board, file_prefix, engine, k, restrict_domains, keep_artifacts, session_pool, stop, progress=None):
 
-        start_time = time.time()
-        output_filename = run_nuXmv.run_nuxmv(f"{board_name}_goals{index}.smv", engine, k)
-        print("Running nuXmv on file:", f"{board_name}_goals{index}.smv")
-        end_time = time.time()
+    """
+    This function runs the iterations of solve_sokoban_iteratively for one order of the goals.
+
+    Input:
+        order: A list of goal positions, in the order they are added.
+        initial_board: A list of lists representing the Sokoban board, it is updated by every iteration.
+        file_prefix: The prefix of the .smv files written when keep_artifacts is set.
+        engine, k, restrict_domains, keep_artifacts: As in solve_sokoban_iteratively.
+        session_pool: A nuxmv_session.NuXmvSessionPool the iterations run in, or None.
+        stop: A threading.Event, set when another order already solved the board.
+        progress: A checkpoint.Checkpoint, the goals it saved for this order are skipped and every new goal is saved (optional).
+    Output:
+        iteration_times as in solve_sokoban_iteratively, or None if a goal could not be filled in this order.
+
+    """
+
+    saved_steps = [] if progress is None else progress.resume(order)
+    iteration_times = [(step["seconds"], index + 1) for index, step in enumerate(saved_steps)]
+    current_goals = [tuple(step["goal"]) for step in saved_steps]
+    if saved_steps:
+        # continue from the board of the last saved goal
+        initial_board = [list(row) for row in saved_steps[-1]["board"].split("\n")]
+        print(f"Resuming after goal {len(saved_steps)} from {progress.path}")
+
+    for index, goal in enumerate(order):
+        if index < len(saved_steps):
+            continue
+        if stop.is_set():
+            return None
+        current_goals.append(goal)
+        model_digest = hashlib.sha256()
+        # the hash of the model is saved with the goal
+        model_fragments = checkpoint.hashing(generate_smv_fragments(current_goals, initial_board, restrict_domains), model_digest)
+
+        if keep_artifacts:
+            # the model is written while it is generated
+            write_to_file(f"{file_prefix}_goals{index}.smv", model_fragments)
+
+            start_time = time.time()
+            output_filename = run_nuXmv.run_nuxmv(f"{file_prefix}_goals{index}.smv", engine, k, session_pool)
+            print("Running nuXmv on file:", f"{file_prefix}_goals{index}.smv")
+            end_time = time.time()
+            initial_board = update_initial_state(initial_board, output_filename)
+        else:
+            # the model only exists in memory, the trace is applied while nuXmv writes it
+            with model_files.temporary_model(model_fragments) as smv_file_name:
+                start_time = time.time()
+                initial_board = apply_trace(initial_board, run_nuXmv.iter_nuxmv_output(smv_file_name, engine, k, session_pool))
+                end_time = time.time()
 
         iteration_times.append((end_time - start_time, index + 1))
-        initial_board = update_initial_state(initial_board, output_filename)
         #print("Iteration complete, time taken:", end_time - start_time)
         if initial_board == -1:
-            print("No solution for this board configuration.")
-            return []
+            print(f"Goal {goal} could not be filled in the goal order {order}, trying the next order.")
+            return None
+        if progress is not None:
+            worker = next(((i, j) for i, row in enumerate(initial_board) for j, cell in enumerate(row) if cell in ('@', '+')), None)
+            saved_steps = progress.record(saved_steps, goal, "\n".join("".join(row) for row in initial_board), worker or (-1, -1),
+                                          None, end_time - start_time, engine, model_digest.hexdigest())
 
-    # Calculate run time
-    simulation_end = time.time()
-    simulation_time = simulation_end - simulation_start
-
-    print(f"Simulation running time: {simulation_time:.3f} seconds")
-    print(f"Total number of iterations: {len(iteration_times)}")
     return iteration_times
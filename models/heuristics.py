@@ -0,0 +1,156 @@
+# admissible lower bounds on the pushes a board needs, shared by the solvers and the BMC bound scheduler
+# the tables are NumPy arrays indexed [goal, row, column]
+import functools
+
+import numpy as np
+
+import board_analysis
+
+# distance of the cells from which a box can not be pushed to the goal, larger than any real distance
+UNREACHABLE = 1 << 20
+
+# (row offset, column offset) of the four pushes
+OFFSETS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+
+class PushDistances:
+    """
+    Push distances of a board, computed once per board:
+        goals    - (row, column) of every goal, in the order of the table
+        table    - int32 array [goal, row, column], the pushes that bring a box from the cell to the goal
+                   on the empty board (UNREACHABLE if it can not get there)
+        nearest  - int32 array [row, column], the pushes to the nearest goal
+    """
+
+    def __init__(self, analysis):
+        self.goals = list(analysis.cells(analysis.goals & analysis.floor))
+        floor = np.array(analysis.to_matrix(analysis.floor), dtype=bool).reshape(analysis.rows, analysis.columns)
+        self.table = pull_distances(floor, self.goals)
+        self.nearest = self.table.min(axis=0) if self.goals else np.full(floor.shape, UNREACHABLE, dtype=np.int32)
+
+    def costs(self, boxes):
+        """Returns the [box, goal] array of push distances for the (row, column) cells of the boxes."""
+        if not boxes:
+            return np.zeros((0, len(self.goals)), dtype=np.int32)
+        rows, columns = zip(*boxes)
+        return self.table[:, rows, columns].T
+
+
+def shift(array, di, dj):
+    """Returns the array moved by (di, dj) over its last two axes, cells moved in from outside are False."""
+    result = np.zeros_like(array)
+    rows, columns = array.shape[-2:]
+    result[..., max(di, 0):rows + min(di, 0), max(dj, 0):columns + min(dj, 0)] = \
+        array[..., max(-di, 0):rows + min(-di, 0), max(-dj, 0):columns + min(-dj, 0)]
+    return result
+
+
+def pull_distances(floor, goals):
+    """
+    Breadth-first reverse pulls from all the goals at once, one layer per push.
+    A box is pulled from b to b+d when the cells b+d and b+2d (where the player stands) are floor.
+    """
+    distances = np.full((len(goals),) + floor.shape, UNREACHABLE, dtype=np.int32)
+    if not goals:
+        return distances
+    frontier = np.zeros(distances.shape, dtype=bool)
+    for index, (i, j) in enumerate(goals):
+        frontier[index, i, j] = True
+    # cells a box can be pulled to in each direction: the cell and the one after it are floor
+    pull_targets = [floor & shift(floor, -di, -dj) for di, dj in OFFSETS]
+    visited = frontier.copy()
+    distance = 0
+    while frontier.any():
+        distances[frontier] = distance
+        reached = np.zeros_like(frontier)
+        for (di, dj), targets in zip(OFFSETS, pull_targets):
+            reached |= shift(frontier, di, dj) & targets
+        frontier = reached & ~visited
+        visited |= frontier
+        distance += 1
+    return distances
+
+
+@functools.lru_cache(maxsize=64)
+def _push_distances(rows):
+    return PushDistances(board_analysis.analyze_board(rows))
+
+
+def push_distances(board):
+    """Returns the (cached) PushDistances of an XSB string or a list of rows."""
+    return _push_distances(board_analysis.normalize_board(board))
+
+
+def minimum_cost_matching(costs):
+    """
+    Hungarian algorithm (shortest augmenting paths with potentials) on a [row, column] cost array.
+    Every row is matched to a different column when there are no more rows than columns, and the other
+    way around otherwise. Returns (total cost, list of (row, column) pairs).
+    """
+    costs = np.asarray(costs, dtype=np.float64)
+    transposed = costs.shape[0] > costs.shape[1]
+    if transposed:
+        costs = costs.T
+    rows, columns = costs.shape
+    # 1-based like the textbook version, index 0 is the virtual column the augmenting path starts from
+    row_potential = np.zeros(rows + 1)
+    column_potential = np.zeros(columns + 1)
+    match = np.zeros(columns + 1, dtype=np.int64)  # row matched to every column, 0 for none
+    way = np.zeros(columns + 1, dtype=np.int64)
+    for row in range(1, rows + 1):
+        match[0] = row
+        column = 0
+        slack = np.full(columns + 1, np.inf)
+        used = np.zeros(columns + 1, dtype=bool)
+        while True:
+            used[column] = True
+            current_row = match[column]
+            free = ~used
+            free[0] = False
+            reduced = costs[current_row - 1] - row_potential[current_row] - column_potential[1:]
+            improved = free[1:] & (reduced < slack[1:])
+            slack[1:][improved] = reduced[improved]
+            way[1:][improved] = column
+            candidates = np.where(free, slack, np.inf)
+            next_column = int(np.argmin(candidates))
+            delta = candidates[next_column]
+            row_potential[match[used]] += delta
+            column_potential[used] -= delta
+            slack[free] -= delta
+            column = next_column
+            if match[column] == 0:
+                break
+        while column:
+            previous = way[column]
+            match[column] = match[previous]
+            column = previous
+
+    pairs = [(int(match[column]) - 1, column - 1) for column in range(1, columns + 1) if match[column]]
+    if transposed:
+        pairs = [(column, row) for row, column in pairs]
+    total = sum(costs[row, column] if not transposed else costs[column, row] for row, column in pairs)
+    return int(total), sorted(pairs)
+
+
+def lower_bound(board, boxes=None, needed=None):
+    """
+    Admissible lower bound on the pushes of a board.
+    boxes are the (row, column) cells of the boxes, the boxes of the board when None.
+    With needed None every goal (or every box, if there are fewer boxes) must be covered and the bound is a
+    minimum-cost matching between the boxes and the goals; with needed, only that many boxes must reach
+    some goal and the bound is the sum of the needed smallest distances to the nearest goal.
+    Returns None if no assignment can reach the goals, i.e. the board is unsolvable.
+    """
+    distances = push_distances(board)
+    if boxes is None:
+        analysis = board_analysis.analyze_board(board)
+        boxes = list(analysis.cells(analysis.boxes))
+    if needed is not None:
+        nearest = sorted(int(distances.nearest[i, j]) for i, j in boxes)[:needed]
+        total = sum(nearest)
+    else:
+        costs = distances.costs(boxes)
+        if costs.size == 0:
+            return 0
+        total, _ = minimum_cost_matching(costs)
+    return None if total >= UNREACHABLE else total
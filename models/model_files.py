@@ -0,0 +1,43 @@
+# model files for runs that keep no artifacts on disk
+import contextlib
+import os
+import tempfile
+
+# tmpfs mount used for temporary models when anonymous memory files are not available
+TMPFS_DIRECTORY = "/dev/shm"
+
+
+def temporary_directory():
+    """Returns tmpfs when it is available, the system temp directory otherwise."""
+    if os.path.isdir(TMPFS_DIRECTORY) and os.access(TMPFS_DIRECTORY, os.W_OK):
+        return TMPFS_DIRECTORY
+    return tempfile.gettempdir()
+
+
+@contextlib.contextmanager
+def temporary_model(fragments):
+    """
+    Writes the model (a string or an iterable of fragments) to a memory file and yields a path nuXmv can read it from.
+    On Linux the file is anonymous (memfd_create) and nuXmv opens it through /proc/<pid>/fd,
+    elsewhere it is a temporary .smv file on tmpfs (or in the temp directory).
+    The file is gone when the with block ends.
+    """
+    if isinstance(fragments, str):
+        fragments = [fragments]
+    if hasattr(os, "memfd_create") and os.path.isdir(f"/proc/{os.getpid()}/fd"):
+        fd = os.memfd_create("sokoban_model")
+        try:
+            with os.fdopen(fd, "w", closefd=False) as f:
+                f.writelines(fragments)
+            yield f"/proc/{os.getpid()}/fd/{fd}"
+        finally:
+            os.close(fd)
+        return
+
+    fd, path = tempfile.mkstemp(suffix=".smv", dir=temporary_directory())
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.writelines(fragments)
+        yield path
+    finally:
+        os.remove(path)
@@ -0,0 +1,218 @@
+# long-lived interactive nuXmv processes shared by the solvers
+import contextlib
+import os
+import queue
+import re
+import subprocess
+import threading
+import time
+
+# prompt printed by "nuXmv -int" (or NuSMV) when it waits for the next command
+PROMPT_PATTERN = re.compile(r"(nuXmv|NuSMV) > $")
+
+# seconds to wait for the banner and first prompt of a new process
+STARTUP_TIMEOUT = 60
+
+
+class NuXmvSessionError(RuntimeError):
+    """Raised when a session process dies or a command exceeds its timeout."""
+
+
+class NuXmvSession:
+    """
+    One `nuXmv -int` process driven over stdin/stdout.
+    Every command is written to stdin and its output is read until nuXmv prints its prompt again,
+    so models can be reset and loaded without starting a new process.
+    """
+
+    def __init__(self, executable="nuXmv"):
+        self.executable = executable
+        self.model_file = None
+        self.process = subprocess.Popen([executable, "-int"], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.STDOUT, bufsize=0)
+        # the reader thread turns the blocking pipe into a queue, so reads can time out
+        self._chunks = queue.Queue()
+        self._reader = threading.Thread(target=self._read_output, daemon=True)
+        self._reader.start()
+        self._pending = ""
+        self.banner = "".join(self._read_until_prompt(STARTUP_TIMEOUT))
+
+    def _read_output(self):
+        fd = self.process.stdout.fileno()
+        while True:
+            try:
+                chunk = os.read(fd, 65536)
+            except OSError:
+                chunk = b""
+            self._chunks.put(chunk)
+            if not chunk:
+                return
+
+    def _read_until_prompt(self, timeout=None):
+        """Yields the output lines (with line endings) up to and including the next prompt."""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            lines = self._pending.split("\n")
+            self._pending = lines.pop()
+            for line in lines:
+                yield line + "\n"
+            if PROMPT_PATTERN.search(self._pending):
+                prompt, self._pending = self._pending, ""
+                yield prompt
+                return
+            remaining = None if deadline is None else deadline - time.time()
+            if remaining is not None and remaining <= 0:
+                self.kill()
+                raise NuXmvSessionError(f"nuXmv did not answer within {timeout} seconds")
+            try:
+                chunk = self._chunks.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            if not chunk:
+                self.kill()
+                raise NuXmvSessionError("nuXmv process terminated")
+            self._pending += chunk.decode(errors="replace").replace("\r\n", "\n")
+
+    def iter_lines(self, command, timeout=None):
+        """Sends one command and yields its output line by line, ending with the prompt."""
+        if not self.is_alive():
+            raise NuXmvSessionError("nuXmv process is not running")
+        self.process.stdin.write((command + "\n").encode())
+        self.process.stdin.flush()
+        yield from self._read_until_prompt(timeout)
+
+    def execute(self, command, timeout=None):
+        """Sends one command and returns its output, including the prompt that follows it."""
+        return "".join(self.iter_lines(command, timeout))
+
+    def load_model(self, model_file, timeout=None):
+        """Resets the session and reads a new model file."""
+        return self.run(model_file, [], timeout)
+
+    def iter_run(self, model_file, commands, timeout=None):
+        """Loads model_file, runs the commands on it and yields the output line by line."""
+        if self.model_file is not None:
+            yield from self.iter_lines("reset", timeout)
+        self.model_file = model_file
+        yield from self.iter_lines(f"read_model -i {quote(model_file)}", timeout)
+        for command in commands:
+            yield from self.iter_lines(command, timeout)
+
+    def run(self, model_file, commands, timeout=None):
+        """
+        Loads model_file and runs the commands on it.
+        Returns the output of the commands, shaped like the output of a single `nuXmv -int` run.
+        """
+        return "".join(self.iter_run(model_file, commands, timeout))
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def close(self):
+        if self.is_alive():
+            try:
+                self.process.stdin.write(b"quit\n")
+                self.process.stdin.flush()
+                self.process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                self.kill()
+
+    def kill(self):
+        """Stops the process without waiting for the running command."""
+        if self.is_alive():
+            self.process.kill()
+        self.process.wait()
+
+
+class NuXmvSessionPool:
+    """
+    Bounded pool of nuXmv sessions shared by concurrent callers.
+    Sessions are started lazily up to size, callers wait for a free session after that.
+    Usage:
+        pool = NuXmvSessionPool(size=2)
+        output = pool.run("model.smv", ["go", "check_ltlspec"])
+        pool.close()
+    """
+
+    def __init__(self, size=1, executable="nuXmv"):
+        self.size = size
+        self.executable = executable
+        self._idle = queue.LifoQueue()
+        self._busy = set()
+        self._started = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self, timeout=None):
+        try:
+            session = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                start_new = self._started < self.size
+                if start_new:
+                    self._started += 1
+            if start_new:
+                try:
+                    return NuXmvSession(self.executable)
+                except Exception:
+                    self._discard()
+                    raise
+            session = self._idle.get(timeout=timeout)
+        if not session.is_alive():
+            self._discard()
+            return self._acquire(timeout)
+        return session
+
+    def _discard(self):
+        with self._lock:
+            self._started -= 1
+
+    @contextlib.contextmanager
+    def session(self, timeout=None):
+        """Hands out a session for the duration of a with block."""
+        session = self._acquire(timeout)
+        with self._lock:
+            self._busy.add(session)
+        try:
+            yield session
+        except BaseException:
+            # the session may be in the middle of a command (or a caller stopped reading its output),
+            # do not hand it out again
+            session.kill()
+            self._discard()
+            raise
+        else:
+            self._idle.put(session)
+        finally:
+            with self._lock:
+                self._busy.discard(session)
+
+    def interrupt(self):
+        """Kills the sessions that are in use, their callers get a NuXmvSessionError instead of waiting for the command."""
+        with self._lock:
+            sessions = list(self._busy)
+        for session in sessions:
+            session.kill()
+
+    def run(self, model_file, commands, timeout=None):
+        """Runs the commands on model_file with a session of the pool."""
+        with self.session() as session:
+            return session.run(model_file, commands, timeout)
+
+    def iter_run(self, model_file, commands, timeout=None):
+        """Runs the commands on model_file with a session of the pool and yields the output line by line."""
+        with self.session() as session:
+            yield from session.iter_run(model_file, commands, timeout)
+
+    def close(self):
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            session.close()
+            self._discard()
+
+
+def quote(path):
+    """Quotes a path for the nuXmv command line when it holds spaces."""
+    return f'"{path}"' if " " in path else path
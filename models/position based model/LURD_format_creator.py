@@ -1,102 +1,125 @@
 # extracts the LURD format from the nuxmv .out file
 import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import trace_parser
+import explicit_solver
 
-def extract_LURD(stdout, input_file_name, folder_name, steps, iterative_check=None):
-    # check if not solveable
-    last_line = stdout.strip().split('\n')[-2]
-    
-    output_filename = os.path.join(folder_name, input_file_name+"_LURD.out")
-    # check for SAT with a bound on steps
-    if steps!=None:
-        check_test = "-- no counterexample found with bound "+steps
-    else:
-        check_test = "-- no counterexample found with bound 10"
-        if check_test in last_line:
-            print("The board is not solveable")
-            with open(output_filename, "w") as f:
-                f.write("Board is not solveable")
-                f.write(f"\n")
-            return output_filename, None
-        
-    lines = stdout.split('\n')
+# stdout is the nuXmv output: a string, an open .out file or the lines of the nuXmv pipe, read line by line
+# with folder_name None no file is written and the returned file name is None
+# board_cells (a dict) collects the (row, col) -> value of the board cells up to the state that reaches the goal,
+# so the iterative solver reads the board after the goal in the same pass over the output
+def extract_LURD(stdout, input_file_name, folder_name, steps, iterative_check=None, board_cells=None):
+    output_filename = os.path.join(folder_name, input_file_name+"_LURD.out") if folder_name is not None else None
+    parser = trace_parser.TraceParser(stdout)
 
-    for line in lines:
-        if "-- specification  G !reach  is true" in line:
-            print("The board is not solveable")
-            with open(output_filename, "w") as f:
-                f.write("Board is not solveable")
-                f.write(f"\n")
-            return output_filename, None
+    # one letter per state before the loop, built while the trace is read
+    LURD_list = []
+    movement = "N/A"
+    pushes = "N/A"
+    looped = False
+    reached = board_cells is None
+    for state in parser.states():
+        if not reached:
+            board_cells.update(state.cells)
+            reached = state.values.get("reach") == "TRUE"
+        looped = looped or state.loop_start
+        if looped:
+            if reached:
+                break
+            continue
+        # the movement and pushes keep their values from the previous state if they did not change
+        if state.move is not None:
+            movement = state.move
+        # adds the direction as an upper letter if push=TRUE, and as lower letter if push=FALSE
+        state_pushes = "".join(direction.upper() if value else direction for direction, value in state.pushes.items())
+        if state_pushes:
+            previous_pushes = pushes
+            pushes = state_pushes
+            for dir in ['u', 'd', 'l', 'r']: # will add pushes if they existed beforehand, if the lowercase letter isnt present
+                if dir.upper() in previous_pushes and dir.upper() not in pushes and dir not in pushes:
+                    pushes += dir.upper()
+        # if the uppercase letter is in the pushes, and the lowercase letter isnt
+        if movement.upper() in pushes and movement not in pushes:
+            LURD_list.append(movement.upper())
+        else:
+            LURD_list.append(movement)
+    parser.drain()
 
+    if not_solveable(parser, steps, output_filename):
+        return output_filename, None
 
-    current_index=-1
-    size=0
-    # setting list size
-    for line in lines:
-        if 'Loop' in line:
-            break
-        elif '-> State:' in line:
-            size+=1
-            
-    movements_pushes_list = [["N/A"] * size for i in range(2)] # 2d list of size 2xsize
+    if len(LURD_list) > 1:
+        # cut useless movements from start and end
+        LURD_list = LURD_list[1:]
+        if LURD_list[-1].islower():
+            LURD_list = LURD_list[:-1]
 
-    # filling list with movements and pushes
-    for line in lines:
-        if 'Loop' in line:
-            break
-        if '-> State:' in line:
-            current_index+=1
-        elif 'movement = ' in line:
-            movement = line.split('=')[1].strip()
-            movements_pushes_list[0][current_index]=movement
-            
-        elif '_push' in line:
-            direction = line.split('_')[0].strip()[0]
-            value = line.split('=')[1].strip()
-            # adds the direction as an upper letter if push=TRUE, and as lower letter if push=FALSE
-            if movements_pushes_list[1][current_index]=="N/A": 
-              if value=="TRUE":
-                movements_pushes_list[1][current_index]=direction.upper()
-              else:
-                movements_pushes_list[1][current_index]=direction
-            else:
-              if value=="TRUE":
-                movements_pushes_list[1][current_index]+=direction.upper()
-              else:
-                movements_pushes_list[1][current_index]+=direction
+    LURD_format = "".join(LURD_list) # convert list to string
+    print("The board is solveable. Solution:")
+    print(LURD_format)
 
+    return output_filename, LURD_format
 
-    # filling N/A movements
-    for i in range(len(movements_pushes_list[0])):
-        if movements_pushes_list[0][i]=="N/A":
-            movements_pushes_list[0][i]=movements_pushes_list[0][i-1]
 
-    # filling pushes
-    directions = ['u', 'd', 'l', 'r']
-    for i in range(len(movements_pushes_list[1])):
-        if movements_pushes_list[1][i]=="N/A":
-            movements_pushes_list[1][i]=movements_pushes_list[1][i-1]
-        for dir in directions: # will add pushes if they existed beforehand, if the lowercase letter isnt present
-          if dir.upper() in movements_pushes_list[1][i-1] and  dir.upper() not in movements_pushes_list[1][i] and dir not in movements_pushes_list[1][i]:
-            movements_pushes_list[1][i]+=dir.upper()
-  
-    # comparing the 2 lists, changing to upper case if needed:
-    for i in range(len(movements_pushes_list[0])):
-      # if the uppercase letter is in the list, and the lowercase letter isnt in the list
-        if ((movements_pushes_list[0][i].upper() in movements_pushes_list[1][i]) and (movements_pushes_list[0][i] not in movements_pushes_list[1][i])):
-            movements_pushes_list[0][i]=movements_pushes_list[0][i].upper()
-            
-    if movements_pushes_list and len(movements_pushes_list[0]) > 1:
-        # cut useless movements from start and end
-        movements_pushes_list[0] = movements_pushes_list[0][1:]
-        if iterative_check=="iterative" and movements_pushes_list[0][-1].islower():
-                movements_pushes_list[0]=movements_pushes_list[0][:-1]
-        elif iterative_check!="iterative" and movements_pushes_list[0][-1].islower():
-                movements_pushes_list[0]=movements_pushes_list[0][:-1]
+# check if not solveable
+# BDD proved the spec, or SAT reached its bound without a counterexample
+# a SAT run without a bound (steps None) that stopped at its time budget reports the bound it reached
+def not_solveable(parser, steps, output_filename):
+    if parser.specification_holds() or (parser.states_found == 0 and steps != None and parser.last_bound == int(steps)):
+        message, file_message = "The board is not solveable", "Board is not solveable"
+    elif parser.states_found == 0 and parser.last_bound is not None:
+        message = file_message = f"No solution for this board in {parser.last_bound} steps"
+    elif parser.states_found == 0:
+        message = file_message = "The search stopped before any bound was checked"
+    else:
+        return False
+    print(message)
+    if output_filename is not None:
+        with open(output_filename, "w") as f:
+            f.write(file_message)
+            f.write(f"\n")
+    return True
+
 
-    
-    LURD_format = "".join(movements_pushes_list[0]) # convert list to string
+# extracts the LURD format from the output of the push-level model (model_generation.push_model_fragments)
+# every state holds the next push, the walk to the cell behind the box is rebuilt with a BFS on the board
+def extract_push_LURD(stdout, board_content, input_file_name, folder_name, steps):
+    output_filename = os.path.join(folder_name, input_file_name+"_LURD.out") if folder_name is not None else None
+    parser = trace_parser.TraceParser(stdout)
+    search = explicit_solver.ExplicitSolver(board_content)
+    columns = search.columns
+    offsets = {letter: offset for offset, letter in search.moves}
+
+    boxes = set(search.start_boxes)
+    player = search.player
+    values = {}
+    LURD_list = []
+    for state in parser.states():
+        if state.loop_start:
+            break
+        # the variables keep their values from the previous state if they did not change
+        previous = dict(values)
+        values.update(state.values)
+        if not previous or "worker_row" not in values:
+            continue
+        worker = int(values["worker_row"]) * columns + int(values["worker_col"])
+        box = int(previous["push_row"]) * columns + int(previous["push_col"])
+        if worker != box or worker == player:
+            continue # the push of the previous state was not possible, nothing moved
+        offset = offsets[previous["movement"]]
+        LURD_list.append(search.walk(player, box - offset, boxes))
+        LURD_list.append(previous["movement"].upper())
+        boxes.remove(box)
+        boxes.add(box + offset)
+        player = box
+    parser.drain()
+
+    if not_solveable(parser, steps, output_filename):
+        return output_filename, None
+
+    LURD_format = "".join(LURD_list) # convert list to string
     print("The board is solveable. Solution:")
     print(LURD_format)
-    
-    return output_filename, LURD_format
\ No newline at end of file
+
+    return output_filename, LURD_format
@@ -1,17 +1,25 @@
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from board import Board
+
+# XSB symbols (floor read as '-') -> symbols of the .smv file
+SMV_SYMBOLS = {'@': '_', '+': '_', '$': 'b', '*': 'b', '#': 'x', '.': '.', '-': '_'}
+
 # translates XSB symbols to those used in the .smv file
 def assign_board(board):
-    rows = board.strip().split('\n')
-    symbol_map = {'@': '_', '+': '_', '$': 'b', '*': 'b', '#': 'x', '.': '.', '_': '_','-':'_'}
-    board_list = [list(row) for row in rows]
-    
-    for i, row in enumerate(rows):
-        for j, char in enumerate(row):
-            if char in symbol_map:
-                value = symbol_map[char]
-                board_list[i][j] = value
-                if (char == '@' or char == '+'):
-                    worker_holder = [i, j]
-            else:
-                print(f"WRONG SYMBOL EXISTS char={char} i={i} j={j}")
+    board = Board.from_xsb(board)
+    worker_holder = list(board.player) if board.player is not None else None
+    return worker_holder, board.translate(SMV_SYMBOLS)
 
-    return worker_holder, board_list
\ No newline at end of file
+# translates a board in the .smv file format back to XSB, used when the iterative solver changes the board
+def board_to_xsb(board, worker_holder):
+    symbol_map = {'_': '-', 'b': '$', 'x': '#', '.': '.'}
+    rows = []
+    for i, row in enumerate(board):
+        xsb_row = [symbol_map.get(char, char) for char in row]
+        if i == worker_holder[0]:
+            j = worker_holder[1]
+            xsb_row[j] = '+' if row[j] == '.' else '@'
+        rows.append("".join(xsb_row))
+    return "\n".join(rows)
@@ -1,5 +1,12 @@
 # update worker_row, worker_col according to movement
-import copy
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import board_analysis
+
+# (direction, row offset, column offset) of the worker's moves
+PUSH_DIRECTIONS = (('u', -1, 0), ('d', 1, 0), ('l', 0, -1), ('r', 0, 1))
+PUSH_OFFSETS = {direction: (di, dj) for direction, di, dj in PUSH_DIRECTIONS}
 
 
 def worker_location_change(rows, columns):
@@ -54,7 +61,16 @@ def moves(i,j, rows, columns, board):
 
 # main function to generate the .smv file
 def generate_nusmv_model(rows ,columns,board_content, board, worker_holder):
-    model_content = f'''
+    return "".join(nusmv_model_fragments(rows, columns, board_content, board, worker_holder))
+
+
+# yields the .smv file piece by piece (at most one cell's clauses or one matrix row each), so it can be written while it is generated
+def nusmv_model_fragments(rows ,columns,board_content, board, worker_holder):
+    # cells the worker can never reach keep their value, the worker rows and columns are limited to the reachable area
+    analysis = board_analysis.analyze_board(board_content)
+    reachable_rows = [i for i, _ in analysis.cells(analysis.player_reachable)]
+    reachable_columns = [j for _, j in analysis.cells(analysis.player_reachable)]
+    yield f'''
 MODULE main
 DEFINE rows:={rows}; columns:={columns};
 -- new  XSB     definition
@@ -66,42 +82,35 @@ DEFINE rows:={rows}; columns:={columns};
 -- g      .      goal
 -- _      _      floor
 VAR
-    worker_row : 0..{rows-1}; --current worker row
-    worker_col : 0..{columns-1}; --current worker col
+    worker_row : {min(reachable_rows)}..{max(reachable_rows)}; --current worker row
+    worker_col : {min(reachable_columns)}..{max(reachable_columns)}; --current worker col
     movement : {{u, d, l, r, 0}};
     board : array 0..{rows-1} of array 0..{columns-1} of boolean;
     
 ASSIGN
 '''
     for i in range(rows):
-        for j in range(columns):
-            if board[i][j]=='b':
-                model_content+=f"init(board[{i}][{j}]):=TRUE;\t"
-            else:
-                model_content+=f"init(board[{i}][{j}]):=FALSE;\t"
-        model_content+=f"\n"
+        yield "".join(f"init(board[{i}][{j}]):={'TRUE' if board[i][j]=='b' else 'FALSE'};\t" for j in range(columns)) + "\n"
 
-    model_content+=f'''
+    yield f'''
 init(movement) := 0;
 init(worker_row) := {worker_holder[0]}; init(worker_col) := {worker_holder[1]};
 
 
 '''
 
-    model_content += worker_location_change(rows, columns)
-    model_content+=f"next(movement):={{u, d ,l ,r}};"
+    yield worker_location_change(rows, columns)
+    yield f"next(movement):={{u, d ,l ,r}};"
     for i in range(rows):
         for j in range(columns):
-            if board[i][j]=='x': # state 'x' cant change
-                model_content += f"\nnext(board[{i}][{j}]):= board[{i}][{j}];\n"
+            if board[i][j]=='x' or not analysis.is_reachable(i, j): # state 'x' cant change, the worker never reaches the cell
+                yield f"\nnext(board[{i}][{j}]):= board[{i}][{j}];\n"
             else:
-                model_content+= f"\nnext(board[{i}][{j}]):=\ncase\n"
-                model_content+=moves(i,j, rows, columns, board)
-                model_content+= f"\tTRUE: board[{i}][{j}];\nesac;\n"
+                yield f"\nnext(board[{i}][{j}]):=\ncase\n" + moves(i,j, rows, columns, board) + f"\tTRUE: board[{i}][{j}];\nesac;\n"
                 
 
 
-    model_content += f'''
+    yield f'''
     
     
 DEFINE
@@ -121,99 +130,116 @@ DEFINE
 
 '''
 
-    model_content += f'''
-walls :='''
     # creating the walls constant
-    model_content += " [\n"
-    for i in range(rows):
-        model_content += "["
-        for j in range(columns):
-            if board[i][j] == 'x':
-                model_content += " TRUE"
-            else:
-                model_content += "FALSE"
-            if j < columns - 1:
-                model_content += ", "
-        model_content += "]"
-        if i < rows - 1:
-            model_content += ",\n"
+    yield from boolean_matrix("walls", [[board[i][j] == 'x' for j in range(columns)] for i in range(rows)])
+
+    
+    yield f"\nDEFINE\n"
+    yield f"\treach:= " + " & ".join(f"board[{i}][{j}]" for i, j in analysis.cells(analysis.goals)) + ";"
 
-    model_content += "];"
 
     
-    board_mat=parse_xsb(board_content)
+    yield f"\n\tLTLSPEC G(!reach)"
+
+
+# push-level model: one transition walks the worker anywhere it can reach and then pushes one box,
+# so the bound BMC needs is the number of pushes instead of the number of moves
+# movement is the direction of the push and push_row, push_col the box it pushes, the worker ends on the box's cell
+# the walk is witnessed by the input variables walk_<i>_<j>, the distance of every cell of the worker's area from the
+# worker: a cell at distance d > 0 is free and has a neighbour at distance d - 1, the worker's cell is at distance 0,
+# the cells the walk does not claim get depth + 1. One constraint per cell over the precomputed neighbours keeps the
+# model linear in the area (a flood fill unrolled over depth layers grows with its square).
+# the moves between the pushes are rebuilt with a BFS by LURD_format_creator.extract_push_LURD
+def push_model_fragments(rows ,columns,board_content, board, worker_holder):
+    analysis = board_analysis.analyze_board(board_content)
+    rows, columns = analysis.rows, analysis.columns
+    area = list(analysis.cells(analysis.player_reachable))
+    area_cells = set(area)
+    area_rows = [i for i, _ in area]
+    area_columns = [j for _, j in area]
+    # a walk never passes through a box of the area, so it is at most this long
+    depth = max(0, len(area) - analysis.count(analysis.boxes & analysis.player_reachable) - 1)
+    neighbours = {(i, j): [(i + di, j + dj) for _, di, dj in PUSH_DIRECTIONS if (i + di, j + dj) in area_cells] for i, j in area}
+    # (direction, box row, box col) of every push the model can make: the worker stands behind the box in the
+    # worker's area and the box goes to a cell of the area that is not a dead square
+    pushes = [(direction, i, j) for i, j in area for direction, di, dj in PUSH_DIRECTIONS
+              if analysis.contains(analysis.player_reachable, i - di, j - dj)
+              and analysis.contains(analysis.player_reachable & ~analysis.dead_squares, i + di, j + dj)]
+    push_set = set(pushes)
+    yield f'''
+MODULE main
+DEFINE rows:={rows}; columns:={columns};
+VAR
+    worker_row : {min(area_rows)}..{max(area_rows)}; --current worker row
+    worker_col : {min(area_columns)}..{max(area_columns)}; --current worker col
+    movement : {{u, d, l, r}}; --direction of the next push
+    push_row : {min(area_rows)}..{max(area_rows)}; --row of the box the next push moves
+    push_col : {min(area_columns)}..{max(area_columns)}; --col of the box the next push moves
+    board : array 0..{rows-1} of array 0..{columns-1} of boolean;
 
-    model_content += f"\nDEFINE\n"
-    model_content +=f"\treach:= "
+IVAR
+'''
+    for i, j in area:
+        yield f"\twalk_{i}_{j} : 0..{depth + 1};\n"
+    yield '''
+ASSIGN
+'''
     for i in range(rows):
-        for j in range(columns):
-            if board_mat[i][j]=='.' or board_mat[i][j]=='+' or board_mat[i][j]=='*':
-                    model_content += f"board[{i}][{j}] & "
-    model_content = model_content[:-3]  # remove the last " & "
-    model_content+=";"
+        yield "".join(f"init(board[{i}][{j}]):={'TRUE' if analysis.contains(analysis.boxes, i, j) else 'FALSE'};\t" for j in range(columns)) + "\n"
 
+    yield f'''
+init(worker_row) := {worker_holder[0]}; init(worker_col) := {worker_holder[1]};
 
-    
-    model_content += f"\n\tLTLSPEC G(!reach)"
-    
-    return model_content
+next(movement) := {{u, d, l, r}};
+next(push_row) := {min(area_rows)}..{max(area_rows)};
+next(push_col) := {min(area_columns)}..{max(area_columns)};
 
-# Define Sokoban elements
-WALL = '#'
-FLOOR = '-'
-BOX = '$'
-GOAL = '.'
-PLAYER = '@'
-BOX_ON_GOAL = '*'
-PLAYER_ON_GOAL = '+'
-
-# Helper functions to process Sokoban board
-def parse_xsb(xsb_str):
-    """Parses the Sokoban board from XSB format string."""
-    board = [list(line) for line in xsb_str.strip().splitlines()]
-    return board
-
-def clear_board(board):
-    """Clears all boxes from the board to prepare for the pull algorithm."""
-    cleared_board = copy.deepcopy(board)
-    for y, row in enumerate(cleared_board):
-        for x, cell in enumerate(row):
-            if cell == BOX or cell == BOX_ON_GOAL:
-                cleared_board[y][x] = GOAL if cell == BOX_ON_GOAL else FLOOR
-            if cell == PLAYER or cell == PLAYER_ON_GOAL:
-                cleared_board[y][x] = GOAL if cell == PLAYER_ON_GOAL else FLOOR
-
-    return cleared_board
-
-def find_goals(board):
-    """Finds the coordinates of all goal squares."""
-    goals = []
-    for y, row in enumerate(board):
-        for x, cell in enumerate(row):
-            if cell in [GOAL, PLAYER_ON_GOAL, BOX_ON_GOAL]:
-                goals.append((y, x))
-    return goals
-
-def is_free_square(board, y, x):
-    """Checks if a square is free (walkable) for the player."""
-    return board[y][x] in [FLOOR, GOAL]
-
-def pull_box(board, start_y, start_x, visited):
-    """Performs the pull algorithm starting from a goal square."""
-    directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-    stack = [(start_y, start_x)]
-    visited.add((start_y, start_x))
-    
-    while stack:
-        y, x = stack.pop()
-        
-        for dy, dx in directions:
-            new_y, new_x = y + dy, x + dx
-            
-            # Check if pulling is possible (opposite side is free)
-            if (0 < new_y < (len(board)-1) and 0 < new_x < (len(board[0])-1) and 
-                (new_y, new_x) not in visited and is_free_square(board, new_y, new_x)and is_free_square(board, new_y+dy, new_x+dx)):
-                
-                visited.add((new_y, new_x))
-                stack.append((new_y, new_x))
+next(worker_row):=
+case
+    pushed: push_row;
+    TRUE: worker_row;
+esac;
 
+next(worker_col):=
+case
+    pushed: push_col;
+    TRUE: worker_col;
+esac;
+'''
+    for i in range(rows):
+        for j in range(columns):
+            cases = ""
+            for direction, di, dj in PUSH_DIRECTIONS:
+                if (direction, i, j) in push_set:
+                    cases += f"\tmovement={direction} & push_row={i} & push_col={j} & push_{direction}_{i}_{j} : FALSE;\n"
+                if (direction, i - di, j - dj) in push_set:
+                    cases += f"\tmovement={direction} & push_row={i-di} & push_col={j-dj} & push_{direction}_{i-di}_{j-dj} : TRUE;\n"
+            if not cases: # walls and cells no push leaves or enters keep their value
+                yield f"\nnext(board[{i}][{j}]):= board[{i}][{j}];\n"
+                continue
+            yield f"\nnext(board[{i}][{j}]):=\ncase\n" + cases + f"\tTRUE: board[{i}][{j}];\nesac;\n"
+
+    yield "\n"
+    for i, j in area:
+        steps = " | ".join(f"walk_{k}_{l} + 1 = walk_{i}_{j}" for k, l in neighbours[(i, j)])
+        # with depth 0 the worker cannot walk, only its own cell is claimed
+        walk = f" & (walk_{i}_{j} in 1..{depth} -> !board[{i}][{j}] & ({steps or 'FALSE'}))" if depth > 0 else ""
+        yield f"TRANS (walk_{i}_{j} = 0 -> worker_row={i} & worker_col={j}){walk};\n"
+
+    yield "\nDEFINE\n"
+    for direction, i, j in pushes:
+        di, dj = PUSH_OFFSETS[direction]
+        yield f"\tpush_{direction}_{i}_{j} := board[{i}][{j}] & walk_{i-di}_{j-dj} <= {depth} & !board[{i+di}][{j+dj}];\n"
+    yield "\tpushed := " + (" | ".join(f"movement={direction} & push_row={i} & push_col={j} & push_{direction}_{i}_{j}"
+                                         for direction, i, j in pushes) or "FALSE") + ";\n"
+
+    yield f"\treach:= " + " & ".join(f"board[{i}][{j}]" for i, j in analysis.cells(analysis.goals)) + ";"
+    yield f"\n\tLTLSPEC G(!reach)"
+
+
+# yields a matrix of booleans as an SMV array constant, one row at a time
+def boolean_matrix(name, matrix):
+    yield f"\n{name} := [\n"
+    for i, row in enumerate(matrix):
+        yield "[" + ", ".join(" TRUE" if value else "FALSE" for value in row) + "]" + (",\n" if i < len(matrix) - 1 else "")
+    yield "];"
@@ -1,27 +1,71 @@
 import os
 import subprocess
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bmc_driver
+import nuxmv_session
+
+# bound the SAT runs stop at without steps or bmc_budget, nuXmv's default bmc_length
+DEFAULT_BMC_LENGTH = 10
 
 # solves using BDD or SAT engine, according to input
-def run_nuxmv(input_file_name, folder_name, smv_file_name, solver_engine, steps = None):
-    if solver_engine == "BDD":
-        nuxmvProcess = subprocess.Popen(["nuXmv.exe", "-int", smv_file_name], stdin=subprocess.PIPE, stdout=subprocess.PIPE, universal_newlines=True,  stderr=subprocess.DEVNULL)
-        nuxmvProcess.stdin.write("go\n")
-        nuxmvProcess.stdin.write("check_ltlspec\n")
-        nuxmvProcess.stdin.write("quit\n")
-    elif solver_engine == "SAT":
+# with a session_pool (nuxmv_session.NuXmvSessionPool) the commands run in a persistent nuXmv process
+# the output is streamed into the .out file line by line, returns the .out file name
+# SAT runs deepen the bound from lower_bound up to steps until bmc_budget seconds pass; without steps they stop at
+# DEFAULT_BMC_LENGTH, or only when bmc_budget runs out if it is given
+# bdd_commands replace the commands of BDD runs (variable_ordering.OrderStore.bdd_commands reads and saves variable orders)
+def run_nuxmv(input_file_name, folder_name, smv_file_name, solver_engine, steps = None, session_pool = None, lower_bound = 0, bmc_budget = None, bdd_commands = None):
+    output_filename = os.path.join(folder_name, input_file_name+".out")
+    with open(output_filename, "w") as f:
+        f.writelines(iter_nuxmv_output(smv_file_name, solver_engine, steps, session_pool, lower_bound, bmc_budget, bdd_commands))
+    return output_filename
+
+
+# runs nuXmv like run_nuxmv and yields its output line by line from the pipe, nothing is written to disk
+def iter_nuxmv_output(smv_file_name, solver_engine, steps = None, session_pool = None, lower_bound = 0, bmc_budget = None, bdd_commands = None):
+    if solver_engine == "SAT":
+        yield from iter_incremental_bmc(smv_file_name, steps, session_pool, lower_bound, bmc_budget)
+        return
+
+    commands = bdd_commands if solver_engine == "BDD" and bdd_commands is not None else engine_commands(solver_engine, steps)
+    if session_pool is not None and solver_engine == "BDD":
+        yield from session_pool.iter_run(smv_file_name, commands)
+        return
+
+    if solver_engine in ("BDD", "SAT"):
         nuxmvProcess = subprocess.Popen(["nuXmv.exe", "-int", smv_file_name], stdin=subprocess.PIPE, stdout=subprocess.PIPE, universal_newlines=True,  stderr=subprocess.DEVNULL)
-        nuxmvProcess.stdin.write("go_bmc\n")
-        if steps == None:
-            nuxmvProcess.stdin.write(f"check_ltlspec_bmc\n")
-        else:
-            nuxmvProcess.stdin.write(f"check_ltlspec_bmc -k {steps}\n")
+        for command in commands:
+            nuxmvProcess.stdin.write(command+"\n")
         nuxmvProcess.stdin.write("quit\n")
     else:
         nuxmvProcess = subprocess.Popen(["nuXmv.exe", smv_file_name], stdin=subprocess.PIPE, stdout=subprocess.PIPE, universal_newlines=True, stderr=subprocess.DEVNULL)
+    nuxmvProcess.stdin.close()
     
-    
-    output_filename = os.path.join(folder_name, input_file_name+".out")
-    stdout, _ = nuxmvProcess.communicate()
-    with open(output_filename, "w") as f:
-        f.write(stdout)
-    return output_filename, stdout
+    yield from nuxmvProcess.stdout
+    nuxmvProcess.wait()
+
+
+# SAT engine: one nuXmv session checks growing bounds and stops at the first counterexample
+def iter_incremental_bmc(smv_file_name, steps = None, session_pool = None, lower_bound = 0, bmc_budget = None):
+    pool = session_pool if session_pool is not None else nuxmv_session.NuXmvSessionPool(size=1, executable="nuXmv.exe")
+    if steps != None:
+        max_bound = int(steps)
+    else:
+        max_bound = None if bmc_budget is not None else DEFAULT_BMC_LENGTH
+    bmc = bmc_driver.IncrementalBmc(lower_bound, max_bound, bmc_budget)
+    try:
+        yield from bmc.iter_run(pool, smv_file_name)
+    finally:
+        if session_pool is None:
+            pool.close()
+    if bmc.timed_out:
+        print(f"BMC time budget ran out, last bound checked: {bmc.bound}")
+
+
+# interactive commands of each engine
+def engine_commands(solver_engine, steps = None):
+    if solver_engine == "BDD":
+        return ["go", "check_ltlspec"]
+    if steps == None:
+        return ["go_bmc", "check_ltlspec_bmc"]
+    return ["go_bmc", f"check_ltlspec_bmc -k {steps}"]
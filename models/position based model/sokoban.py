@@ -1,6 +1,14 @@
 import argparse
+import os
+import sys
 import solver
 import solver_iterative
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import explicit_solver
+import variable_ordering
+
+# seconds the explicit-state search gets before the board is handed to nuXmv
+DEFAULT_PRESOLVE_BUDGET = 5.0
 
  # reads file content
 def get_board(filename):
@@ -12,9 +20,27 @@ def get_board(filename):
         print(f"An error occurred: {e}")
         return None
 
+# tries the explicit-state search before nuXmv, returns True if it solved the board or proved it unsolvable
+# with a steps bound, a solution longer than the bound is left to nuXmv (the push-level model counts pushes)
+def presolve(board, budget, steps=None, push_model=False):
+    if not board or not budget:
+        return False
+    result = explicit_solver.solve(board, budget)
+    length = None if result.solution is None else (result.pushes if push_model else len(result.solution))
+    if result.status == explicit_solver.SOLVED and (steps is None or length <= steps):
+        print("The board is solveable. Solution:")
+        print(result.solution)
+    elif result.status == explicit_solver.UNSOLVABLE:
+        print("The board is not solveable")
+    else:
+        print(f"Explicit search did not settle the board ({result.status}, {result.expanded} states), running nuXmv")
+        return False
+    print("Execution time: ", result.seconds, "seconds")
+    return True
+
 #ARG [0]=Input Board
 #Arg[1]
-def main(board_path='boards/board4.txt',iterative = False , check_bdd = False ,steps=None):    
+def main(board_path='boards/board4.txt',iterative = False , check_bdd = False ,steps=None, keep_artifacts=False, presolve_budget=DEFAULT_PRESOLVE_BUDGET, push_model=False, bmc_budget=None, variable_order=variable_ordering.DEFAULT_STRATEGY):    
     file_contents = get_board(board_path) # reads file content
     if file_contents:
         print("INPUT BOARD : ")
@@ -25,7 +51,9 @@ def main(board_path='boards/board4.txt',iterative = False , check_bdd = False ,s
         solver_engine='SAT'
     if(iterative== True):
         solver_engine=="iterative"
-    solver.main(file_contents, board_path, solver_engine, steps) # default
+    if presolve(file_contents, presolve_budget, steps, push_model): # small boards are solved before nuXmv starts
+        return
+    solver.main(file_contents, board_path, solver_engine, steps, keep_artifacts, push_model, bmc_budget, variable_order) # default
     
 
 if __name__ == "__main__":
@@ -36,12 +64,20 @@ if __name__ == "__main__":
     parser.add_argument('-ITERATIVE', '--iterative_mode', type=str, choices=['True', 'False'], default='False', help='Enable iterative mode (true or false)')
     parser.add_argument('-BDD', '--bdd', type=str, choices=['True', 'False'], default='False', help='Run BDD engine (true or false)')
     parser.add_argument('-STEPS', '--steps', type=int, default=None, help='Number of steps (integer value)')
+    parser.add_argument('-KEEP_ARTIFACTS', '--keep_artifacts', type=str, choices=['True', 'False'], default='False', help='Write the .smv and .out files of the run to disk (true or false)')
+    parser.add_argument('-PRESOLVE', '--presolve', type=float, default=DEFAULT_PRESOLVE_BUDGET, help='Seconds of explicit-state search before running nuXmv (0 disables it)')
+    parser.add_argument('-PUSH_MODEL', '--push_model', type=str, choices=['True', 'False'], default='False', help='Use the push-level model, one step is a walk and a push (true or false)')
+    parser.add_argument('-BMC_BUDGET', '--bmc_budget', type=float, default=None, help='Seconds the SAT engine may deepen its bound, the bound reached is reported when they run out; without it and -STEPS the SAT engine stops at bound 10 like nuXmv')
+    parser.add_argument('-VARIABLE_ORDER', '--variable_order', type=str, choices=list(variable_ordering.STRATEGIES) + ['default'], default=variable_ordering.DEFAULT_STRATEGY, help="BDD variable order built from the board geometry, 'default' keeps nuXmv's order")
     args = parser.parse_args()
     # Convert 'true'/'false' string to a boolean
     iterative_mode = args.iterative_mode.lower() == 'true'
     # Convert 'true'/'false' string to a boolean
     bdd = args.bdd.lower() == 'true'
     steps=args.steps
+    keep_artifacts = args.keep_artifacts.lower() == 'true'
+    push_model = args.push_model.lower() == 'true'
+    variable_order = None if args.variable_order == 'default' else args.variable_order
     # Call main with the parsed arguments
-    main(args.board_path, iterative_mode, bdd,steps)
+    main(args.board_path, iterative_mode, bdd,steps, keep_artifacts, args.presolve, push_model, args.bmc_budget, variable_order)
     
\ No newline at end of file
@@ -1,17 +1,36 @@
 import os
+import sys
 import time
 import run_nuxmv
 import model_generation
 import board_assignment
 import LURD_format_creator
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import model_files
+import bmc_driver
+import variable_ordering
 
 
+# model_content is the model as a string or as an iterable of fragments
 def save_model_to_file(model_content, filename):
     with open(filename, 'w') as f:
-        f.write(model_content)
+        f.writelines([model_content] if isinstance(model_content, str) else model_content)
 
 
-def main(board, input_filename, solver_engine, steps=None):
+# returns the LURD solution of the nuXmv output, for the push-level model the walks between the pushes are rebuilt
+def extract_solution(output, board_content, base_name, folder_name, steps, push_model):
+    if push_model:
+        return LURD_format_creator.extract_push_LURD(output, board_content, base_name, folder_name, steps)
+    return LURD_format_creator.extract_LURD(output, base_name, folder_name, steps, None)
+
+
+# keep_artifacts: write the .smv, .out and _LURD.out files to a folder next to the board,
+# otherwise the model is handed to nuXmv in memory and its output is parsed from the pipe
+# push_model: one transition is a walk and a push, so the SAT steps bound counts pushes instead of moves
+# SAT runs deepen the bound from a lower bound of the board, bmc_budget limits them in seconds (None for no limit)
+# BDD runs start from a variable order of variable_ordering.STRATEGIES, or from the order saved by the last run on the board
+# variable_order None leaves nuXmv's default order
+def main(board, input_filename, solver_engine, steps=None, keep_artifacts=False, push_model=False, bmc_budget=None, variable_order=variable_ordering.DEFAULT_STRATEGY):
     start_time = time.time()
     
     # Get the directory of the input file
@@ -24,32 +43,47 @@ def main(board, input_filename, solver_engine, steps=None):
     else:
         folder_name = os.path.join(input_directory, f"{base_name}_{solver_engine}")
     
-    # Ensure the output directory exists
-    os.makedirs(folder_name, exist_ok=True)
-    
-    # Create the output filename in the same directory
-    LURD_output_filename = os.path.join(folder_name, f"{base_name}_LURD.out")
-    with open(LURD_output_filename, "w") as f:
-        pass  # clears file
+    if keep_artifacts:
+        # Ensure the output directory exists
+        os.makedirs(folder_name, exist_ok=True)
+        
+        # Create the output filename in the same directory
+        LURD_output_filename = os.path.join(folder_name, f"{base_name}_LURD.out")
+        with open(LURD_output_filename, "w") as f:
+            pass  # clears file
     
     lines_num = board.strip().split('\n')
     rows = len(lines_num)
     columns= len(lines_num[0])
     board_content=board
     worker_holder, board = board_assignment.assign_board(board) # translate board from XSB to format used in the .smv file
-    model_content = model_generation.generate_nusmv_model(rows, columns,board_content, board, worker_holder) # create nusmv code
+    model_fragments = model_generation.push_model_fragments if push_model else model_generation.nusmv_model_fragments
+    model_content = model_fragments(rows, columns,board_content, board, worker_holder) # create nusmv code, it is generated while it is saved
+    lower_bound = bmc_driver.lower_bound(board_content) # no solution is shorter, the SAT run starts at this bound
+    bdd_commands = None
+    if solver_engine == "BDD" and variable_order is not None:
+        variables = variable_ordering.position_variables(board_content, rows, columns, push_model)
+        bdd_commands = variable_ordering.OrderStore(strategy=variable_order).bdd_commands(variables, variable_ordering.board_key(board_content))
+    
+    if not keep_artifacts:
+        with model_files.temporary_model(model_content) as smv_filename: # the model only exists in memory
+            output_lines = run_nuxmv.iter_nuxmv_output(smv_filename, solver_engine, steps, None, lower_bound, bmc_budget, bdd_commands)
+            extract_solution(output_lines, board_content, base_name, None, steps, push_model) # the trace is parsed while nuXmv writes it
+        print("Execution time: ", time.time() - start_time, "seconds")
+        return
     
     smv_filename = os.path.join(folder_name, f"{base_name}.smv") # create output file name, according to input file name
     
     save_model_to_file(model_content, smv_filename) # save contents of code to .smv file
     
-    _, stdout = run_nuxmv.run_nuxmv(base_name, folder_name, smv_filename, solver_engine, steps) # run nuXmv file 
+    output_filename = run_nuxmv.run_nuxmv(base_name, folder_name, smv_filename, solver_engine, steps, None, lower_bound, bmc_budget, bdd_commands) # run nuXmv file 
 
     end_time = time.time()
     execution_time = end_time - start_time
     print("Execution time: ", execution_time, "seconds")
     
-    LURD_file_name, LURD_format=  LURD_format_creator.extract_LURD(stdout, base_name, folder_name, steps, None) # create correct LURD format
+    with open(output_filename, "r") as output_file: # the trace is parsed while it is read
+        LURD_file_name, LURD_format=  extract_solution(output_file, board_content, base_name, folder_name, steps, push_model) # create correct LURD format
     
     with open(LURD_file_name, "a") as f:
         if LURD_format!=None:
@@ -1,25 +1,49 @@
 import os
+import sys
 import time
 import run_nuxmv
 import model_generation
 import board_assignment
 import LURD_format_creator
-
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import model_files
+import nuxmv_session
+import trace_parser
+import bmc_driver
+import variable_ordering
+import goal_planner
+import checkpoint
+import hashlib
+
+# model_content is the model as a string or as an iterable of fragments
 def save_model_to_file(model_content, filename):
     with open(filename, 'w') as f:
-        f.write(model_content)
-
+        f.writelines([model_content] if isinstance(model_content, str) else model_content)
+
+
+# returns the .out file name, or the board cells after the goal (see LURD_format_creator.extract_LURD) when no artifacts
+# are kept, and the LURD solution
+# lower_bound seeds the bound of SAT runs, bdd_commands replace the commands of BDD runs
+def run_and_file_creation(board, input_file_name, folder_name, model_content, start_time, solver_engine, steps=None, session_pool=None, keep_artifacts=True, lower_bound=0, bdd_commands=None):
+    if not keep_artifacts:
+        board_cells = {}
+        with model_files.temporary_model(model_content) as smv_filename: # the model only exists in memory
+            output_lines = run_nuxmv.iter_nuxmv_output(smv_filename, solver_engine, steps, session_pool, lower_bound, None, bdd_commands)
+            # the trace is parsed while nuXmv writes it, the rest of the output is drained before the model is removed
+            _, LURD_format = LURD_format_creator.extract_LURD(output_lines, input_file_name, None, steps, "iterative", board_cells)
+        print("Execution time: ", time.time() - start_time, "seconds")
+        return board_cells, LURD_format
 
-def run_and_file_creation(board, input_file_name, folder_name, model_content, start_time, solver_engine, steps=None):
     smv_filename = os.path.join(folder_name, input_file_name.split(".")[0]+".smv")
     save_model_to_file(model_content, smv_filename) # save contents of code to .smv file
-    _, stdout = run_nuxmv.run_nuxmv(input_file_name, folder_name, smv_filename, solver_engine, steps) # run nuXmv file 
+    output_filename = run_nuxmv.run_nuxmv(input_file_name, folder_name, smv_filename, solver_engine, steps, session_pool, lower_bound, None, bdd_commands) # run nuXmv file 
     
     end_time = time.time()
     execution_time = end_time - start_time
     print("Execution time: ", execution_time, "seconds")
     
-    LURD_file_name, LURD_format=  LURD_format_creator.extract_LURD(stdout, input_file_name, folder_name, steps, "iterative") # create correct LURD format
+    with open(output_filename, "r") as output_file: # the trace is parsed while it is read
+        LURD_file_name, LURD_format=  LURD_format_creator.extract_LURD(output_file, input_file_name, folder_name, steps, "iterative") # create correct LURD format
     
     with open(LURD_file_name, "a") as f:
         if LURD_format!=None:
@@ -29,38 +53,94 @@ def run_and_file_creation(board, input_file_name, folder_name, model_content, st
         f.write(str(execution_time))
         f.write(f" seconds\n")
         
-    return stdout, LURD_format
+    return output_filename, LURD_format
 
 
 
 
-def main(board, input_filename, solver_engine, steps=None):
+# keep_artifacts: write the .smv and .out files of every iteration to ./outputs, otherwise nothing is written to disk
+# BDD iterations share the variable order of the whole board (variable_ordering.OrderStore), variable_order None leaves nuXmv's default order
+# the goals are filled in the orders of goal_planner, up to max_orders of them are tried and workers of them run at the same time
+# every filled goal is saved to a checkpoint in checkpoint_directory (None disables it), a new run on the board continues
+# after the last saved goal, with either engine
+def main(board, input_filename, solver_engine, steps=None, keep_artifacts=False, variable_order=variable_ordering.DEFAULT_STRATEGY, max_orders=goal_planner.MAX_ORDERS, workers=1, checkpoint_directory=checkpoint.DEFAULT_CHECKPOINT_DIRECTORY):
     total_start_time=time.time()
     
     folder_name = os.path.join("./outputs", input_filename.split(".")[0]+"_iterative") # creates a folder for all the outputs inside ./outputs
-    os.makedirs(folder_name, exist_ok=True)
-    
     LURD_output_filename = os.path.join(folder_name, input_filename.split(".")[0]+"_LURD.out")
-    with open(LURD_output_filename, "w") as f:
-        pass  # clears file
+    if keep_artifacts:
+        os.makedirs(folder_name, exist_ok=True)
+        with open(LURD_output_filename, "w") as f:
+            pass  # clears file
 
     lines_num = board.strip().split('\n')
     rows = len(lines_num)
     columns= len(lines_num[0])
 
     worker_holder, original_board = board_assignment.assign_board(board)
+    order_store = variable_ordering.OrderStore(strategy=variable_order) if solver_engine == "BDD" and variable_order is not None else None
+    order_key = variable_ordering.board_key(board) # the sub-problems have the variables of the board, they share its order
     
-    def manhattan_distance(p1, p2):
-        return abs(p1[0] - p2[0]) + abs(p1[1] - p2[1])
-    goal_indices = [(i, j) for i, row in enumerate(original_board) for j, char in enumerate(row) if char == '.'] # sorts the distances for the iterative approach
-    sorted_goal_indices = sorted(goal_indices, key=lambda index: manhattan_distance(worker_holder, index))
-    
-    
+    # fill orders of the goals, the most likely first, the others are tried when an order fails
+    goal_indices = [(i, j) for i, row in enumerate(original_board) for j, char in enumerate(row) if char == '.']
+    orders = []
+    for order in goal_planner.fill_orders(board, max_orders):
+        order = complete_order(order, goal_indices)
+        if order not in orders:
+            orders.append(order)
+    progress = None
+    if checkpoint_directory is not None:
+        progress = checkpoint.Checkpoint(board, "position", checkpoint_directory)
+        orders = progress.prefer(orders) # the order the checkpoint continues runs first
+
+    # every order that runs at the same time has its nuXmv process, every iteration only resets it and reads the new model
+    session_pool = nuxmv_session.NuXmvSessionPool(size=max(1, workers), executable="nuXmv.exe")
+    def attempt(order, stop):
+        index = orders.index(order)
+        attempt_folder = folder_name if index == 0 else f"{folder_name}_order{index}"
+        if keep_artifacts:
+            os.makedirs(attempt_folder, exist_ok=True)
+        return solve_in_order(order, rows, columns, original_board, list(worker_holder), input_filename, attempt_folder,
+                              solver_engine, session_pool, keep_artifacts, order_store, order_key, stop, progress)
+    order, solutions = goal_planner.first_success(orders, attempt, workers, session_pool.interrupt)
+    session_pool.close()
+    if order is None:
+        print(f"No solution for this board in the {len(orders)} goal orders tried")
+    else:
+        print(f"Goal order : {order}")
+        
+    end_time = time.time()
+    total_time = end_time - total_start_time
+    print(f"Total Time : {total_time} seconds\n")
+    if keep_artifacts:
+        with open(LURD_output_filename, "a") as f:
+            f.write(f"\nTotal Time : {total_time} seconds\n")
+
+
+# the planner's goals that are goals of the assigned board, then the goals it left out
+def complete_order(order, goal_indices):
+    planned = [goal for goal in order if goal in goal_indices]
+    return planned + [goal for goal in goal_indices if goal not in planned]
+
+
+# fills the goals one at a time in the given order, every filled goal becomes a wall for the next iterations
+# returns the LURD solution of every goal, or None when a goal could not be filled (or stop was set by a parallel order)
+# with a checkpoint (checkpoint.Checkpoint) the goals it saved for this order are skipped and every new goal is saved
+def solve_in_order(order, rows, columns, original_board, worker_holder, input_filename, folder_name, solver_engine, session_pool, keep_artifacts, order_store, order_key, stop, progress=None):
     new_board = [row[:] for row in original_board] # shallow copy
-    
-    # iterative run, for every goal at a time
-    passed_indices = []
-    for count, goal_index in enumerate(reversed(sorted_goal_indices)):
+    saved_steps = [] if progress is None else progress.resume(order)
+    passed_indices = [tuple(step["goal"]) for step in saved_steps]
+    solutions = [step["lurd"] for step in saved_steps]
+    if saved_steps: # continue from the board of the last saved goal, the filled goals are walls again
+        worker_holder, new_board = board_assignment.assign_board(saved_steps[-1]["board"])
+        for i, j in passed_indices:
+            new_board[i][j] = 'x'
+        print(f"resuming after box number {len(saved_steps)} from {progress.path}")
+    for count, goal_index in enumerate(order):
+        if count < len(saved_steps):
+            continue
+        if stop.is_set(): # another order already solved the board
+            return None
         start_time=time.time()
         print(f"solving for box number {str(count+1)} :")
         for i in range(rows):
@@ -73,11 +153,19 @@ def main(board, input_filename, solver_engine, steps=None):
                     new_board[i][j]='_'
 
         # finished creating board, create nusmv file and run it
-        model_content = model_generation.generate_nusmv_model(rows, columns, new_board, worker_holder) # create nusmv code
-        stdout, LURD = run_and_file_creation(new_board, input_filename, folder_name, model_content, start_time, solver_engine, steps=None)
+        board_content = board_assignment.board_to_xsb(new_board, worker_holder)
+        model_content = model_generation.nusmv_model_fragments(rows, columns, board_content, new_board, worker_holder) # create nusmv code, it is generated while it is saved
+        model_digest = hashlib.sha256()
+        model_content = checkpoint.hashing(model_content, model_digest) # the hash of the model is saved with the goal
+        lower_bound = bmc_driver.lower_bound(board_content) # pushes of the closest box to this goal
+        bdd_commands = None
+        if order_store is not None:
+            bdd_commands = order_store.bdd_commands(variable_ordering.position_variables(board_content, rows, columns), order_key)
+        output, LURD = run_and_file_creation(new_board, input_filename, folder_name, model_content, start_time, solver_engine, steps=None, session_pool=session_pool, keep_artifacts=keep_artifacts, lower_bound=lower_bound, bdd_commands=bdd_commands)
             
-        if LURD==None: # not solveable
-            break
+        if LURD==None: # not solveable in this order
+            return None
+        solutions.append(LURD)
     
         # return board to original form, return the goals
         for i in range(rows):
@@ -87,7 +175,11 @@ def main(board, input_filename, solver_engine, steps=None):
 
 
         # filling the board after reaching a goal
-        new_board=extract_new_board_formation(stdout, rows, columns, new_board)
+        if keep_artifacts:
+            with open(output, "r") as output_file:
+                new_board=extract_new_board_formation(output_file, rows, columns, new_board)
+        else:
+            new_board=board_formation(output, rows, columns, new_board)
 
         # updating the worker position to the new location, after he reached the goal
         last_move=LURD[-1].lower()     
@@ -105,34 +197,38 @@ def main(board, input_filename, solver_engine, steps=None):
             worker_holder[1]=goal_index[1]-1
         
         passed_indices.append(goal_index)
-        
-    end_time = time.time()
-    total_time = end_time - total_start_time
-    print(f"Total Time : {total_time} seconds\n")
-    with open(LURD_output_filename, "a") as f:
-        f.write(f"\nTotal Time : {total_time} seconds\n")
+        if progress is not None:
+            saved_steps = progress.record(saved_steps, goal_index, checkpoint_board(new_board, worker_holder, passed_indices), worker_holder,
+                                          LURD, time.time() - start_time, solver_engine, model_digest.hexdigest())
+    return solutions
+
+
+# the XSB board saved in a checkpoint: the filled goals, walls in the iterations, are boxes on goals
+def checkpoint_board(board, worker_holder, passed_indices):
+    rows = [list(row) for row in board_assignment.board_to_xsb(board, worker_holder).split("\n")]
+    for i, j in passed_indices:
+        rows[i][j] = '*'
+    return "\n".join("".join(row) for row in rows)
 
 
 
 # creates the new board, after a goal has been reached
+# stdout is the nuXmv output: a string, or an open .out file which is read line by line
 def extract_new_board_formation(stdout, rows, columns, new_board):
-    lines = stdout.split('\n')
-    boolean_board = [[None for _ in range(columns)] for _ in range(rows)] # 2d array
+    board_cells = {}
     
-    reach_count = 0
-    reach_index = -1
-    for line in lines[reach_index + 2:]:
-        if "board" in line:
-            parts = line.split()
-            indices = parts[0][6:-1].split('][')
-            i = int(indices[0])
-            j = int(indices[1])
-            value = parts[-1]
-            boolean_board[i][j]=value
-        if "reach = " in line:
-            reach_count += 1
-            if reach_count == 2:  # second reach occurrence
-                break
+    # applies the changed cells of every state, until the state where the goal is reached
+    for state in trace_parser.TraceParser(stdout).states():
+        board_cells.update(state.cells)
+        if state.values.get("reach") == "TRUE":
+            break
+
+    return board_formation(board_cells, rows, columns, new_board)
+
+
+# creates the new board from the (row, col) -> value of the board cells after the goal has been reached
+def board_formation(board_cells, rows, columns, new_board):
+    boolean_board = [[board_cells.get((i, j)) for j in range(columns)] for i in range(rows)] # 2d array
 
     # creates a wall in the place of an already reached goal
     for i in range(rows):
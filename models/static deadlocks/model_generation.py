@@ -1,5 +1,9 @@
 # update worker_row, worker_col according to movement
-import copy
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import board_analysis
+import deadlock_patterns
 
 
 def worker_location_change(rows, columns):
@@ -54,7 +58,16 @@ def moves(i,j, rows, columns, board):
 
 # main function to generate the .smv file
 def generate_nusmv_model(rows ,columns,board_content, board, worker_holder):
-    model_content = f'''
+    return "".join(nusmv_model_fragments(rows, columns, board_content, board, worker_holder))
+
+
+# yields the .smv file piece by piece (at most one cell's clauses or one matrix row each), so it can be written while it is generated
+def nusmv_model_fragments(rows ,columns,board_content, board, worker_holder):
+    # cells the worker can never reach keep their value, the worker rows and columns are limited to the reachable area
+    analysis = board_analysis.analyze_board(board_content)
+    reachable_rows = [i for i, _ in analysis.cells(analysis.player_reachable)]
+    reachable_columns = [j for _, j in analysis.cells(analysis.player_reachable)]
+    yield f'''
 MODULE main
 DEFINE rows:={rows}; columns:={columns};
 -- new  XSB     definition
@@ -66,42 +79,35 @@ DEFINE rows:={rows}; columns:={columns};
 -- g      .      goal
 -- _      _      floor
 VAR
-    worker_row : 0..{rows-1}; --current worker row
-    worker_col : 0..{columns-1}; --current worker col
+    worker_row : {min(reachable_rows)}..{max(reachable_rows)}; --current worker row
+    worker_col : {min(reachable_columns)}..{max(reachable_columns)}; --current worker col
     movement : {{u, d, l, r, 0}};
     board : array 0..{rows-1} of array 0..{columns-1} of boolean;
     
 ASSIGN
 '''
     for i in range(rows):
-        for j in range(columns):
-            if board[i][j]=='b':
-                model_content+=f"init(board[{i}][{j}]):=TRUE;\t"
-            else:
-                model_content+=f"init(board[{i}][{j}]):=FALSE;\t"
-        model_content+=f"\n"
+        yield "".join(f"init(board[{i}][{j}]):={'TRUE' if board[i][j]=='b' else 'FALSE'};\t" for j in range(columns)) + "\n"
 
-    model_content+=f'''
+    yield f'''
 init(movement) := 0;
 init(worker_row) := {worker_holder[0]}; init(worker_col) := {worker_holder[1]};
 
 
 '''
 
-    model_content += worker_location_change(rows, columns)
-    model_content+=f"next(movement):={{u, d ,l ,r}};"
+    yield worker_location_change(rows, columns)
+    yield f"next(movement):={{u, d ,l ,r}};"
     for i in range(rows):
         for j in range(columns):
-            if board[i][j]=='x': # state 'x' cant change
-                model_content += f"\nnext(board[{i}][{j}]):= board[{i}][{j}];\n"
+            if board[i][j]=='x' or not analysis.is_reachable(i, j): # state 'x' cant change, the worker never reaches the cell
+                yield f"\nnext(board[{i}][{j}]):= board[{i}][{j}];\n"
             else:
-                model_content+= f"\nnext(board[{i}][{j}]):=\ncase\n"
-                model_content+=moves(i,j, rows, columns, board)
-                model_content+= f"\tTRUE: board[{i}][{j}];\nesac;\n"
+                yield f"\nnext(board[{i}][{j}]):=\ncase\n" + moves(i,j, rows, columns, board) + f"\tTRUE: board[{i}][{j}];\nesac;\n"
                 
 
 
-    model_content += f'''
+    yield f'''
     
     
 DEFINE
@@ -118,169 +124,33 @@ DEFINE
     up_step := worker_row>0 & !walls[worker_row - 1][worker_col] & !board[worker_row - 1][worker_col];
     up_push := worker_row>1 & board[worker_row - 1][worker_col] & !walls[worker_row - 2][worker_col] & !board[worker_row - 2][worker_col] & !deadlocks[worker_row - 2][worker_col] ;
 
-    down_3_block := (worker_row<{rows-3} & (board[worker_row + 3][worker_col] | wall[worker_row + 3][worker_col]))
-    down_right_block := ((board[worker_row + 3][worker_col + 1] | wall[worker_row + 3][worker_col + 1]) & (board[worker_row + 2][worker_col + 1] | wall[worker_row + 2][worker_col + 1]))
-    down_left_block := ((board[worker_row + 3][worker_col - 1] | wall[worker_row + 3][worker_col - 1]) & (board[worker_row + 2][worker_col - 1] | wall[worker_row + 2][worker_col - 1]))
-    down_freeze := down_3_block & (down_right_block | down_left_block)
-
-    right_3_block := (worker_col<{columns-3} & (board[worker_row][worker_col + 3] | wall[worker_row][worker_col + 3]))
-    right_down_block := ((board[worker_row + 1][worker_col + 3] | wall[worker_row + 1][worker_col + 3]) & (board[worker_row + 1][worker_col + 2] | wall[worker_row + 1][worker_col + 2]))
-    right_up_block := ((board[worker_row - 1][worker_col + 3] | wall[worker_row - 1][worker_col + 3]) & (board[worker_row - 1][worker_col + 2] | wall[worker_row - 1][worker_col + 2]))
-    right_freeze := right_3_block & (right_down_block | right_up_block)
-
-    left_3_block := (worker_col>2 & (board[worker_row][worker_col - 3] | wall[worker_row][worker_col - 3]))
-    left_down_block := ((board[worker_row + 1][worker_col - 3] | wall[worker_row + 1][worker_col - 3]) & (board[worker_row + 1][worker_col - 2] | wall[worker_row + 1][worker_col - 2]))
-    left_up_block := ((board[worker_row - 1][worker_col - 3] | wall[worker_row - 1][worker_col - 3]) & (board[worker_row - 1][worker_col - 2] | wall[worker_row - 1][worker_col - 2]))
-    left_freeze := left_3_block & (left_down_block | left_up_block)
-
-
-    up_3_block := (worker_row>2 & (board[worker_row - 3][worker_col] | wall[worker_row - 3][worker_col]))
-    up_right_block := ((board[worker_row - 3][worker_col + 1] | wall[worker_row - 3][worker_col + 1]) & (board[worker_row - 2][worker_col + 1] | wall[worker_row - 2][worker_col + 1]))
-    up_left_block := ((board[worker_row - 3][worker_col - 1] | wall[worker_row - 3][worker_col - 1]) & (board[worker_row - 2][worker_col - 1] | wall[worker_row - 2][worker_col - 1]))
-    up_freeze := up_3_block & (up_right_block | up_left_block)
-    
-    
-
 
 '''
 
-    model_content += f'''
-walls :='''
     # creating the walls constant
-    model_content += " [\n"
-    for i in range(rows):
-        model_content += "["
-        for j in range(columns):
-            if board[i][j] == 'x':
-                model_content += " TRUE"
-            else:
-                model_content += "FALSE"
-            if j < columns - 1:
-                model_content += ", "
-        model_content += "]"
-        if i < rows - 1:
-            model_content += ",\n"
-
-    model_content += "];"
+    yield from boolean_matrix("walls", [[board[i][j] == 'x' for j in range(columns)] for i in range(rows)])
     
-    deadlocks_matrix=find_deadlock_squares(board_content)
-    model_content += f'''
-deadlocks :='''
-    # creating the walls constant
-    model_content += " [\n"
-    for i in range(rows):
-        model_content += "["
-        for j in range(columns):
-            if deadlocks_matrix[i][j] == True:
-                model_content += " TRUE"
-            else:
-                model_content += "FALSE"
-            if j < columns - 1:
-                model_content += ", "
-        model_content += "]"
-        if i < rows - 1:
-            model_content += ",\n"
-
-    model_content += "];"
+    # a box can not be pushed to a goal from the cells that no pull from a goal reaches
+    deadlocks_matrix=analysis.to_matrix(analysis.all_cells & ~analysis.box_reachable)
+    yield from boolean_matrix("deadlocks", [[deadlocks_matrix[i][j] for j in range(columns)] for i in range(rows)])
 
     
-    board_mat=parse_xsb(board_content)
+    # frozen boxes and goals too few boxes can still reach, the states where they hold are left out of the model
+    yield f"\nDEFINE\n"
+    yield from deadlock_patterns.deadlock_patterns(board_content).smv_fragments()
+    yield f"INVAR !deadlocked;\n"
 
-    model_content += f"\nDEFINE\n"
-    model_content +=f"\treach:= "
-    for i in range(rows):
-        for j in range(columns):
-            if board_mat[i][j]=='.' or board_mat[i][j]=='+' or board_mat[i][j]=='*':
-                    model_content += f"board[{i}][{j}] & "
-    model_content = model_content[:-3]  # remove the last " & "
-    model_content+=";"
+    yield f"\nDEFINE\n"
+    yield f"\treach:= " + " & ".join(f"board[{i}][{j}]" for i, j in analysis.cells(analysis.goals)) + ";"
 
 
     
-    model_content += f"\n\tLTLSPEC G(!reach)"
-    
-    return model_content
-
-# Define Sokoban elements
-WALL = '#'
-FLOOR = '-'
-BOX = '$'
-GOAL = '.'
-PLAYER = '@'
-BOX_ON_GOAL = '*'
-PLAYER_ON_GOAL = '+'
-
-# Helper functions to process Sokoban board
-def parse_xsb(xsb_str):
-    """Parses the Sokoban board from XSB format string."""
-    board = [list(line) for line in xsb_str.strip().splitlines()]
-    return board
+    yield f"\n\tLTLSPEC G(!reach)"
 
-def clear_board(board):
-    """Clears all boxes from the board to prepare for the pull algorithm."""
-    cleared_board = copy.deepcopy(board)
-    for y, row in enumerate(cleared_board):
-        for x, cell in enumerate(row):
-            if cell == BOX or cell == BOX_ON_GOAL:
-                cleared_board[y][x] = GOAL if cell == BOX_ON_GOAL else FLOOR
-            if cell == PLAYER or cell == PLAYER_ON_GOAL:
-                cleared_board[y][x] = GOAL if cell == PLAYER_ON_GOAL else FLOOR
 
-    return cleared_board
-
-def find_goals(board):
-    """Finds the coordinates of all goal squares."""
-    goals = []
-    for y, row in enumerate(board):
-        for x, cell in enumerate(row):
-            if cell in [GOAL, PLAYER_ON_GOAL, BOX_ON_GOAL]:
-                goals.append((y, x))
-    return goals
-
-def is_free_square(board, y, x):
-    """Checks if a square is free (walkable) for the player."""
-    return board[y][x] in [FLOOR, GOAL]
-
-def pull_box(board, start_y, start_x, visited):
-    """Performs the pull algorithm starting from a goal square."""
-    directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-    stack = [(start_y, start_x)]
-    visited.add((start_y, start_x))
-    
-    while stack:
-        y, x = stack.pop()
-        
-        for dy, dx in directions:
-            new_y, new_x = y + dy, x + dx
-            
-            # Check if pulling is possible (opposite side is free)
-            if (0 < new_y < (len(board)-1) and 0 < new_x < (len(board[0])-1) and 
-                (new_y, new_x) not in visited and is_free_square(board, new_y, new_x)and is_free_square(board, new_y+dy, new_x+dx)):
-                
-                visited.add((new_y, new_x))
-                stack.append((new_y, new_x))
-
-def find_deadlock_squares(xsb_str):
-    """Identifies simple deadlock squares on the Sokoban board."""
-    board = parse_xsb(xsb_str)
-    goals = find_goals(board)
-    visited = set()
-    
-    # Clear the board of all boxes
-    cleared_board = clear_board(board)
-    
-    # Iterate over all goal squares
-    for goal_y, goal_x in goals:
-        # Place a box at the goal square
-        temp_board = copy.deepcopy(cleared_board)
-        temp_board[goal_y][goal_x] = BOX
-        
-        # Perform the pull operation
-        pull_box(temp_board, goal_y, goal_x, visited)
-    
-    #Creates a boolean matrix of the same size as the Sokoban board based on the visited set.
-    # b
-    deadlock_matrix = [[True for _ in row] for row in board]
-    for (y, x) in visited:
-        deadlock_matrix[y][x] = False
-    return deadlock_matrix
+# yields a matrix of booleans as an SMV array constant, one row at a time
+def boolean_matrix(name, matrix):
+    yield f"\n{name} := [\n"
+    for i, row in enumerate(matrix):
+        yield "[" + ", ".join(" TRUE" if value else "FALSE" for value in row) + "]" + (",\n" if i < len(matrix) - 1 else "")
+    yield "];"
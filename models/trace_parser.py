@@ -0,0 +1,131 @@
+# incremental parser for nuXmv counterexample traces
+import io
+import re
+
+# variables holding the player's move in the different models
+MOVE_VARIABLES = ("move", "movement", "action_person")
+
+# arrays holding the board cells in the different models
+CELL_ARRAYS = ("sokoban_board", "board")
+
+STATE_PATTERN = re.compile(r"-> State: (\d+)\.(\d+) <-")
+ASSIGNMENT_PATTERN = re.compile(r"^\s*([\w\[\]\.\-]+) = (\S+)\s*$")
+CELL_PATTERN = re.compile(r"^(\w+)\[(\d+)\]\[(\d+)\]$")
+# cells declared one by one (grid model with restricted domains)
+CELL_VARIABLE_PATTERN = re.compile(r"^cell_(\d+)_(\d+)$")
+SPECIFICATION_PATTERN = re.compile(r"-- specification (.*) is (true|false)")
+BOUND_PATTERN = re.compile(r"-- no counterexample found with bound (\d+)")
+
+
+class TraceState:
+    """
+    One state of a trace: the variables nuXmv printed for it, which are the ones that changed
+    since the previous state (all of them for the first state).
+    """
+    __slots__ = ("trace", "index", "loop_start", "values")
+
+    def __init__(self, trace, index, loop_start):
+        self.trace = trace
+        self.index = index
+        self.loop_start = loop_start
+        self.values = {}
+
+    @property
+    def move(self):
+        """The move of the player if it changed in this state, else None."""
+        for name in MOVE_VARIABLES:
+            if name in self.values:
+                return self.values[name]
+        return None
+
+    @property
+    def pushes(self):
+        """The push flags that changed in this state as {direction letter: bool}, e.g. {'u': True}."""
+        return {name[0]: value == "TRUE" for name, value in self.values.items() if name.endswith("_push")}
+
+    @property
+    def cells(self):
+        """The board cells that changed in this state as {(row, column): value}."""
+        cells = {}
+        for name, value in self.values.items():
+            match = CELL_PATTERN.match(name)
+            if match and match.group(1) in CELL_ARRAYS:
+                cells[(int(match.group(2)), int(match.group(3)))] = value
+                continue
+            match = CELL_VARIABLE_PATTERN.match(name)
+            if match:
+                cells[(int(match.group(1)), int(match.group(2)))] = value
+        return cells
+
+
+class TraceParser:
+    """
+    Reads nuXmv output line by line and yields the states of its traces as they complete,
+    so the output is never held in memory.
+    The verdicts and checked bounds are collected on the way.
+    Usage:
+        with open(output_filename) as f:
+            parser = TraceParser(f)
+            for state in parser.states():
+                ...
+            parser.drain()
+            parser.specifications / parser.last_bound
+    """
+
+    def __init__(self, lines):
+        self.lines = as_lines(lines)
+        # (specification, holds) for every "-- specification ... is true/false" line
+        self.specifications = []
+        # last bound BMC reported without a counterexample
+        self.last_bound = None
+        self.states_found = 0
+
+    def states(self):
+        """Yields a TraceState for every state of every trace in the output."""
+        state = None
+        loop_start = False
+        for line in self.lines:
+            match = ASSIGNMENT_PATTERN.match(line)
+            if match and state is not None:
+                state.values[match.group(1)] = match.group(2)
+                continue
+            if state is not None:
+                yield state
+                state = None
+            match = STATE_PATTERN.search(line)
+            if match:
+                state = TraceState(int(match.group(1)), int(match.group(2)) - 1, loop_start)
+                loop_start = False
+                self.states_found += 1
+            elif "-- Loop starts here" in line:
+                loop_start = True
+            else:
+                self._read_status(line)
+        if state is not None:
+            yield state
+
+    def drain(self):
+        """Reads the rest of the output, only collecting verdicts and bounds."""
+        for line in self.lines:
+            self._read_status(line)
+
+    def _read_status(self, line):
+        match = SPECIFICATION_PATTERN.search(line)
+        if match:
+            self.specifications.append((match.group(1).strip(), match.group(2) == "true"))
+            return
+        match = BOUND_PATTERN.search(line)
+        if match:
+            self.last_bound = int(match.group(1))
+
+    def specification_holds(self):
+        """Checks if a specification was proved true, i.e. there is no trace reaching the goal."""
+        return any(holds for _, holds in self.specifications)
+
+
+def as_lines(output):
+    """Returns an iterator over the lines of nuXmv output given as a string, a file or any iterable of lines."""
+    if isinstance(output, str):
+        return iter(io.StringIO(output))
+    return iter(output)
+
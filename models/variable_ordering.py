@@ -0,0 +1,151 @@
+# BDD variable orders built from the board geometry, and a store of the orders nuXmv ends its BDD runs with
+# an order file lists one variable (or one bit, name.k) per line, the first line is the top of the BDDs
+import math
+import os
+
+import board_analysis
+import nuxmv_session
+
+# rows: the coordinates, then the cells row by row (close to nuXmv's own order, kept as a baseline)
+# interleaved: the cells row by row with the bits of the coordinates spread between them
+# hilbert: the cells along a Hilbert curve, so neighbouring cells stay close, with the coordinate bits spread between them
+STRATEGIES = ("interleaved", "hilbert", "rows")
+DEFAULT_STRATEGY = "interleaved"
+
+DEFAULT_ORDER_DIRECTORY = "variable_orders"
+
+# dynamic reordering method nuXmv uses while it builds and checks the model
+REORDER_METHOD = "sift"
+
+
+class ModelVariables:
+    """
+    Variables of a board model, as the orders need them:
+        name         - name of the model, part of the order file names
+        rows         - rows of the board array
+        columns      - columns of the board array
+        coordinates  - (name, low, high) of the range variables holding board coordinates
+        controls     - the other variables, placed at the top
+    The cells are board[i][j].
+    """
+
+    def __init__(self, name, rows, columns, coordinates, controls):
+        self.name = name
+        self.rows = rows
+        self.columns = columns
+        self.coordinates = coordinates
+        self.controls = controls
+
+    def cell(self, i, j):
+        return f"board[{i}][{j}]"
+
+
+def position_variables(board, rows=None, columns=None, push_model=False):
+    """
+    Variables of the position based model (model_generation.nusmv_model_fragments) of an XSB string,
+    or of its push-level model (model_generation.push_model_fragments) with push_model.
+    rows and columns default to the size of the board.
+    """
+    analysis = board_analysis.analyze_board(board)
+    area = list(analysis.cells(analysis.player_reachable))
+    row_range = (min(i for i, _ in area), max(i for i, _ in area)) if area else (0, 0)
+    column_range = (min(j for _, j in area), max(j for _, j in area)) if area else (0, 0)
+    coordinates = [("worker_row",) + row_range, ("worker_col",) + column_range]
+    if push_model:
+        coordinates += [("push_row",) + row_range, ("push_col",) + column_range]
+        return ModelVariables("push", analysis.rows, analysis.columns, coordinates, ["movement"])
+    return ModelVariables("position", rows or analysis.rows, columns or analysis.columns, coordinates, ["movement"])
+
+
+def bit_count(low, high):
+    """Bits nuXmv encodes the range low..high with."""
+    return math.ceil(math.log2(high - low + 1)) if high > low else 0
+
+
+def hilbert_index(size, i, j):
+    """Position of the cell (i, j) along the Hilbert curve filling a size x size square, size a power of two."""
+    index = 0
+    half = size // 2
+    while half:
+        row_bit = 1 if i & half else 0
+        column_bit = 1 if j & half else 0
+        index += half * half * ((3 * row_bit) ^ column_bit)
+        # rotates the quadrant so the curve enters the next level where the last one left it
+        if column_bit == 0:
+            if row_bit == 1:
+                i, j = half - 1 - i, half - 1 - j
+            i, j = j, i
+        half //= 2
+    return index
+
+
+def cell_order(rows, columns, strategy=DEFAULT_STRATEGY):
+    """Returns the (row, column) cells of a rows x columns board in the order of the strategy."""
+    cells = [(i, j) for i in range(rows) for j in range(columns)]
+    if strategy == "hilbert":
+        size = 1 << max(0, (max(rows, columns) - 1).bit_length())
+        cells.sort(key=lambda cell: hilbert_index(size, *cell))
+    return cells
+
+
+def variable_order(variables, strategy=DEFAULT_STRATEGY):
+    """Returns the order of a ModelVariables as a list of variable and bit names."""
+    cells = [variables.cell(i, j) for i, j in cell_order(variables.rows, variables.columns, strategy)]
+    if strategy == "rows":
+        return list(variables.controls) + [name for name, _, _ in variables.coordinates] + cells
+
+    # most significant bits first, the bits of the coordinates alternate
+    widths = [bit_count(low, high) for _, low, high in variables.coordinates]
+    bits = [f"{name}.{k}" for k in reversed(range(max(widths, default=0)))
+            for (name, _, _), width in zip(variables.coordinates, widths) if k < width]
+    # every bit sits before an equal share of the cells, each cell is close to the worker bits its next value reads
+    order = list(variables.controls)
+    for index, bit in enumerate(bits):
+        order.append(bit)
+        order += cells[index * len(cells) // len(bits):(index + 1) * len(cells) // len(bits)]
+    if not bits:
+        order += cells
+    return order
+
+
+def board_key(board):
+    """Hash of the normalized board, the key of its orders."""
+    return board_analysis.board_hash(board)
+
+
+class OrderStore:
+    """
+    Variable orders of the BDD runs, kept in directory:
+        <model>_<key>_<strategy>.ord  - the order generated from the board geometry
+        <model>_<key>.ord             - the order nuXmv wrote at the end of the last run, after dynamic reordering
+    A run starts from the saved order when there is one, so later runs on the board (and the iterative
+    sub-problems, which pass the key of their board) start where reordering left the last run.
+    """
+
+    def __init__(self, directory=DEFAULT_ORDER_DIRECTORY, strategy=DEFAULT_STRATEGY):
+        self.directory = directory
+        self.strategy = strategy
+
+    def path(self, variables, key, strategy=None):
+        suffix = "" if strategy is None else f"_{strategy}"
+        return os.path.join(self.directory, f"{variables.name}_{key[:16]}{suffix}.ord")
+
+    def input_order(self, variables, key):
+        """Returns the order file a run starts from, the generated order is written when nothing is saved."""
+        saved = self.path(variables, key)
+        if os.path.exists(saved):
+            return saved
+        generated = self.path(variables, key, self.strategy)
+        if not os.path.exists(generated):
+            os.makedirs(self.directory, exist_ok=True)
+            with open(generated, "w") as f:
+                f.writelines(name + "\n" for name in variable_order(variables, self.strategy))
+        return generated
+
+    def bdd_commands(self, variables, key, check_commands=("check_ltlspec",)):
+        """Commands of a BDD run that reads the order, reorders dynamically and saves the order it ends with."""
+        return [f"set input_order_file {nuxmv_session.quote(os.path.abspath(self.input_order(variables, key)))}",
+                "set enable_reorder 1",
+                f"set reorder_method {REORDER_METHOD}",
+                "go"] + list(check_commands) + [
+                f"write_order -o {nuxmv_session.quote(os.path.abspath(self.path(variables, key)))}"]
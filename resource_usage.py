@@ -0,0 +1,212 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import psutil
+
+# =============================================
+# Solver Resource Accounting
+# =============================================
+# Measures the peak memory, CPU time and context switches of a solver run
+# without polling it. On POSIX the run is reaped with wait4, whose rusage
+# covers the solver and every child it waited for (nuXmv): ru_maxrss is the
+# peak RSS of the largest of them, the times and switches are their sums.
+# A run that is killed at its time limit is read once, just before the kill,
+# from the kernel's high-water marks (VmHWM) of the live process tree.
+# Where wait4 is missing (Windows) one shared sampler thread polls the
+# process trees of all running jobs.
+# =============================================
+
+# seconds between the checks for the exit of a run whose pipes are closed
+WAIT_INTERVAL = 0.01
+# seconds reap waits for a killed run to exit and for its pipes to close
+REAP_TIMEOUT = 10
+# seconds between two passes of the shared sampler
+SAMPLE_INTERVAL = 0.1
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS
+MAXRSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+MB = 1024 ** 2
+
+
+class ResourceUsage:
+    """
+    Resources of one solver run and its children:
+        peak_memory           - peak RSS [MB] of the largest process
+        cpu_user, cpu_system  - CPU time [seconds] in user and system mode, summed over the processes
+        voluntary_switches    - context switches while waiting (I/O, sleeping)
+        involuntary_switches  - context switches forced by the scheduler
+    """
+
+    FIELDS = ('peak_memory', 'cpu_user', 'cpu_system', 'voluntary_switches', 'involuntary_switches')
+
+    def __init__(self, peak_memory=0.0, cpu_user=0.0, cpu_system=0.0, voluntary_switches=0, involuntary_switches=0):
+        self.peak_memory = peak_memory
+        self.cpu_user = cpu_user
+        self.cpu_system = cpu_system
+        self.voluntary_switches = voluntary_switches
+        self.involuntary_switches = involuntary_switches
+
+    @classmethod
+    def from_rusage(cls, rusage):
+        return cls(rusage.ru_maxrss * MAXRSS_UNIT / MB, rusage.ru_utime, rusage.ru_stime, rusage.ru_nvcsw, rusage.ru_nivcsw)
+
+    def merge(self, other):
+        """Keeps the larger peak and the larger counters of two measurements of the same run."""
+        for field in self.FIELDS:
+            setattr(self, field, max(getattr(self, field), getattr(other, field)))
+
+    def as_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+def peak_rss(process):
+    """Peak RSS [bytes] of a live psutil process: VmHWM on Linux, the peak working set on Windows, else the current RSS."""
+    try:
+        with open(f'/proc/{process.pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    memory_info = process.memory_info()
+    return getattr(memory_info, 'peak_wset', memory_info.rss)
+
+
+def tree_usage(pid):
+    """Reads the ResourceUsage of a live process and its children once."""
+    usage = ResourceUsage()
+    try:
+        root = psutil.Process(pid)
+        processes = [root] + root.children(recursive=True)
+    except psutil.NoSuchProcess:
+        return usage
+    for process in processes:
+        try:
+            with process.oneshot():
+                usage.peak_memory = max(usage.peak_memory, peak_rss(process) / MB)
+                times = process.cpu_times()
+                switches = process.num_ctx_switches()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+        usage.cpu_user += times.user
+        usage.cpu_system += times.system
+        usage.voluntary_switches += switches.voluntary
+        usage.involuntary_switches += switches.involuntary
+    return usage
+
+
+class SharedSampler:
+    """
+    One thread sampling the process trees of all registered runs, for platforms without wait4.
+    The thread runs while at least one run is registered.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.runs = {}
+        self.thread = None
+
+    def register(self, pid):
+        with self.lock:
+            self.runs[pid] = ResourceUsage()
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.sample, daemon=True)
+                self.thread.start()
+
+    def unregister(self, pid):
+        """Stops sampling the run and returns its ResourceUsage."""
+        with self.lock:
+            return self.runs.pop(pid, ResourceUsage())
+
+    def sample(self):
+        while True:
+            with self.lock:
+                pids = list(self.runs)
+                if not pids:
+                    self.thread = None
+                    return
+            for pid in pids:
+                usage = tree_usage(pid)
+                with self.lock:
+                    if pid in self.runs:
+                        self.runs[pid].merge(usage)
+            time.sleep(self.interval)
+
+
+_sampler = SharedSampler()
+
+
+def communicate(process, timeout=None):
+    """
+    process.communicate(timeout=timeout) that also measures the run.
+    Returns (stdout, stderr, ResourceUsage). When the timeout expires subprocess.TimeoutExpired is raised
+    with the ResourceUsage of the still running process tree in its usage attribute, the caller kills the run
+    and reaps it with reap(process, error).
+    """
+    if not hasattr(os, 'wait4'):
+        return sampled_communicate(process, timeout)
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    outputs = {}
+    readers = [threading.Thread(target=read_stream, args=(stream, name, outputs), daemon=True)
+               for name, stream in (('stdout', process.stdout), ('stderr', process.stderr)) if stream is not None]
+    for reader in readers:
+        reader.start()
+    for reader in readers:
+        reader.join(None if deadline is None else max(0, deadline - time.monotonic()))
+        if reader.is_alive():
+            raise timeout_expired(process, timeout, readers)
+    # the pipes are closed, the process is exiting: reap it with its rusage instead of process.wait()
+    while True:
+        pid, status, rusage = os.wait4(process.pid, os.WNOHANG)
+        if pid:
+            break
+        if deadline is not None and time.monotonic() > deadline:
+            raise timeout_expired(process, timeout, readers)
+        time.sleep(WAIT_INTERVAL)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return outputs.get('stdout'), outputs.get('stderr'), ResourceUsage.from_rusage(rusage)
+
+
+def read_stream(stream, name, outputs):
+    outputs[name] = stream.read()
+    stream.close()
+
+
+def timeout_expired(process, timeout, readers=()):
+    error = subprocess.TimeoutExpired(process.args, timeout)
+    error.usage = tree_usage(process.pid)
+    error.readers = readers
+    return error
+
+
+def reap(process, error, timeout=REAP_TIMEOUT):
+    """
+    Finishes a run killed after communicate timed out (error is its TimeoutExpired): waits for the process,
+    so no zombie is left behind, and for the threads reading its pipes.
+    """
+    try:
+        if hasattr(error, 'readers'):
+            process.wait(timeout)
+            for reader in error.readers:
+                reader.join(timeout)
+        else:
+            process.communicate(timeout=timeout)  # sampled_communicate: communicate again collects the pipes
+    except subprocess.TimeoutExpired:
+        print(f"The process {process.pid} did not exit {timeout} seconds after it was killed.")
+
+
+def sampled_communicate(process, timeout=None):
+    """communicate() for platforms without wait4, the run is measured by the shared sampler."""
+    _sampler.register(process.pid)
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired as error:
+        error.usage = _sampler.unregister(process.pid)
+        error.usage.merge(tree_usage(process.pid))
+        raise
+    return stdout, stderr, _sampler.unregister(process.pid)
@@ -0,0 +1,236 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import job_limits
+
+# =============================================
+# Solver Results Cache
+# =============================================
+# Stores the result of every (board, solver) job in a SQLite file, so
+# repeated runs of run_solvers_directory.py only run new jobs.
+# A job is identified by the hash of the normalized XSB board, the hash
+# of the solver binary, the engine (BDD/SAT), the steps bound and the
+# iterative flag. Sweeps over a board directory are recorded as well,
+# so an interrupted sweep can be resumed where it stopped. The features
+# of the boards (board_analysis.FEATURES) are kept next to the results,
+# the job scheduler predicts the runtimes of new jobs from them.
+# =============================================
+
+DEFAULT_CACHE_FILE = 'results_cache.sqlite'
+
+# steps=None is stored as -1, SQLite primary keys should not hold NULLs
+NO_STEPS = -1
+
+# statuses that do not depend on the time limit of the run
+FINAL_STATUSES = ('solved', 'unsolvable', 'no_solution_in_bound')
+
+# columns added to the results table after it was first released, added to older cache files when they are opened
+ADDED_COLUMNS = (('cpu_user', 'REAL'), ('cpu_system', 'REAL'),
+                 ('voluntary_switches', 'INTEGER'), ('involuntary_switches', 'INTEGER'), ('memory_limit', 'REAL'))
+
+
+def normalize_xsb(board_text):
+    """Normalizes an XSB board: strips trailing whitespace and drops empty lines."""
+    lines = [line.rstrip() for line in board_text.splitlines()]
+    return '\n'.join(line for line in lines if line)
+
+
+def board_hash(board_path):
+    """Returns the sha256 of the normalized XSB content of the board file."""
+    with open(board_path, 'r') as f:
+        return hashlib.sha256(normalize_xsb(f.read()).encode()).hexdigest()
+
+
+_file_hashes = {}
+
+
+def file_hash(path):
+    """Returns the sha256 of a (solver) binary, cached by path, size and modification time."""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime)
+    if key not in _file_hashes:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        _file_hashes[key] = digest.hexdigest()
+    return _file_hashes[key]
+
+
+class ResultCache:
+    """
+    Content addressed store of solver results.
+    Usage:
+        cache = ResultCache('results_cache.sqlite')
+        cache.start_sweep(settings, resume)
+        key = cache.job_key(board_path, solver_path, bdd, steps, iterative_mode)
+        cache.lookup(key, time_limit) / cache.store(key, result) / cache.mark_done(board_path, solver_path)
+    """
+
+    def __init__(self, db_path=DEFAULT_CACHE_FILE):
+        self.db_path = db_path
+        self.sweep_id = None
+        self.connection = sqlite3.connect(db_path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS results (
+                board_hash TEXT NOT NULL,
+                solver_hash TEXT NOT NULL,
+                engine TEXT NOT NULL,
+                steps INTEGER NOT NULL,
+                iterative INTEGER NOT NULL,
+                board_path TEXT,
+                solver_path TEXT,
+                status TEXT NOT NULL,
+                solution TEXT,
+                solvable INTEGER,
+                runtime REAL,
+                peak_memory REAL,
+                time_limit REAL,
+                created_at REAL,
+                cpu_user REAL,
+                cpu_system REAL,
+                voluntary_switches INTEGER,
+                involuntary_switches INTEGER,
+                memory_limit REAL,
+                PRIMARY KEY (board_hash, solver_hash, engine, steps, iterative)
+            );
+            CREATE TABLE IF NOT EXISTS sweeps (
+                sweep_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                settings TEXT NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS board_features (
+                board_hash TEXT PRIMARY KEY,
+                features TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS sweep_jobs (
+                sweep_id INTEGER NOT NULL,
+                board_path TEXT NOT NULL,
+                solver_path TEXT NOT NULL,
+                PRIMARY KEY (sweep_id, board_path, solver_path)
+            );
+        ''')
+        self.migrate()
+        self.connection.commit()
+
+    def migrate(self):
+        """Adds the columns of ADDED_COLUMNS that a cache file written by an older version lacks."""
+        existing = {row['name'] for row in self.connection.execute('PRAGMA table_info(results)')}
+        for name, column_type in ADDED_COLUMNS:
+            if name not in existing:
+                self.connection.execute(f'ALTER TABLE results ADD COLUMN {name} {column_type}')
+
+    def close(self):
+        self.connection.close()
+
+    @staticmethod
+    def job_key(board_path, solver_path, bdd, steps, iterative_mode):
+        """Returns the key of a (board, solver) job."""
+        return (board_hash(board_path), file_hash(solver_path), 'BDD' if bdd else 'SAT',
+                NO_STEPS if steps is None else int(steps), int(bool(iterative_mode)))
+
+    def lookup(self, key, time_limit, memory_limit=None):
+        """
+        Returns the cached result of the job as a dict, None if the job has to run.
+        Time outs are only reused when they happened with a time limit at least as large,
+        runs out of memory when they happened with a memory limit at least as large (memory_limit None is no limit).
+        """
+        row = self.connection.execute(
+            'SELECT * FROM results WHERE board_hash=? AND solver_hash=? AND engine=? AND steps=? AND iterative=?',
+            key).fetchone()
+        if row is None:
+            return None
+        if row['status'] in FINAL_STATUSES:
+            return dict(row)
+        if row['status'] == 'timeout' and row['time_limit'] is not None and row['time_limit'] >= time_limit:
+            return dict(row)
+        if (row['status'] == job_limits.MEMORY_STATUS and row['memory_limit'] is not None and memory_limit is not None
+                and row['memory_limit'] >= memory_limit):
+            return dict(row)
+        return None
+
+    def store(self, key, result, board_path=None, solver_path=None, time_limit=None):
+        """Stores the result dict returned by run_nuXmv_solver for the job."""
+        solvable = {'solved': 1, 'unsolvable': 0}.get(result['status'])
+        values = key + (board_path, solver_path, result['status'], result.get('solution'), solvable,
+                        result.get('runtime'), result.get('peak_memory'), time_limit, time.time())
+        values += tuple(result.get(name) for name, _ in ADDED_COLUMNS)
+        self.connection.execute(
+            'INSERT OR REPLACE INTO results (board_hash, solver_hash, engine, steps, iterative, board_path, solver_path, '
+            'status, solution, solvable, runtime, peak_memory, time_limit, created_at, '
+            + ', '.join(name for name, _ in ADDED_COLUMNS) + ') VALUES (' + ', '.join('?' * len(values)) + ')',
+            values)
+        self.connection.commit()
+
+    def store_features(self, board_hash, features):
+        """Stores the features (a sequence of numbers) of a board."""
+        self.connection.execute('INSERT OR REPLACE INTO board_features VALUES (?, ?)', (board_hash, json.dumps(list(features))))
+        self.connection.commit()
+
+    def boards_without_features(self):
+        """Returns (board_hash, board_path) of the boards that have results but no stored features."""
+        return [tuple(row) for row in self.connection.execute(
+            'SELECT DISTINCT board_hash, board_path FROM results '
+            'WHERE board_hash NOT IN (SELECT board_hash FROM board_features)')]
+
+    def history(self, solver_hash, engine, steps, iterative):
+        """
+        Returns the results of a solver configuration on the boards with stored features,
+        as dicts of the results columns with the features list added.
+        """
+        rows = self.connection.execute(
+            'SELECT results.*, board_features.features AS features FROM results '
+            'JOIN board_features ON results.board_hash = board_features.board_hash '
+            'WHERE solver_hash=? AND engine=? AND steps=? AND iterative=?',
+            (solver_hash, engine, steps, iterative)).fetchall()
+        return [dict(row, features=json.loads(row['features'])) for row in rows]
+
+    def start_sweep(self, settings, resume=False):
+        """
+        Starts recording a sweep with the given settings (a dict).
+        With resume the latest unfinished sweep with the same settings is continued.
+        """
+        settings_text = json.dumps(settings, sort_keys=True)
+        row = None
+        if resume:
+            row = self.connection.execute(
+                'SELECT sweep_id FROM sweeps WHERE settings=? AND finished_at IS NULL ORDER BY sweep_id DESC LIMIT 1',
+                (settings_text,)).fetchone()
+        if row is not None:
+            self.sweep_id = row['sweep_id']
+            print(f"Resuming sweep {self.sweep_id}")
+        else:
+            cursor = self.connection.execute('INSERT INTO sweeps (settings, started_at) VALUES (?, ?)',
+                                             (settings_text, time.time()))
+            self.sweep_id = cursor.lastrowid
+            self.connection.commit()
+        return self.sweep_id
+
+    def is_done(self, board_path, solver_path):
+        """Checks if the solver already finished the board in the current sweep."""
+        if self.sweep_id is None:
+            return False
+        row = self.connection.execute(
+            'SELECT 1 FROM sweep_jobs WHERE sweep_id=? AND board_path=? AND solver_path=?',
+            (self.sweep_id, board_path, solver_path)).fetchone()
+        return row is not None
+
+    def mark_done(self, board_path, solver_path):
+        """Records that the solver finished the board in the current sweep."""
+        if self.sweep_id is None:
+            return
+        self.connection.execute('INSERT OR IGNORE INTO sweep_jobs VALUES (?, ?, ?)', (self.sweep_id, board_path, solver_path))
+        self.connection.commit()
+
+    def finish_sweep(self):
+        """Marks the current sweep as finished, it will not be resumed anymore."""
+        if self.sweep_id is None:
+            return
+        self.connection.execute('UPDATE sweeps SET finished_at=? WHERE sweep_id=?', (time.time(), self.sweep_id))
+        self.connection.commit()
+        self.sweep_id = None
@@ -0,0 +1,94 @@
+import json
+import os
+import threading
+import time
+
+# =============================================
+# Structured Results Log
+# =============================================
+# One JSON record per finished (board, solver) job, appended to a JSONL
+# file by run_solvers_directory.py next to the prose output files.
+# Each record is written with a single write() on a file opened with
+# O_APPEND, so concurrent writers never interleave their lines and a
+# crash leaves at most a torn last line, which the readers skip.
+# The reports load the log (or its columnar export) instead of scraping
+# the output files.
+# =============================================
+
+DEFAULT_LOG_FILE = 'results_log.jsonl'
+
+# columns of a record, in the order of the exports
+FIELDS = ('timestamp', 'sweep_id', 'board_path', 'board_hash', 'solver_path', 'solver_hash', 'engine', 'steps',
+          'iterative', 'status', 'solution', 'verified', 'moves', 'pushes', 'runtime', 'cpu_user', 'cpu_system',
+          'peak_memory', 'voluntary_switches', 'involuntary_switches', 'time_limit', 'memory_limit', 'cached')
+
+
+class ResultsLog:
+    """
+    Append-only JSONL log of job records.
+    Usage:
+        log = ResultsLog('results_log.jsonl')
+        log.append({'board_path': ..., 'status': 'solved', ...})  # missing FIELDS are written as null
+    """
+
+    def __init__(self, path=DEFAULT_LOG_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def append(self, record):
+        record = dict({field: None for field in FIELDS}, **record)
+        if record['timestamp'] is None:
+            record['timestamp'] = time.time()
+        line = (json.dumps(record) + '\n').encode()
+        with self.lock:
+            descriptor = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(descriptor, line)
+            finally:
+                os.close(descriptor)
+
+
+def read_records(path=DEFAULT_LOG_FILE):
+    """Returns the records of a log as a list of dicts, torn or corrupt lines are skipped."""
+    records = []
+    try:
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict):
+                    records.append(record)
+    except OSError as e:
+        print(f"Failed to read the results log {path}: {e}")
+    return records
+
+
+def load_results(path=DEFAULT_LOG_FILE):
+    """
+    Loads a results log (.jsonl) or one of its exports (.parquet, .csv) as a pandas DataFrame with the FIELDS columns.
+    """
+    import pandas as pd
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    if path.endswith('.csv'):
+        return pd.read_csv(path)
+    return pd.DataFrame(read_records(path), columns=list(FIELDS))
+
+
+def export(log_path, output_path):
+    """
+    Writes the records of a log to a columnar file: Parquet (needs pyarrow or fastparquet) or CSV, by the suffix of output_path.
+    Returns the number of records written, None if the export failed.
+    """
+    frame = load_results(log_path)
+    try:
+        if output_path.endswith('.parquet'):
+            frame.to_parquet(output_path, index=False)
+        else:
+            frame.to_csv(output_path, index=False)
+    except ImportError as e:
+        print(f"Failed to export {log_path} to {output_path}: {e}")
+        return None
+    return len(frame)
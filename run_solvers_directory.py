@@ -1,96 +1,404 @@
+import argparse
+import concurrent.futures
 import glob
 import shutil
 import subprocess
 import os
 import psutil
+import queue
+import re
+import tempfile
 import time
 import psutil
 import threading
 import time
 import stat
+import sys
+import job_limits
+import job_scheduler
+import result_cache
+import resource_usage
+import results_log
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+import board_store
 
+# RAM [MB] reserved for every job started by the parallel runner
+DEFAULT_JOB_MEMORY_MB = 2048
+# seconds between free memory checks while the parallel runner waits to start a job
+MEMORY_POLL_INTERVAL = 1.0
 
 
-def run_nuXmv_solver(solver_path, board_path, output_file,time_limit, iterative_mode=False, bdd=False,steps=None):
+
+def run_nuXmv_solver(solver_path, board_path, output_file,time_limit, iterative_mode=False, bdd=False,steps=None,cwd=None,memory_limit=None,memory_cgroup=None):
     """
     Runs nuXmv solvers exe file
     parameters accepted:
     -ITERATIVE True
     -BDD True
     -STEPS number
+    cwd: working directory of the solver process (defaults to the current directory)
+    memory_limit: memory cap of the run [MB], None for no cap
+    memory_cgroup: delegated cgroup v2 directory the run gets a child group of, None caps its address space (see job_limits)
+    Returns a result dict with status ('solved', 'unsolvable', 'no_solution_in_bound', 'unknown',
+    'timeout', 'memory' or 'error'), solution, runtime [seconds], peak_memory [MB], cpu_user and cpu_system [seconds],
+    voluntary_switches and involuntary_switches (see resource_usage) and memory_limit, None if the solver is missing.
     """
     print(f"solver_path={solver_path} board_path={board_path} outputfile={output_file} time_limit={time_limit} nuXmv iterative mode= {iterative_mode} bdd= {bdd} steps= {steps} ...")
     if not os.path.isfile(solver_path):
         print(f"File not found: {solver_path}")
         return
-    #append running Mode command line
-    command = [solver_path, board_path]
-    if iterative_mode:
-        command.append('-ITERATIVE')
-        command.append('True')
-    if bdd:
-        command.append('-BDD')
-        command.append('True')
-    if steps is not None:
-        command.extend(['-STEPS', str(steps)])  # Ensure steps is always a string
+    command = build_solver_command(solver_path, board_path, iterative_mode, bdd, steps, cwd)
 
+    result = {'status': 'error', 'solution': None, 'runtime': None, 'peak_memory': None, 'memory_limit': memory_limit}
+    memory = job_limits.MemoryLimit(memory_limit, memory_cgroup)
     try:
-        # Start the process and enforce a timeout with communicate()
+        # Start the process under its memory cap and enforce a timeout, its resources are read from the kernel when it ends
         start_time = time.time()  # Start time
-        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        ps_process = psutil.Process(process.pid)  # Get the psutil process object
-        peak_memory_usage = [0]  # Use a list to hold peak memory usage (allows modification in a thread)
-
-        # Start memory monitoring in a separate thread
-        memory_thread = threading.Thread(target=monitor_memory, args=(ps_process, peak_memory_usage))
-        memory_thread.start()
+        process = subprocess.Popen(memory.wrap(command), stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, cwd=cwd)
 
         try:
             # Capture the output and error (if any) from the process with a timeout
-            stdout, stderr = process.communicate(timeout=time_limit)
+            stdout, stderr, usage = resource_usage.communicate(process, timeout=time_limit)
             return_code = process.returncode
-        except subprocess.TimeoutExpired:
+        except subprocess.TimeoutExpired as timeout:
             print("The command exceeded the timeout of 1.5 Hour and was terminated.")
             
-            # Kill the process and any child processes
-            parent = psutil.Process(process.pid)
-            for child in parent.children(recursive=True):
-                child.kill()
-            parent.kill()
+            # Kill the process and any child processes, then reap it and its pipe readers
+            kill_process_tree(process.pid)
+            memory.kill()
+            resource_usage.reap(process, timeout)
 
             with open(output_file, 'a') as f:
                 f.write(f"\n--- Running Solver {solver_path} ---\n")
                 f.write("nuXmv Solver cannot solve this board in time limit.\n")
                 f.write(f"BDD: {bdd} Iterative Mode: {iterative_mode} steps:{steps}\n")
-                f.write(f"Peak Memory Usage: {peak_memory_usage[0]:.2f} MB\n")
-            return  -1# Exit the function
+                write_usage(f, timeout.usage)
+            result.update(status='timeout', runtime=time.time() - start_time, **timeout.usage.as_dict())
+            return result # Exit the function
 
-        memory_thread.join()  # Ensure the memory monitoring thread has finished
         end_time = time.time()  # End time
         elapsed_time = end_time - start_time  # Calculate the elapsed time
+        result.update(runtime=elapsed_time, **usage.as_dict())
+        if memory.peak_memory() is not None:
+            result['peak_memory'] = memory.peak_memory()
 
-        if return_code != 0:
+        if memory.was_exceeded(return_code, (stdout or '') + (stderr or '')):
+            print(f"The {solver_path} ran out of its memory limit of {memory_limit} MB.")
+            with open(output_file, 'a') as f:
+                f.write(f"\n--- Running Solver {solver_path} ---\n")
+                f.write(f"nuXmv Solver ran out of its memory limit of {memory_limit} MB.\n")
+                f.write(f"BDD: {bdd} Iterative Mode: {iterative_mode} steps:{steps}\n")
+                write_usage(f, usage)
+                f.write(f"Running Time: {elapsed_time:.5f} seconds\n")
+            result['status'] = job_limits.MEMORY_STATUS
+        elif return_code != 0:
             print(f"Errors from the nuXmv_solver.exe:\n{stderr}")
         else:
             with open(output_file, 'a') as f:
                 f.write(f"\n--- Running Solver {solver_path} ---\n")
                 f.write(stdout if stdout else 'No output received.\n')
-                f.write(f"Peak Memory Usage: {peak_memory_usage[0]:.2f} MB\n")
+                write_usage(f, usage)
                 f.write(f"Running Time: {elapsed_time:.5f} seconds\n")
             print(f"Output from the {solver_path}:\n{stdout if stdout else 'No output received.'}")
-            print(f"Peak Memory Usage: {peak_memory_usage[0]:.2f} MB")
+            print(f"Peak Memory Usage: {usage.peak_memory:.2f} MB")
+            print(f"CPU Time: user {usage.cpu_user:.2f} seconds, system {usage.cpu_system:.2f} seconds")
             print(f"Running Time: {elapsed_time:.5f} seconds")
+            result['status'], result['solution'] = classify_output(stdout)
             
 
     except Exception as e:
         print(f"Failed to run the {solver_path}: {e}")
-    return 0
+    finally:
+        memory.close()
+    return result
     
 
+def write_usage(f, usage):
+    """
+    Writes the resources of a run (resource_usage.ResourceUsage, or a cached result dict) to an output file.
+    """
+    if isinstance(usage, dict):
+        usage = resource_usage.ResourceUsage(**{field: usage.get(field) or 0 for field in resource_usage.ResourceUsage.FIELDS})
+    f.write(f"Peak Memory Usage: {usage.peak_memory:.2f} MB\n")
+    f.write(f"CPU Time: user {usage.cpu_user:.2f} seconds, system {usage.cpu_system:.2f} seconds\n")
+    f.write(f"Context Switches: {usage.voluntary_switches} voluntary, {usage.involuntary_switches} involuntary\n")
 
-def runSolvers(board_path,directory_path,output_file,time_limit,iterative_mode=False,bdd=True,steps=None):
+
+def classify_output(stdout):
+    """
+    Classifies the output of a finished solver run.
+    Returns (status, solution): status is 'solved', 'unsolvable', 'no_solution_in_bound' or 'unknown'.
+    """
+    solution = extract_solution(stdout)
+    if solution:
+        return 'solved', solution
+    text = stdout.lower() if stdout else ''
+    # an iterative run that finished with a goal order solved the board, whatever the orders tried before printed
+    if "goal order:" in text or "simulation running time" in text:
+        return 'unknown', None
+    if re.search(r"no solution for this board in \d+ steps|no counterexample found with bound", text):
+        return 'no_solution_in_bound', None
+    if any(marker in text for marker in ("unsolvable", "unsolveable", "not solveable", "no solution")):
+        return 'unsolvable', None
+    return 'unknown', None
+
+
+def write_cached_result(output_file, solver_path, cached):
+    """
+    Appends a result taken from the results cache to the board's output file.
+    """
+    with open(output_file, 'a') as f:
+        f.write(f"\n--- Running Solver {solver_path} ---\n")
+        f.write(f"Cached result ({cached['engine']} Iterative Mode: {bool(cached['iterative'])} steps:{cached['steps']}): {cached['status']}\n")
+        if cached['solution']:
+            f.write(f"Solution: {cached['solution']}\n")
+        if cached['cpu_user'] is not None:
+            write_usage(f, cached)
+        elif cached['peak_memory'] is not None:
+            f.write(f"Peak Memory Usage: {cached['peak_memory']:.2f} MB\n")
+        if cached['runtime'] is not None:
+            f.write(f"Running Time: {cached['runtime']:.5f} seconds\n")
+
+
+def serve_from_cache(cache, key, board_path, solver_path, output_file, time_limit, memory_limit=None, log=None):
+    """
+    Handles a job from the results cache.
+    Returns True if the job does not have to run: it already finished in the resumed sweep,
+    or its cached result was written to the output file.
+    """
+    if cache.is_done(board_path, solver_path):
+        print(f"Skipping {solver_path}, already done in this sweep.")
+        return True
+    cached = cache.lookup(key, time_limit, memory_limit)
+    if cached is None:
+        return False
+    print(f"Using cached result of {solver_path}: {cached['status']}")
+    write_cached_result(output_file, solver_path, cached)
+    log_result(log, cache, key, cached, board_path, solver_path, cached['time_limit'], cached=True)
+    cache.mark_done(board_path, solver_path)
+    return True
+
+
+def build_solver_command(solver_path, board_path, iterative_mode=False, bdd=False, steps=None, cwd=None):
+    """
+    Builds the command line of a solver exe run.
+    The solver path is made absolute when the solver runs in another working directory.
+    """
+    #append running Mode command line
+    command = [os.path.abspath(solver_path) if cwd else solver_path, board_path]
+    if iterative_mode:
+        command.append('-ITERATIVE')
+        command.append('True')
+    if bdd:
+        command.append('-BDD')
+        command.append('True')
+    if steps is not None:
+        command.extend(['-STEPS', str(steps)])  # Ensure steps is always a string
+    return command
+
+
+def kill_process_tree(pid):
+    """
+    Kills the process with the given pid and all of its child processes.
+    """
+    try:
+        parent = psutil.Process(pid)
+        for child in parent.children(recursive=True):
+            try:
+                child.kill()
+            except psutil.NoSuchProcess:
+                pass
+        parent.kill()
+    except psutil.NoSuchProcess:
+        pass  # Process has already terminated
+
+
+def raceSolvers(board_path, directory_path, output_file, time_limit, iterative_mode=False, steps=None, engines=(True, False), budgets=None, memory_cgroup=None):
+    """
+    Portfolio mode: starts every solver of directory_path with every engine of engines
+    (True = BDD, False = SAT) on the same board at the same time.
+    budgets (job_limits.EngineBudgets) caps the time and memory of the runs of each engine,
+    without it every run has time_limit and no memory cap.
+    The first run whose solution is verified by replaying it on the board wins,
+    every other run is killed together with its child processes.
+    Returns the winning solution in LURD format, None if no run found a verified solution in time.
+    """
+    runs = []
+    finished_runs = queue.Queue()
+    start_time = time.time()
+    for solver_path in list_solvers(directory_path):
+        for bdd in engines:
+            # every run gets its own working directory, the solvers write their files next to the board
+            work_dir = tempfile.mkdtemp(prefix="sokoban_race_")
+            local_board_path = shutil.copy(board_path, work_dir)
+            command = build_solver_command(solver_path, local_board_path, iterative_mode, bdd, steps, work_dir)
+            memory = job_limits.MemoryLimit(budgets.memory(bdd) if budgets else None, memory_cgroup)
+            print(f"\n--- Racing Solver {solver_path} BDD: {bdd} ---\n")
+            try:
+                process = subprocess.Popen(memory.wrap(command), stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, cwd=work_dir)
+            except Exception as e:
+                print(f"Failed to run the {solver_path}: {e}")
+                memory.close()
+                shutil.rmtree(work_dir, onerror=on_rm_error)
+                continue
+            run = {'solver_path': solver_path, 'bdd': bdd, 'process': process, 'work_dir': work_dir, 'memory': memory,
+                   'deadline': start_time + (budgets.time(bdd) if budgets else time_limit)}
+            run['thread'] = threading.Thread(target=collect_race_output, args=(run, finished_runs))
+            run['thread'].start()
+            runs.append(run)
+
+    winner = None
+    solution = None
+    pending_runs = list(runs)
+    while pending_runs:
+        # Runs past their engine's time budget are killed, the race waits for the next deadline
+        for run in [run for run in pending_runs if run['deadline'] <= time.time()]:
+            print(f"Solver {run['solver_path']} BDD: {run['bdd']} exceeded its time limit and was terminated.")
+            kill_process_tree(run['process'].pid)
+            run['memory'].kill()
+            pending_runs.remove(run)
+        if not pending_runs:
+            print("The race exceeded the time limit, all solvers were terminated.")
+            break
+        try:
+            run, stdout, return_code = finished_runs.get(timeout=max(0, min(run['deadline'] for run in pending_runs) - time.time()))
+        except queue.Empty:
+            continue
+        if run not in pending_runs:
+            continue
+        pending_runs.remove(run)
+        run['elapsed_time'] = time.time() - start_time
+        candidate = extract_solution(stdout) if return_code == 0 else None
+        if candidate and verify_solution(board_path, candidate):
+            winner = run
+            solution = candidate
+            break
+        if run['memory'].was_exceeded(return_code, (stdout or '') + (run['stderr'] or '')):
+            print(f"Solver {run['solver_path']} BDD: {run['bdd']} ran out of its memory limit of {run['memory'].limit_mb} MB.")
+        else:
+            print(f"Solver {run['solver_path']} BDD: {run['bdd']} finished without a verified solution.")
+
+    # Cancel the remaining runs
+    for run in runs:
+        if run is not winner and run['process'].poll() is None:
+            kill_process_tree(run['process'].pid)
+            run['memory'].kill()
+    for run in runs:
+        run['thread'].join()
+        run['memory'].close()
+        shutil.rmtree(run['work_dir'], onerror=on_rm_error)
+
+    with open(output_file, 'a') as f:
+        f.write(f"\n--- Racing Solvers {directory_path} ---\n")
+        if winner is None:
+            f.write("No solver found a verified solution in time limit.\n")
+        else:
+            f.write(f"Winner: {winner['solver_path']} BDD: {winner['bdd']} Iterative Mode: {iterative_mode} steps:{steps}\n")
+            f.write(f"Solution: {solution}\n")
+            f.write(f"Running Time: {winner['elapsed_time']:.5f} seconds\n")
+    print(f"Race winner: {winner['solver_path'] if winner else None} Solution: {solution}")
+    return solution
+
+
+def collect_race_output(run, finished_runs):
+    """ Waits for a racing solver to exit and puts its output on the finished_runs queue """
+    stdout, run['stderr'] = run['process'].communicate()
+    finished_runs.put((run, stdout, run['process'].returncode))
+
+
+def extract_solution(stdout):
+    """
+    Extracts the solution from a solver's output, the formats printed by the models are:
+    - "Solution:" followed by the LURD string on the same or on the next line
+    - "Path to win: ['r', 'u', ...]."
+    Returns the moves as a string of LURD letters, None if the output holds no solution.
+    """
+    lines = stdout.splitlines() if stdout else []
+    for index, line in enumerate(lines):
+        if line.startswith("Path to win:"):
+            moves = "".join(char for char in line.split(":", 1)[1] if char in "lurdLURD")
+            return moves or None
+        if "Solution:" in line:
+            solution = line.split("Solution:", 1)[1].strip()
+            if not solution and index + 1 < len(lines):
+                solution = lines[index + 1].strip()
+            if solution and all(char in "lurdLURD" for char in solution):
+                return solution
+    return None
+
+
+def verify_solution(board_path, solution):
+    """
+    Replays a LURD solution on the XSB board and checks that all boxes end on goals.
+    """
+    return replay_solution(board_path, solution)[0]
+
+
+def replay_solution(board_path, solution):
+    """
+    Replays a LURD solution on the XSB board.
+    Moves into walls or unpushable boxes leave the player in place, like in the models.
+    Returns (solved, moves, pushes): solved if all boxes end on goals, the moves and pushes the player made.
+    """
+    with open(board_path, 'r') as f:
+        board = [line.rstrip('\r\n') for line in f if line.strip()]
+    walls, goals, boxes = set(), set(), set()
+    player = None
+    for i, row in enumerate(board):
+        for j, char in enumerate(row):
+            if char == '#':
+                walls.add((i, j))
+            if char in '.+*':
+                goals.add((i, j))
+            if char in '$*':
+                boxes.add((i, j))
+            if char in '@+':
+                player = (i, j)
+    if player is None or not goals:
+        return False, 0, 0
+
+    def is_free(cell):
+        i, j = cell
+        return 0 <= i < len(board) and 0 <= j < len(board[i]) and cell not in walls and cell not in boxes
+
+    directions = {'l': (0, -1), 'r': (0, 1), 'u': (-1, 0), 'd': (1, 0)}
+    moves = pushes = 0
+    for move in solution.lower():
+        di, dj = directions[move]
+        target = (player[0] + di, player[1] + dj)
+        if target in boxes:
+            beyond = (target[0] + di, target[1] + dj)
+            if is_free(beyond):
+                boxes.remove(target)
+                boxes.add(beyond)
+                player = target
+                moves += 1
+                pushes += 1
+        elif is_free(target):
+            player = target
+            moves += 1
+    return goals.issubset(boxes), moves, pushes
+
+
+def runSolvers(board_path,directory_path,output_file,time_limit,iterative_mode=False,bdd=True,steps=None,jobs=1,job_memory_mb=DEFAULT_JOB_MEMORY_MB,race=False,cache=None,budgets=None,memory_cgroup=None,scheduler=None,escalation=None,log=None):
     
+    # Race all solvers and engines on this board, keep the first verified solution
+    if race:
+        raceSolvers(board_path, directory_path, output_file, time_limit, iterative_mode, steps, budgets=budgets, memory_cgroup=memory_cgroup)
+        cleanup_board_directory(os.path.dirname(board_path))
+        return
+
+    # memory cap of the engine's runs [MB]
+    memory_limit = budgets.memory(bdd) if budgets else None
+
+    # Run the solvers of this board side by side on the worker pool (or in the scheduler's order, or with escalating time slices)
+    if jobs > 1 or scheduler is not None or escalation is not None:
+        solver_jobs = [(solver_path, board_path, output_file) for solver_path in list_solvers(directory_path)]
+        runSolverJobsInParallel(solver_jobs, time_limit, iterative_mode, bdd, steps, jobs, job_memory_mb, cache, memory_limit, memory_cgroup, scheduler, escalation, log)
+        cleanup_board_directory(os.path.dirname(board_path))
+        return
+
         # Iterate through each file in the given directory
     for filename in os.listdir(directory_path):
         # Check if the file is a .exe file
@@ -98,18 +406,40 @@ def runSolvers(board_path,directory_path,output_file,time_limit,iterative_mode=F
             solver_path = os.path.join(directory_path, filename)
             print(f"\n--- Running Solver {filename} ---\n")
             
-            run_nuXmv_solver(solver_path,board_path,output_file,time_limit,iterative_mode,bdd,steps)
+            run_solver_job(solver_path,board_path,output_file,time_limit,iterative_mode,bdd,steps,cache,memory_limit,memory_cgroup,log)
             print(solver_path)
             print(board_path)
             print()
     
-        board_directory=os.path.dirname(board_path)
-        remove_files_with_pattern(board_directory,".out")
-        remove_files_with_pattern(board_directory,".smv")
-        remove_files_with_pattern(board_directory,".log")
-        remove_non_solution_folders(board_directory)
+        cleanup_board_directory(os.path.dirname(board_path))
 
-def runSolversForDirectory(board_directory,directory_path,time_limit,iterative_mode=False,bdd=True,steps=None):
+def runSolversForDirectory(board_directory,directory_path,time_limit,iterative_mode=False,bdd=True,steps=None,jobs=1,job_memory_mb=DEFAULT_JOB_MEMORY_MB,race=False,cache=None,budgets=None,memory_cgroup=None,scheduler=None,escalation=None,log=None):
+    # Process only files with .xsb extension (you can modify the filter as needed)
+    board_files = [board_file for board_file in os.listdir(os.path.join('boards', board_directory)) if board_file.endswith('.xsb' or '.txt')]
+    runSolversForBoards(board_directory,board_files,directory_path,time_limit,iterative_mode,bdd,steps,jobs,job_memory_mb,race,cache,budgets,memory_cgroup,scheduler,escalation,log)
+
+def runSolversForStore(store_path,board_directory,levels,directory_path,time_limit,iterative_mode=False,bdd=True,steps=None,jobs=1,job_memory_mb=DEFAULT_JOB_MEMORY_MB,race=False,cache=None,budgets=None,memory_cgroup=None,scheduler=None,escalation=None,log=None):
+    """
+    Runs the solvers on levels of a board store (models/board_store.py) given by id, title or hash, on all levels if levels is None.
+    The solvers read board files: every level is written once to boards/<board_directory>, and kept there for the next sweeps.
+    """
+    store = board_store.BoardStore(store_path)
+    board_ids = range(len(store)) if levels is None else [store.find(level) for level in levels]
+    board_files = []
+    selected = set()
+    for level, board_id in zip(levels or board_ids, board_ids):
+        if board_id is None:
+            print(f"Level {level} is not in the store {store_path}, skipping it.")
+            continue
+        board_file = os.path.basename(store.extract(board_id, os.path.join('boards', board_directory)))
+        # a level selected twice (by id and by title, or equal levels of two packs) runs once
+        if board_file not in selected:
+            selected.add(board_file)
+            board_files.append(board_file)
+    print(f"Selected {len(board_files)} of the {len(store)} levels of {store_path}")
+    runSolversForBoards(board_directory,board_files,directory_path,time_limit,iterative_mode,bdd,steps,jobs,job_memory_mb,race,cache,budgets,memory_cgroup,scheduler,escalation,log)
+
+def runSolversForBoards(board_directory,board_files,directory_path,time_limit,iterative_mode=False,bdd=True,steps=None,jobs=1,job_memory_mb=DEFAULT_JOB_MEMORY_MB,race=False,cache=None,budgets=None,memory_cgroup=None,scheduler=None,escalation=None,log=None):
     
     # Define the board directory and solutions directory
     board_path_dir = os.path.join('boards', board_directory)
@@ -119,20 +449,30 @@ def runSolversForDirectory(board_directory,directory_path,time_limit,iterative_m
     if not os.path.exists(solutions_dir):
         os.makedirs(solutions_dir)
         
-    # Iterate over all files in the board directory
-    for board_file in os.listdir(board_path_dir):
-        # Process only files with .txt extension (you can modify the filter as needed)
-        if board_file.endswith('.xsb' or '.txt'):
-            board_path = os.path.join(board_path_dir, board_file)
+    # (board, solver) jobs collected for the worker pool
+    solver_jobs = []
+    pooled = (jobs > 1 or scheduler is not None or escalation is not None) and not race
 
-            # Define the output file name and path
-            output_file_name = f"{os.path.splitext(board_file)[0]}_output.txt"
-            output_file = os.path.join(solutions_dir, output_file_name)
+    # Iterate over the board files
+    for board_file in board_files:
+        board_path = os.path.join(board_path_dir, board_file)
 
+        # Define the output file name and path
+        output_file_name = f"{os.path.splitext(board_file)[0]}_output.txt"
+        output_file = os.path.join(solutions_dir, output_file_name)
+
+        if pooled:
+            solver_jobs.extend((solver_path, board_path, output_file) for solver_path in list_solvers(directory_path))
+        else:
             # Run the solvers for this board file
-            runSolvers(board_path, directory_path, output_file, time_limit, iterative_mode,bdd,steps)
+            runSolvers(board_path, directory_path, output_file, time_limit, iterative_mode,bdd,steps,race=race,cache=cache,budgets=budgets,memory_cgroup=memory_cgroup,log=log)
+
+    if pooled:
+        runSolverJobsInParallel(solver_jobs, time_limit, iterative_mode, bdd, steps, jobs, job_memory_mb, cache,
+                                budgets.memory(bdd) if budgets else None, memory_cgroup, scheduler, escalation, log)
+        cleanup_board_directory(board_path_dir)
     
-def runSolversForSingleBoard(board_directory,board_file,directory_path,time_limit,iterative_mode=False,bdd=True,steps=None):
+def runSolversForSingleBoard(board_directory,board_file,directory_path,time_limit,iterative_mode=False,bdd=True,steps=None,jobs=1,job_memory_mb=DEFAULT_JOB_MEMORY_MB,race=False,cache=None,budgets=None,memory_cgroup=None,scheduler=None,escalation=None,log=None):
     board_path=os.path.join('boards',board_directory, board_file)
     # Define the solutions directory
     solutions_dir = os.path.join('boards', board_directory, 'solutions')
@@ -144,9 +484,180 @@ def runSolversForSingleBoard(board_directory,board_file,directory_path,time_limi
     # Define the output file name and path
     output_file_name = f"{os.path.splitext(board_file)[0]}_output.txt"
     output_file = os.path.join(solutions_dir, output_file_name)
-    runSolvers(board_path, directory_path, output_file, time_limit, iterative_mode,bdd,steps)
+    runSolvers(board_path, directory_path, output_file, time_limit, iterative_mode,bdd,steps,jobs,job_memory_mb,race,cache,budgets,memory_cgroup,scheduler,escalation,log)
+
+
+def run_solver_job(solver_path, board_path, output_file, time_limit, iterative_mode=False, bdd=False, steps=None, cache=None, memory_limit=None, memory_cgroup=None, log=None):
+    """
+    Runs a solver on a board, unless the results cache already holds the result of this job.
+    The result is recorded in the results log (a results_log.ResultsLog) when there is one.
+    """
+    # the key hashes the board and the solver binary, only computed when the cache or the log needs it
+    key = None
+    if cache is not None or log is not None:
+        key = result_cache.ResultCache.job_key(board_path, solver_path, bdd, steps, iterative_mode)
+    if cache is not None and serve_from_cache(cache, key, board_path, solver_path, output_file, time_limit, memory_limit, log):
+        return
+    result = run_nuXmv_solver(solver_path,board_path,output_file,time_limit,iterative_mode,bdd,steps,memory_limit=memory_limit,memory_cgroup=memory_cgroup)
+    log_result(log, cache, key, result, board_path, solver_path, time_limit)
+    record_result(cache, key, result, board_path, solver_path, time_limit)
 
 
+def record_result(cache, key, result, board_path, solver_path, time_limit, final=True):
+    """
+    Stores a finished job in the results cache, failed runs are not stored and will run again.
+    A run that is not final (a time slice the job is rerun after) is stored but the job is not done in the sweep.
+    """
+    if cache is None or result is None or result['status'] == 'error':
+        return
+    cache.store(key, result, board_path, solver_path, time_limit)
+    if final:
+        cache.mark_done(board_path, solver_path)
+
+
+def log_result(log, cache, key, result, board_path, solver_path, time_limit, cached=False):
+    """
+    Appends the record of a finished job (see results_log.FIELDS) to the results log,
+    the solution is replayed on the board for its moves and pushes.
+    """
+    if log is None or result is None:
+        return
+    board_hash, solver_hash, engine, steps, iterative = key
+    verified, moves, pushes = replay_solution(board_path, result['solution']) if result.get('solution') else (None, None, None)
+    log.append({'sweep_id': cache.sweep_id if cache is not None else None, 'board_path': board_path, 'board_hash': board_hash,
+                'solver_path': solver_path, 'solver_hash': solver_hash, 'engine': engine,
+                'steps': None if steps == result_cache.NO_STEPS else steps, 'iterative': bool(iterative),
+                'status': result['status'], 'solution': result.get('solution'), 'verified': verified, 'moves': moves, 'pushes': pushes,
+                'runtime': result.get('runtime'), 'time_limit': time_limit, 'memory_limit': result.get('memory_limit'), 'cached': cached,
+                **{field: result.get(field) for field in resource_usage.ResourceUsage.FIELDS}})
+
+
+def remaining_slices(cache, key, slices):
+    """
+    Drops the time slices a cached time out of the job already covers, the job starts above them.
+    """
+    cached = cache.lookup(key, 0) if cache is not None else None
+    if cached is None or cached['status'] != 'timeout':
+        return slices
+    return [limit for limit in slices if limit > cached['time_limit']] or slices[-1:]
+
+
+def list_solvers(directory_path):
+    """
+    Returns the paths of all solver .exe files in directory_path.
+    """
+    return [os.path.join(directory_path, filename) for filename in os.listdir(directory_path) if filename.endswith(".exe")]
+
+
+def runSolverJobsInParallel(solver_jobs, time_limit, iterative_mode=False, bdd=True, steps=None, jobs=1, job_memory_mb=DEFAULT_JOB_MEMORY_MB, cache=None, memory_limit=None, memory_cgroup=None, scheduler=None, escalation=None, log=None):
+    """
+    Runs (solver_path, board_path, output_file) jobs on a pool of worker processes.
+    jobs: maximal number of jobs running at the same time
+    job_memory_mb: RAM reserved per job, the pool never grows beyond what the free RAM can hold
+    and a new job is only started once job_memory_mb is available.
+    memory_limit, memory_cgroup: memory cap of every job (see run_nuXmv_solver), a job over its cap
+    is stopped by the kernel instead of taking the other jobs down with it.
+    scheduler: job_scheduler.JobScheduler that orders the jobs (longest expected runtime first)
+    and sets the time limit of each job, None runs them in the given order with time_limit.
+    escalation: job_limits.EscalatingBudget, every job first runs with a short time slice, a job that
+    times out goes back to the end of the queue with the next, longer slice until its time limit is reached.
+    Each job runs in its own working directory, its output is appended to the board's
+    output file by this process once the job finishes.
+    Jobs found in the results cache are not started.
+    log: results_log.ResultsLog the final result of every job is recorded in.
+    """
+    workers = memory_bounded_worker_count(jobs, job_memory_mb)
+    print(f"Running {len(solver_jobs)} jobs with {workers} parallel workers (requested {jobs}, {job_memory_mb} MB per job)")
+
+    # (solver_path, board_path, output_file, key, slices): slices are the time limits the job still runs with, None before its first start
+    ordered_jobs = scheduler.order(solver_jobs) if scheduler is not None else solver_jobs
+    pending_jobs = [(solver_path, board_path, output_file, None, None) for solver_path, board_path, output_file in ordered_jobs]
+    running_jobs = {}
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        while pending_jobs or running_jobs:
+            # Start jobs while there is a free worker and enough free memory (one job may always run)
+            while pending_jobs and len(running_jobs) < workers and (not running_jobs or has_memory_for_job(job_memory_mb)):
+                solver_path, board_path, output_file, key, slices = pending_jobs.pop(0)
+                if slices is None:
+                    job_time_limit = scheduler.time_limit(solver_path, board_path, time_limit) if scheduler is not None else time_limit
+                    if job_time_limit is None:
+                        continue
+                    if cache is not None or log is not None:
+                        key = result_cache.ResultCache.job_key(board_path, solver_path, bdd, steps, iterative_mode)
+                    if cache is not None and serve_from_cache(cache, key, board_path, solver_path, output_file, job_time_limit, memory_limit, log):
+                        continue
+                    slices = remaining_slices(cache, key, escalation.slices(job_time_limit)) if escalation is not None else [job_time_limit]
+                print(f"\n--- Starting Solver {solver_path} on {board_path} (time limit {slices[0]} seconds) ---\n")
+                future = executor.submit(run_isolated_solver_job, solver_path, board_path, slices[0], iterative_mode, bdd, steps,
+                                         memory_limit, memory_cgroup)
+                running_jobs[future] = (solver_path, board_path, output_file, key, slices)
+
+            if not running_jobs:
+                continue
+            finished_jobs, _ = concurrent.futures.wait(running_jobs, timeout=MEMORY_POLL_INTERVAL, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in finished_jobs:
+                solver_path, board_path, output_file, key, slices = running_jobs.pop(future)
+                try:
+                    job_output, result = future.result()
+                except Exception as e:
+                    print(f"Failed to run the {solver_path} on {board_path}: {e}")
+                    continue
+                # A time out before the last slice is not reported, the job is queued again with the next slice
+                final = result is None or result['status'] != 'timeout' or len(slices) == 1
+                if final:
+                    with open(output_file, 'a') as f:
+                        f.write(job_output)
+                    log_result(log, cache, key, result, board_path, solver_path, slices[0])
+                else:
+                    print(f"{solver_path} on {board_path} exceeded its time slice of {slices[0]} seconds, rescheduled with {slices[1]} seconds.")
+                    pending_jobs.append((solver_path, board_path, output_file, key, slices[1:]))
+                record_result(cache, key, result, board_path, solver_path, slices[0], final)
+
+
+def run_isolated_solver_job(solver_path, board_path, time_limit, iterative_mode=False, bdd=False, steps=None, memory_limit=None, memory_cgroup=None):
+    """
+    Runs one (board, solver) job inside a private temporary working directory.
+    The board is copied into that directory, so every file the solver writes next to the board
+    or into its working directory (.smv, .out, result folders) cannot collide with other jobs.
+    Returns the text the job wrote to its output file and the result dict of run_nuXmv_solver.
+    """
+    work_dir = tempfile.mkdtemp(prefix="sokoban_job_")
+    try:
+        local_board_path = shutil.copy(board_path, work_dir)
+        job_output_file = os.path.join(work_dir, "job_output.txt")
+        result = run_nuXmv_solver(solver_path, local_board_path, job_output_file, time_limit, iterative_mode, bdd, steps, cwd=work_dir,
+                                  memory_limit=memory_limit, memory_cgroup=memory_cgroup)
+        if not os.path.isfile(job_output_file):
+            return "", result
+        with open(job_output_file, 'r') as f:
+            return f.read(), result
+    finally:
+        shutil.rmtree(work_dir, onerror=on_rm_error)
+
+
+def memory_bounded_worker_count(jobs, job_memory_mb):
+    """
+    Returns the number of workers to use: the requested jobs, capped by the number of jobs
+    the currently available RAM can hold (at least one).
+    """
+    available_mb = psutil.virtual_memory().available / (1024 ** 2)
+    return max(1, min(jobs, int(available_mb // job_memory_mb)))
+
+
+def has_memory_for_job(job_memory_mb):
+    """ Checks if the machine currently has job_memory_mb of RAM available """
+    return psutil.virtual_memory().available / (1024 ** 2) >= job_memory_mb
+
+
+def cleanup_board_directory(board_directory):
+    """
+    Removes the files and folders the solvers leave next to the boards.
+    """
+    remove_files_with_pattern(board_directory,".out")
+    remove_files_with_pattern(board_directory,".smv")
+    remove_files_with_pattern(board_directory,".log")
+    remove_non_solution_folders(board_directory)
+
 
 def remove_non_solution_folders(parent_directory):
     """
@@ -185,27 +696,6 @@ def on_rm_error(func, path, exc_info):
         raise exc_info[1]  # Re-raise the original exception if it wasn't a permission error
 
 
-def monitor_memory(ps_process, peak_memory):
-    """ Monitors memory usage of the process and updates peak_memory """
-    try:
-        while ps_process.is_running():
-            try:
-                memory_info = ps_process.memory_info()
-                memory_used = memory_info.rss / (1024 ** 2)  # Convert to MB
-                peak_memory[0] = max(peak_memory[0], memory_used)
-
-                # Check child processes
-                for child in ps_process.children(recursive=True):
-                    child_memory_info = child.memory_info()
-                    child_memory_used = child_memory_info.rss / (1024 ** 2)
-                    peak_memory[0] = max(peak_memory[0], child_memory_used)
-
-                time.sleep(0.1)  # Check every 100ms
-            except psutil.NoSuchProcess:
-                break  # Process has terminated
-    except Exception as e:
-        print(f"Error in memory monitoring: {e}")
-        
 def remove_files_with_pattern(directory, pattern):
     """
     Removes files from the specified directory that contain the given pattern in their name.
@@ -228,36 +718,109 @@ def remove_files_with_pattern(directory, pattern):
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Run all solvers of a directory on Sokoban boards")
+
     # Path to the Sokoban board file and output file
-    board_directory='report_boards'
-    
+    parser.add_argument('-BOARDS', '--board_directory', type=str, default='report_boards', help='Boards directory (inside boards/)')
+    parser.add_argument('-BOARD', '--board_file', type=str, default='board30.xsb', help='Board file for a single board run')
+    parser.add_argument('-ALL', '--all_boards', type=str, choices=['True', 'False'], default='False', help='Run all boards of the boards directory (true or false)')
+
+    # board store (scripts/ingest_board_collection.py), levels are written to the boards directory as they are selected
+    parser.add_argument('--store', type=str, default=None, help='Board store file to take the boards from, -BOARD is then a level id or title and -ALL True selects all levels')
+    parser.add_argument('--levels', type=str, nargs='+', default=None, help='With --store, the ids or titles of the levels to run')
+
     # Path to Solvers Directory
-    solver_directory='exe'
-    
+    parser.add_argument('-SOLVERS', '--solver_directory', type=str, default='exe', help='Directory containing the solvers .exe files')
+
     #timelimit [seconds]
-    time_limit=3600
-    
+    parser.add_argument('-TIME', '--time_limit', type=int, default=3600, help='Time limit per solver run [seconds]')
+
+    # memory limit [MB] and per engine budgets
+    parser.add_argument('-MEMORY', '--memory_limit', type=int, default=None, help='Memory limit per solver run [MB], no limit by default')
+    parser.add_argument('--bdd_time', type=int, default=None, help='Time limit of the BDD runs [seconds], defaults to --time_limit')
+    parser.add_argument('--sat_time', type=int, default=None, help='Time limit of the SAT runs [seconds], defaults to --time_limit')
+    parser.add_argument('--bdd_memory', type=int, default=None, help='Memory limit of the BDD runs [MB], defaults to --memory_limit')
+    parser.add_argument('--sat_memory', type=int, default=None, help='Memory limit of the SAT runs [MB], defaults to --memory_limit')
+    parser.add_argument('--memory_cgroup', type=str, default=None, help='Delegated cgroup v2 directory to create a child group per run in, the limit is set with RLIMIT_AS otherwise')
+
     #iterative mode
-    iterative_mode= False
-    
+    parser.add_argument('-ITERATIVE', '--iterative_mode', type=str, choices=['True', 'False'], default='False', help='Enable iterative mode (true or false)')
+
     # bdd Engine
-    bdd= True
-    
+    parser.add_argument('-BDD', '--bdd', type=str, choices=['True', 'False'], default='True', help='Run BDD engine (true or false)')
+
     #steps bmc
-    steps = None
-    
-    single_board=True
-    if single_board==True:
+    parser.add_argument('-STEPS', '--steps', type=int, default=None, help='Number of steps (integer value)')
+
+    # parallel jobs
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='Number of (board, solver) jobs to run in parallel')
+    parser.add_argument('--job_memory', type=int, default=DEFAULT_JOB_MEMORY_MB, help='RAM [MB] reserved per parallel job')
+
+    # results cache
+    parser.add_argument('--cache', type=str, default=result_cache.DEFAULT_CACHE_FILE, help='SQLite file caching the results of finished jobs')
+    parser.add_argument('--no_cache', action='store_true', help='Run every job, do not read or write the results cache')
+    parser.add_argument('--resume', action='store_true', help='Continue the last interrupted sweep with the same settings')
+
+    # escalating time slices
+    parser.add_argument('--first_slice', type=int, default=None, help='Run every job with this time limit [seconds] first and rerun the ones that time out with growing limits up to the time limit')
+    parser.add_argument('--slice_factor', type=float, default=2.0, help='Growth factor of the time slices of --first_slice')
+
+    # difficulty aware scheduling
+    parser.add_argument('--schedule', action='store_true', help='Run the jobs longest predicted runtime first, predicted from the cached results of similar boards')
+    parser.add_argument('--skip_hopeless', action='store_true', help='With --schedule, skip the jobs whose similar boards all failed instead of shortening their time limit')
+
+    # structured results log
+    parser.add_argument('--results_log', type=str, default=results_log.DEFAULT_LOG_FILE, help='JSONL file every finished job appends its record to')
+    parser.add_argument('--no_results_log', action='store_true', help='Do not write the structured results log')
+
+    # portfolio race mode
+    parser.add_argument('-RACE', '--race', type=str, choices=['True', 'False'], default='False', help='Race all solvers with BDD and SAT engines, keep the first verified solution (true or false)')
+
+    args = parser.parse_args()
+    iterative_mode = args.iterative_mode.lower() == 'true'
+    bdd = args.bdd.lower() == 'true'
+    race = args.race.lower() == 'true'
+
+    single_board = args.all_boards.lower() != 'true'
+
+    budgets = job_limits.EngineBudgets(args.time_limit, args.memory_limit, args.bdd_time, args.sat_time, args.bdd_memory, args.sat_memory)
+    time_limit = max(budgets.time(True), budgets.time(False)) if race else budgets.time(bdd)
+
+    # Race results are not cached, a race has no single solver to key them by
+    cache = None
+    if not args.no_cache and not race:
+        cache = result_cache.ResultCache(args.cache)
+        settings = {'board_directory': args.board_directory, 'board_file': args.board_file if single_board else None,
+                    'store': args.store, 'levels': args.levels,
+                    'solver_directory': args.solver_directory, 'time_limit': time_limit,
+                    'memory_limit': budgets.memory(bdd), 'first_slice': args.first_slice, 'slice_factor': args.slice_factor,
+                    'iterative_mode': iterative_mode, 'bdd': bdd, 'steps': args.steps}
+        cache.start_sweep(settings, args.resume)
+
+    log = None if args.no_results_log else results_log.ResultsLog(args.results_log)
+    escalation = job_limits.EscalatingBudget(args.first_slice, args.slice_factor) if args.first_slice else None
+
+    # Race runs every solver at once, there is nothing to order
+    scheduler = None
+    if args.schedule and not race:
+        scheduler = job_scheduler.JobScheduler(cache, bdd, args.steps, iterative_mode, skip_hopeless=args.skip_hopeless)
+
+    if args.store:
+        # Run Solvers for levels of the board store
+        levels = args.levels if args.levels else [args.board_file] if single_board else None
+        runSolversForStore(args.store,args.board_directory,levels,args.solver_directory, time_limit, iterative_mode,bdd,args.steps,args.jobs,args.job_memory,race,cache,budgets,args.memory_cgroup,scheduler,escalation,log)
+    elif single_board==True:
         # Run Solvers for single board
-        board_file='board30.xsb'
-        runSolversForSingleBoard(board_directory,board_file,solver_directory, time_limit, iterative_mode,bdd,steps)
+        runSolversForSingleBoard(args.board_directory,args.board_file,args.solver_directory, time_limit, iterative_mode,bdd,args.steps,args.jobs,args.job_memory,race,cache,budgets,args.memory_cgroup,scheduler,escalation,log)
     else:
         # Run Solvers for directory
-        runSolversForDirectory(board_directory,solver_directory, time_limit, iterative_mode,bdd,steps)
+        runSolversForDirectory(args.board_directory,args.solver_directory, time_limit, iterative_mode,bdd,args.steps,args.jobs,args.job_memory,race,cache,budgets,args.memory_cgroup,scheduler,escalation,log)
+
+    if cache is not None:
+        cache.finish_sweep()
+        cache.close()
     
     
 
 if __name__ == "__main__":
     main()
-
-
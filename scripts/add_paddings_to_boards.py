@@ -1,4 +1,5 @@
 import os
+import sys
 # =============================================
 # Sokoban Board Line Padding Script
 # =============================================
@@ -10,21 +11,17 @@ import os
 # lines.
 # =============================================
 
+script_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(os.path.dirname(script_path), 'models'))
+from board import Board
+
 def pad_board_lines(file_path):
-    with open(file_path, 'r') as file:
-        lines = [line.rstrip() for line in file.readlines()]
-        
-    if not lines:
+    board = Board.from_file(file_path)
+    if board.cells.size == 0:
         return  # Skip empty files
-    
-    max_columns = max(len(line) for line in lines)
-    
-    # Pad lines with '-' to match the max_columns length
-    padded_lines = [line.ljust(max_columns, '-') for line in lines]
-    
-    # Write the padded board back to the file
-    with open(file_path, 'w') as file:
-        file.write('\n'.join(padded_lines) + '\n')
+
+    # Pad lines with '-' to match the max_columns length and write the padded board back to the file
+    board.pad('-').write(file_path)
 
 def pad_boards_in_folder(folder_path):
     for filename in os.listdir(folder_path):
@@ -33,9 +30,6 @@ def pad_boards_in_folder(folder_path):
             pad_board_lines(file_path)
 
 # Example usage
-# Get the script path
-script_path = os.path.dirname(os.path.realpath(__file__))
-
 # Move one folder back and then go to 'boards\Sokoban master levels xsb'
 folder_name='It is all greek'
 folder_path = os.path.join(os.path.dirname(script_path), 'boards', folder_name)
@@ -0,0 +1,100 @@
+import argparse
+import importlib.util
+import os
+import sys
+import time
+import tracemalloc
+# =============================================
+# SMV Model Generation Benchmark
+# =============================================
+# This script measures how the SMV generators scale with the board size.
+# It builds open square rooms of growing size (walls around the border,
+# the player in a corner, a few boxes and goals in the middle) and streams
+# the model of every generator to os.devnull, printing the generation
+# time per cell and the peak memory of the generation.
+# The time per cell should stay flat as the boards grow, and the peak
+# memory should stay near the size of one cell's clauses.
+# Usage:
+#   python benchmark_model_generation.py -SIZES 10 20 30
+# =============================================
+
+script_path = os.path.dirname(os.path.realpath(__file__))
+models_path = os.path.join(os.path.dirname(script_path), 'models')
+sys.path.append(models_path)
+
+
+def load_module(name, model_folder, file_name):
+    # the model folders hold modules with the same names, load each one from its own folder
+    folder = os.path.join(models_path, model_folder)
+    sys.path.insert(0, folder)
+    try:
+        spec = importlib.util.spec_from_file_location(name, os.path.join(folder, file_name))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(folder)
+    return module
+
+
+def square_board(size, boxes=3):
+    """Returns an XSB board of size x size cells: a walled room with boxes and goals on its middle row."""
+    rows = ['#' * size]
+    for i in range(1, size - 1):
+        row = ['-'] * (size - 2)
+        if i == size // 2:
+            for k in range(min(boxes, (size - 4) // 2)):
+                row[1 + 2 * k] = '$'
+                row[2 + 2 * k] = '.'
+        rows.append('#' + ''.join(row) + '#')
+    rows.append('#' * size)
+    rows[1] = '#@' + rows[1][2:]
+    return '\n'.join(rows)
+
+
+def measure(write):
+    """
+    Calls write(f) with os.devnull opened as f, returns (seconds, peak bytes allocated).
+    The time and the memory are measured in separate runs, tracemalloc slows the allocations down.
+    """
+    with open(os.devnull, 'w') as f:
+        start = time.perf_counter()
+        write(f)
+        elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    with open(os.devnull, 'w') as f:
+        write(f)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main(sizes):
+    grid_generator = load_module('grid_smv_file_generator', 'grid based model', 'smv_file_generator.py')
+    grid_sokoban = load_module('grid_sokoban', 'grid based model', 'sokoban.py')
+    position_generator = load_module('position_model_generation', 'position based model', 'model_generation.py')
+    position_board = load_module('position_board_assignment', 'position based model', 'board_assignment.py')
+
+    print(f"{'generator':<24}{'size':>6}{'cells':>8}{'seconds':>10}{'us/cell':>10}{'peak KB':>10}")
+    for size in sizes:
+        board = square_board(size)
+        cells = size * size
+        board_list = [list(row) for row in board.split('\n')]
+        worker_holder, position_list = position_board.assign_board(board)
+
+        writers = (
+            ('grid', lambda f: f.writelines(grid_generator.smv_fragments_generator(board_list))),
+            ('grid restricted', lambda f: f.writelines(grid_generator.smv_fragments_generator(board_list, True))),
+            ('position', lambda f: f.writelines(
+                position_generator.nusmv_model_fragments(size, size, board, position_list, worker_holder))),
+            ('grid sokoban generator', lambda f: grid_sokoban.sokoban_smv_generator(board).generate(f, board.count('$'))),
+        )
+        for name, write in writers:
+            elapsed, peak = measure(write)
+            print(f"{name:<24}{size:>6}{cells:>8}{elapsed:>10.4f}{elapsed / cells * 1e6:>10.1f}{peak / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark of the SMV model generators")
+    parser.add_argument('-SIZES', '--sizes', type=int, nargs='+', default=[6, 10, 15, 20, 25, 30], help='Side lengths of the square boards')
+    args = parser.parse_args()
+    main(args.sizes)
@@ -1,41 +1,14 @@
 import os
+import sys
+
+script_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(os.path.dirname(script_path), 'models'))
+from board import Board
 
 def process_xsb_file(file_path):
     """Process a single .xsb file to replace chars before the first #, spaces with #, and pad rows"""
-    with open(file_path, 'r') as f:
-        board = [list(line.rstrip()) for line in f.readlines()]  # Read the board into a list of lists
-
-    # Find the length of the longest row
-    max_length = max(len(row) for row in board)
-
-    # Process each row to modify characters
-    for row in board:
-        first_hash = None
-
-        # Find the index of the first '#' in the row
-        for i, char in enumerate(row):
-            if char == '#':
-                first_hash = i
-                break
-
-        # Replace all characters before the first '#' with '#'
-        if first_hash is not None:
-            for i in range(first_hash):
-                row[i] = '#'
-
-        # Replace all ' ' (spaces) with '#'
-        for i, char in enumerate(row):
-            if char == ' ':
-                row[i] = '#'
-
-        # Pad the row with '#' to match the longest row
-        if len(row) < max_length:
-            row.extend(['#'] * (max_length - len(row)))
-
     # Overwrite the same file with the modified board
-    with open(file_path, 'w') as f:
-        for row in board:
-            f.write(''.join(row) + '\n')
+    Board.from_file(file_path).wall_outside().write(file_path)
 
 def process_xsb_directory(directory_path):
     """Process all .xsb files in a given directory"""
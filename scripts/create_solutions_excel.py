@@ -1,7 +1,12 @@
 import os
 import re
+import sys
 import pandas as pd
 
+script_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.dirname(script_path))
+import results_log
+
 def extract_times(file_content):
     """Extracts running/simulation times and dynamically creates columns based on solver names"""
     times = {}
@@ -69,6 +74,19 @@ def create_excel_report(directory_path):
     # Save the DataFrame to an Excel file in the given directory
     df.to_excel(output_file)
 
+def create_excel_report_from_results(results_path, output_file):
+    """
+    Creates the solver times report from the structured results log of run_solvers_directory.py
+    (or its export, see export_results_log.py) instead of the output files.
+    One row per board, one column per solver and engine, the runtime of the latest run of each job.
+    """
+    results = results_log.load_results(results_path)
+    results['board'] = results['board_path'].map(lambda path: os.path.splitext(os.path.basename(path))[0])
+    results['solver'] = results['solver_path'].map(os.path.basename) + ' ' + results['engine']
+    latest = results.sort_values('timestamp').drop_duplicates(['board', 'solver'], keep='last')
+    df = latest.pivot(index='board', columns='solver', values='runtime').fillna("")
+    df.to_excel(output_file)
+
 # Example usage
 directory_path = 'boards/simple boards/solutions'  # Replace with the actual directory path containing the files
 output_file = 'solver_times_report.xlsx'  # Replace with your desired output file name
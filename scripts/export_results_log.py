@@ -0,0 +1,32 @@
+import argparse
+import os
+import sys
+import time
+# =============================================
+# Results Log Export
+# =============================================
+# This script converts the structured results log written by
+# run_solvers_directory.py (one JSON record per job) into a columnar
+# file: Parquet (needs pyarrow or fastparquet) or CSV, by the suffix of
+# the output file. The reports load the export with
+# results_log.load_results in milliseconds instead of re-parsing the
+# prose output files.
+# Usage:
+#   python export_results_log.py -LOG ../results_log.jsonl -OUT ../results.parquet
+# =============================================
+
+script_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.dirname(script_path))
+import results_log
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exports the structured results log to a columnar file")
+    parser.add_argument('-LOG', '--log', type=str, default=results_log.DEFAULT_LOG_FILE, help='JSONL results log')
+    parser.add_argument('-OUT', '--output', type=str, default='results.parquet', help='Output file, .parquet or .csv')
+    args = parser.parse_args()
+
+    start_time = time.time()
+    records = results_log.export(args.log, args.output)
+    if records is not None:
+        print(f"Exported {records} records to {args.output} in {time.time() - start_time:.3f} seconds")
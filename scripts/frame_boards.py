@@ -1,22 +1,15 @@
 import os
+import sys
+
+script_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(os.path.dirname(script_path), 'models'))
+from board import Board
 
 def frame_board_with_walls(board):
     """Modify the board to have a '#' frame."""
-    rows = len(board)
-    if rows == 0:
+    if len(board) == 0:
         return board
-    
-    cols = len(board[0])
-    
-    # Modify the first and last rows
-    board[0] = '#' * cols
-    board[-1] = '#' * cols
-    
-    # Modify the first and last columns of the remaining rows
-    for i in range(1, rows - 1):
-        board[i] = '#' + board[i][1:-1] + '#'
-    
-    return board
+    return Board.from_rows(board).frame().rows()
 
 def process_boards_in_folder(folder_path):
     """Process all .xsb board files in the specified folder."""
@@ -0,0 +1,31 @@
+import argparse
+import os
+import sys
+import time
+# =============================================
+# Board Collection Ingestion
+# =============================================
+# This script parses Sokoban level collections (.txt/.sok packs with many
+# levels, or single .xsb boards) once into a board store: one
+# memory-mapped file with the cells of every level and a fixed-size index
+# (size, boxes, goals, hash, title). run_solvers_directory.py --store and
+# the model generators then read any level by id or title without
+# parsing the collections again.
+# Usage:
+#   python ingest_board_collection.py -COLLECTIONS pack1.txt pack2.txt -STORE ../boards/packs.boards
+# =============================================
+
+script_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(os.path.dirname(script_path), 'models'))
+import board_store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parses level collections into a board store")
+    parser.add_argument('-COLLECTIONS', '--collections', type=str, nargs='+', required=True, help='Collection files (.txt, .sok or .xsb)')
+    parser.add_argument('-STORE', '--store', type=str, default='boards.boards', help='Board store file to write')
+    args = parser.parse_args()
+
+    start_time = time.time()
+    levels = board_store.build_store(args.collections, args.store)
+    print(f"Stored {levels} levels of {len(args.collections)} collections in {args.store} in {time.time() - start_time:.3f} seconds")
@@ -0,0 +1,97 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from collections import deque
+# =============================================
+# Deadlock Pattern Pruning Measurement
+# =============================================
+# This script measures how much of the push-level state space the
+# deadlock patterns of models/deadlock_patterns.py cut away.
+# For every .xsb board under the given directories it enumerates the
+# box configurations reachable by pushes (the player normalized to its
+# area) twice: once pruning only the dead squares, like the static
+# deadlocks model did before, and once also pruning every state that
+# matches a pattern of the `deadlocked` DEFINE.
+# It prints the number of patterns, both state counts and the reduction.
+# Boards whose search passes -MAX_STATES states are marked with '+'.
+# Usage:
+#   python measure_deadlock_pruning.py -BOARDS ../boards -MAX_STATES 200000
+# =============================================
+
+script_path = os.path.dirname(os.path.realpath(__file__))
+sys.path.append(os.path.join(os.path.dirname(script_path), 'models'))
+import deadlock_patterns
+import explicit_solver
+
+
+def count_states(search, patterns, max_states):
+    """
+    Breadth-first enumeration of the push states of the board, returns (states, capped).
+    With patterns, the states matching a deadlock pattern are not counted nor expanded.
+    """
+    def cells(boxes):
+        return {divmod(box, search.columns) for box in boxes}
+
+    boxes = frozenset(search.start_boxes)
+    _, normal = search.reachable(search.player, boxes)
+    seen = {(boxes, normal)}
+    queue = deque([(boxes, search.player)])
+    while queue:
+        if len(seen) > max_states:
+            return len(seen), True
+        boxes, player = queue.popleft()
+        area, _ = search.reachable(player, boxes)
+        for box in boxes:
+            for neighbour, offset, _ in search.neighbours(box):
+                behind = search.step(box, -offset)
+                if neighbour in boxes or search.dead[neighbour] or behind is None or not area[behind]:
+                    continue
+                new_boxes = boxes - {box} | {neighbour}
+                if patterns is not None and patterns.is_deadlocked(cells(new_boxes)):
+                    continue
+                _, new_normal = search.reachable(box, new_boxes)
+                if (new_boxes, new_normal) not in seen:
+                    seen.add((new_boxes, new_normal))
+                    queue.append((new_boxes, box))
+    return len(seen), False
+
+
+def main(directories, max_states):
+    paths = sorted(path for directory in directories
+                   for path in glob.glob(os.path.join(directory, '**', '*.xsb'), recursive=True))
+    if not paths:
+        print("No .xsb boards found")
+        return
+
+    print(f"{'board':<32}{'patterns':>10}{'dead squares':>14}{'patterns':>12}{'reduction':>11}{'seconds':>9}")
+    total_before = total_after = 0
+    for path in paths:
+        with open(path, 'r') as f:
+            board = f.read()
+        search = explicit_solver.ExplicitSolver(board)
+        if search.player is None or not search.start_boxes:
+            continue
+        patterns = deadlock_patterns.deadlock_patterns(board)
+        start = time.perf_counter()
+        before, before_capped = count_states(search, None, max_states)
+        after, after_capped = count_states(search, patterns, max_states)
+        elapsed = time.perf_counter() - start
+        total_before += before
+        total_after += after
+        before_text = f"{before}{'+' if before_capped else ''}"
+        after_text = f"{after}{'+' if after_capped else ''}"
+        reduction = 1 - after / before
+        name = os.path.relpath(path, os.path.commonpath(paths)) if len(paths) > 1 else os.path.basename(path)
+        print(f"{name:<32}{patterns.count():>10}{before_text:>14}{after_text:>12}{reduction:>10.1%}{elapsed:>9.2f}")
+    if total_before:
+        print(f"{'total':<32}{'':>10}{total_before:>14}{total_after:>12}{1 - total_after / total_before:>10.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measures the push states the deadlock patterns prune")
+    parser.add_argument('-BOARDS', '--boards', nargs='+', required=True, help='Directories searched for .xsb boards')
+    parser.add_argument('-MAX_STATES', '--max_states', type=int, default=200000, help='States enumerated per board at most')
+    args = parser.parse_args()
+    main(args.boards, args.max_states)